@@ -131,15 +131,32 @@ import re
 import json
 import logging
 import asyncio
-from datetime import datetime
-from collections import defaultdict
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import atexit
+import hashlib
+import heapq
+import io
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from logging.handlers import QueueHandler, QueueListener
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import Application, MessageHandler, CommandHandler, CallbackQueryHandler, filters, ContextTypes
 from telegram.error import BadRequest
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
 import requests
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: images are then sent to OCR as-is
+    Image = None
 
 # ========== CONFIGURATION ==========
 import os
@@ -149,6 +166,16 @@ logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
                     level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Log records are only enqueued by the caller; formatting and the console
+# write happen on the listener thread, so scan workers and the event loop
+# don't take turns on the stream handler's lock
+_log_queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
+atexit.register(_log_listener.stop)  # Flush queued records on exit
+
 # CRITICAL: Set BOT_TOKEN environment variable before running
 # The previous token has been exposed in version control and should be rotated
 # Get a new token from @BotFather on Telegram and set it as an environment variable:
@@ -165,6 +192,14 @@ BOT_USERNAME = None
 # If not set (None), bot will resume from last processed message (uses processed_messages.json)
 BOT_START_DATE = os.getenv('BOT_START_DATE', None)  # None = no date filter
 
+# Parsed once here instead of for every incoming message
+BOT_START_DATETIME = None
+if BOT_START_DATE:
+    try:
+        BOT_START_DATETIME = datetime.fromisoformat(BOT_START_DATE).replace(tzinfo=timezone.utc)
+    except ValueError as e:
+        logger.error(f"❌ Invalid BOT_START_DATE format: '{BOT_START_DATE}'. Use YYYY-MM-DD format. Error: {e}")
+
 # Alternative: Set a minimum message ID to process
 # Example: "534" will only process messages with ID >= 534
 # If not set (None), bot will resume from last processed message
@@ -178,8 +213,38 @@ MIN_MESSAGE_ID = os.getenv('MIN_MESSAGE_ID', None)  # None = no message ID filte
 TELEGRAM_API_ID = os.getenv('TELEGRAM_API_ID', None)
 TELEGRAM_API_HASH = os.getenv('TELEGRAM_API_HASH', None)
 
-# Telethon client (initialized lazily when needed)
+# Telethon client (initialized lazily when needed, then shared by all scans)
 telethon_client = None
+_telethon_lock = asyncio.Lock()
+
+async def get_telethon_client():
+    """Return the shared, connected Telethon client (created on first use).
+
+    Session load + MTProto handshake only happens once instead of on every
+    /scan_history, /rescan and auto-scan. Raises ImportError if Telethon
+    is not installed.
+    """
+    global telethon_client
+    async with _telethon_lock:
+        if telethon_client is None:
+            from telethon import TelegramClient
+            try:
+                import cryptg  # noqa: F401 - Telethon uses it for MTProto AES when installed
+                logger.info("✓ cryptg available: fast MTProto encryption")
+            except ImportError:
+                logger.warning("⚠️ cryptg not installed - Telethon falls back to slow pure-Python AES (pip install cryptg)")
+            telethon_client = TelegramClient("telethon_session", int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
+        if not telethon_client.is_connected():
+            await telethon_client.start()
+        return telethon_client
+
+async def close_telethon_client():
+    """Disconnect the shared Telethon client on shutdown"""
+    if telethon_client is not None and telethon_client.is_connected():
+        try:
+            await telethon_client.disconnect()
+        except Exception as e:
+            logger.warning(f"⚠️ Error disconnecting Telethon: {e}")
 
 # ========== MULTI-GROUP CONFIGURATION LOADER ==========
 def load_group_configs():
@@ -249,7 +314,8 @@ CREDENTIALS_FILE = "credentials.json"
 OCR_API_URL = "https://api.ocr.space/parse/image"
 OCR_API_KEY = os.getenv('OCR_API_KEY', "K89427089988957")  # Updated OCR key
 
-PROCESSED_MESSAGES_FILE = "processed_messages.json"
+PROCESSED_MESSAGES_FILE = "processed_messages.json"  # Legacy snapshot, imported once into the DB
+PROCESSED_MESSAGES_DB = "processed_messages.db"
 LAST_RUN_FILE = "last_run.json"  # Tracks when bot last ran for auto-scan
 
 # ========== BENEFICIARY VALIDATION ==========
@@ -263,6 +329,24 @@ VALID_BENEFICIARIES = [
     "DAGNIE SENAIT"   # Reversed order variant
 ]
 
+# Filler words ignored when tokenizing an extracted beneficiary ("AND OR", "ANDOR", ...)
+BENEFICIARY_CONNECTORS = frozenset({'AND', 'OR', 'ANDOR', 'THE', 'OF', 'TO', 'A', 'AN', '&', '/'})
+
+# Authorized tokens - accept if ANY of these is found
+# FULL ACCOUNT NAME: "SEYOUM ASSEFA AND OR SENAIT DAGNE"
+# BUT accept ANY PARTIAL match (receipt may show truncated name)
+# Include ALL possible spelling variations due to OCR errors
+AUTHORIZED_BENEFICIARY_TOKENS = frozenset({
+    # First name variations
+    'SEYOUM', 'SEYSOA', 'SEYSOM', 'SEYSUM', 'SEYOAM',
+    # First surname variations
+    'ASSEFA', 'ASEFA', 'ASEFFA',
+    # Second name variations
+    'SENAIT', 'SENIET', 'SENAYT', 'SENAITE',
+    # Second surname variations
+    'DAGNIE', 'DAGNE', 'DAGINE', 'DAGNY', 'DAGNHE'
+})
+
 # ========== PER-GROUP STATE MANAGEMENT ==========
 # Message buffering (wait 30 seconds to collect multiple messages from same user)
 MESSAGE_BUFFER_DELAY = 30  # seconds
@@ -287,8 +371,10 @@ user_edit_mode_tasks = defaultdict(dict)  # {chat_id: {user_id: asyncio.Task}}
 admin_search_mode = defaultdict(dict)  # {chat_id: {user_id: True/False}}
 
 # Track processed messages (to avoid re-analyzing messages when bot was offline)
-# Uses composite keys (chat_id, message_id, thread_id) to support multi-group
-processed_message_ids = set()  # Set of tuples: (chat_id, message_id, thread_id)
+# Uses composite keys (chat_id, message_id, thread_id) to support multi-group,
+# packed into a single int (see pack_message_key) so the set holds one object
+# per message instead of a tuple plus three ints
+processed_message_ids = set()  # Set of packed ints
 
 # ========== PAYMENT REASONS ==========
 PAYMENT_REASONS = {
@@ -460,31 +546,165 @@ def load_houses_for_group(chat_id: int) -> dict:
         house_maps[chat_id] = {}
         return {}
 
-# Load processed message IDs (composite keys: chat_id, message_id, thread_id)
+# Processed message IDs (composite keys: chat_id, message_id, thread_id) live in
+# a SQLite DB in WAL mode so each new key is a single INSERT OR IGNORE instead
+# of rewriting an ever-growing JSON snapshot. The in-memory set stays the
+# source of truth for membership checks.
+_MESSAGE_ID_BITS = 64
+_THREAD_ID_BITS = 32
+
+def pack_message_key(chat_id, message_id, thread_id=None):
+    """Pack (chat_id, message_id, thread_id) into one int (lossless, chat_id may be negative)"""
+    return (((chat_id << _MESSAGE_ID_BITS) | message_id) << _THREAD_ID_BITS) | (thread_id or 0)
+
+def unpack_message_key(key):
+    """Inverse of pack_message_key; a thread_id of 0 means no thread"""
+    thread_id = key & ((1 << _THREAD_ID_BITS) - 1)
+    key >>= _THREAD_ID_BITS
+    message_id = key & ((1 << _MESSAGE_ID_BITS) - 1)
+    return key >> _MESSAGE_ID_BITS, message_id, thread_id or None
+
+def _processed_key(key):
+    """Serialize a packed message key to its DB key (kept as a JSON list for compatibility)"""
+    return json.dumps(list(unpack_message_key(key)))
+
+processed_db = sqlite3.connect(PROCESSED_MESSAGES_DB, isolation_level=None, check_same_thread=False)
+processed_db.execute("PRAGMA journal_mode=WAL")
+processed_db.execute("PRAGMA synchronous=NORMAL")
+processed_db.execute("CREATE TABLE IF NOT EXISTS seen(key TEXT PRIMARY KEY)")
+
+def _insert_processed_keys(keys):
+    """Insert many keys in one transaction (autocommit mode would commit per row)"""
+    processed_db.execute("BEGIN")
+    try:
+        processed_db.executemany("INSERT OR IGNORE INTO seen VALUES(?)",
+                                 [(_processed_key(item),) for item in keys])
+        processed_db.execute("COMMIT")
+    except Exception:
+        processed_db.execute("ROLLBACK")
+        raise
+
 try:
-    with open(PROCESSED_MESSAGES_FILE, 'r', encoding='utf-8') as f:
-        loaded_data = json.load(f)
-        # Convert list of lists back to set of tuples
-        processed_message_ids = set(tuple(item) for item in loaded_data)
+    processed_message_ids = set(pack_message_key(*json.loads(row[0])) for row in processed_db.execute("SELECT key FROM seen"))
+    # One-time migration from the old JSON snapshot
+    if not processed_message_ids and os.path.exists(PROCESSED_MESSAGES_FILE):
+        with open(PROCESSED_MESSAGES_FILE, 'r', encoding='utf-8') as f:
+            processed_message_ids = set(pack_message_key(*item) for item in json.load(f))
+        _insert_processed_keys(processed_message_ids)
+        logger.info(f"✓ Migrated {len(processed_message_ids)} processed message IDs from {PROCESSED_MESSAGES_FILE}")
     logger.info(f"✓ Loaded {len(processed_message_ids)} processed message IDs")
-except:
-    logger.info(f"✓ Starting fresh - no processed messages file found")
+except Exception as e:
+    logger.info(f"✓ Starting fresh - could not load processed messages: {e}")
     processed_message_ids = set()
 
-def save_processed_messages():
-    """Save processed message IDs to file (as list of lists for JSON compatibility)"""
+def compact_processed_db():
+    """Fold the WAL (the append-only log of new keys) back into the main DB file"""
     try:
-        with open(PROCESSED_MESSAGES_FILE, 'w', encoding='utf-8') as f:
-            # Convert set of tuples to list of lists for JSON serialization
-            json.dump([list(item) for item in processed_message_ids], f)
+        processed_db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not compact {PROCESSED_MESSAGES_DB}: {e}")
+
+# Start each run from a compact DB (the WAL can grow large after a crash)
+compact_processed_db()
+
+def mark_message_processed(message_key):
+    """Record a single processed message key (in memory and in the DB)"""
+    if message_key in processed_message_ids:
+        return
+    processed_message_ids.add(message_key)
+    try:
+        processed_db.execute("INSERT OR IGNORE INTO seen VALUES(?)", (_processed_key(message_key),))
+    except Exception as e:
+        logger.error(f"Error saving processed message {unpack_message_key(message_key)}: {e}")
+
+def mark_messages_processed(message_keys):
+    """Record several processed message keys in one DB transaction"""
+    new_keys = [key for key in message_keys if key not in processed_message_ids]
+    if not new_keys:
+        return
+    processed_message_ids.update(new_keys)
+    try:
+        _insert_processed_keys(new_keys)
     except Exception as e:
         logger.error(f"Error saving processed messages: {e}")
 
+# SHA-256 digests of receipt images that were already saved to a sheet. A
+# forwarded or re-posted receipt has the same bytes, so history scans can
+# skip it right after download instead of paying for OCR again. (Exact
+# hashes only: a perceptual hash would match different receipts made from
+# the same bank template.)
+processed_db.execute("CREATE TABLE IF NOT EXISTS saved_images(digest BLOB PRIMARY KEY)")
+try:
+    saved_image_digests = {row[0] for row in processed_db.execute("SELECT digest FROM saved_images")}
+except Exception as e:
+    logger.warning(f"⚠️ Could not load saved image hashes: {e}")
+    saved_image_digests = set()
+
+def image_digest(image_bytes):
+    """Content hash used to recognize a receipt image that was already saved"""
+    return hashlib.sha256(image_bytes).digest()
+
+def remember_saved_images(digests):
+    """Record the digests of images whose receipts were saved (one transaction)"""
+    new_digests = [digest for digest in set(digests) if digest not in saved_image_digests]
+    if not new_digests:
+        return
+    saved_image_digests.update(new_digests)
+    try:
+        processed_db.execute("BEGIN")
+        try:
+            processed_db.executemany("INSERT OR IGNORE INTO saved_images VALUES(?)",
+                                     [(digest,) for digest in new_digests])
+            processed_db.execute("COMMIT")
+        except Exception:
+            processed_db.execute("ROLLBACK")
+            raise
+    except Exception as e:
+        logger.error(f"Error saving image hashes: {e}")
+
 
 # ========== GOOGLE SHEETS ==========
 # Ethiopian months in order for tracking (must match ETHIOPIAN_MONTHS_LIST)
 ETHIOPIAN_MONTHS = ETHIOPIAN_MONTHS_LIST
 
+# (month, amount column index, FT No column index) for every month, 0-based.
+# Each month spans 2 columns after No, H.No, Name: Amount at 3 + 2*i, FT No next to it.
+MONTH_COLUMNS = tuple((month, 3 + month_idx * 2, 4 + month_idx * 2)
+                      for month_idx, month in enumerate(ETHIOPIAN_MONTHS))
+# All Amount cells of a row as one strided slice: row[AMOUNT_COLUMNS] gives the
+# amounts in ETHIOPIAN_MONTHS order (shorter if the row is ragged)
+AMOUNT_COLUMNS = slice(3, 3 + len(ETHIOPIAN_MONTHS) * 2, 2)
+
+def parse_amount(value):
+    """Parse a sheet amount cell ('1,250.00', 1250, '') to float.
+
+    Returns None for empty or non-numeric cells. Empty cells (the vast
+    majority) are rejected without going through float()/ValueError.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value.replace(',', ''))
+    except ValueError:
+        return None
+
+def find_totals_row(values):
+    """Return the index of the TOTAL row ('TOTAL' in column B), or None.
+
+    Searched from the bottom up: setup_sheets writes it after the last house,
+    so usually only the rows appended later (web app submits) sit below it.
+    """
+    for idx in range(len(values) - 1, 1, -1):  # Rows 1-2 are headers
+        row = values[idx]
+        if len(row) > 1 and row[1] == 'TOTAL':
+            return idx
+    return None
+
 # Cache for per-group Google Sheets: {chat_id: {reason: sheet}}
 sheets_cache = {}
 
@@ -672,6 +892,187 @@ def setup_sheets(chat_id: int):
         logger.error(f"✗ Sheets error: {e}")
         return None
 
+# Sheet reads are blocking HTTP calls; run them on this pool so they don't
+# stall the event loop (and per-sheet fallback reads can run concurrently).
+_sheets_pool = ThreadPoolExecutor(max_workers=len(PAYMENT_REASONS), thread_name_prefix="sheets")
+
+def _batch_get_reason_values(sheets, reasons, value_render_option=None):
+    """Read all reason tabs with a single spreadsheets.values.batchGet call"""
+    spreadsheet = sheets[reasons[0]].spreadsheet
+    ranges = [gspread.utils.absolute_range_name(sheets[reason].title) for reason in reasons]
+    params = {'valueRenderOption': value_render_option} if value_render_option else None
+    response = spreadsheet.values_batch_get(ranges, params=params)
+    value_ranges = response.get('valueRanges', [])
+    # Pad rows like get_all_values() does so callers can keep indexing freely
+    return {reason: gspread.utils.fill_gaps(value_range.get('values', [[]]))
+            for reason, value_range in zip(reasons, value_ranges)}
+
+# Short-lived cache of sheet values so repeated admin clicks are served from
+# RAM. After the TTL expires the spreadsheet's Drive modifiedTime is checked
+# (a tiny request) and the values are only re-downloaded if it changed.
+SHEET_VALUES_TTL = 60  # seconds
+_sheet_values_cache = {}  # {(spreadsheet_id, render_option): (fetched_at, modified_time, {reason: values})}
+# Bumped by every invalidation, so a read that started before one of our own
+# writes can't store its pre-write values afterwards ({spreadsheet_id: generation})
+_sheet_values_generation = {}
+
+def _get_spreadsheet_modified_time(spreadsheet):
+    """Return the Drive modifiedTime of a spreadsheet (used as a revision token)"""
+    response = spreadsheet.client.request(
+        'get', f'https://www.googleapis.com/drive/v3/files/{spreadsheet.id}',
+        params={'fields': 'modifiedTime', 'supportsAllDrives': True})
+    return response.json().get('modifiedTime')
+
+def invalidate_sheet_values_cache(sheet):
+    """Drop cached values for the spreadsheet a worksheet belongs to (call after writing)"""
+    spreadsheet_id = getattr(getattr(sheet, 'spreadsheet', None), 'id', None)
+    if spreadsheet_id is None:
+        return
+    _sheet_values_generation[spreadsheet_id] = _sheet_values_generation.get(spreadsheet_id, 0) + 1
+    # list() snapshots the keys atomically; this may run on a worker thread
+    for cache_key in [key for key in list(_sheet_values_cache) if key[0] == spreadsheet_id]:
+        _sheet_values_cache.pop(cache_key, None)
+
+def _store_sheet_values(cache_key, generation, entry):
+    """Cache a fetch result unless the spreadsheet was invalidated since it started"""
+    if _sheet_values_generation.get(cache_key[0], 0) == generation:
+        _sheet_values_cache[cache_key] = entry
+
+def invalidate_sheets_cache(chat_id):
+    """Forget a group's opened sheets (and their cached values) so setup_sheets reopens them"""
+    sheets = sheets_cache.pop(chat_id, None)
+    for sheet in (sheets or {}).values():
+        invalidate_sheet_values_cache(sheet)
+    return sheets is not None
+
+async def fetch_all_reason_values(sheets, value_render_option=None, max_age=SHEET_VALUES_TTL):
+    """Fetch the values of every reason sheet in one round-trip.
+
+    Returns {reason: values} in PAYMENT_REASONS order. Results are cached for
+    SHEET_VALUES_TTL seconds, then revalidated against the spreadsheet's
+    modifiedTime. Uses one batchGet for all tabs; if that fails, falls back to
+    concurrent get_all_values() calls. Missing sheets and sheets that fail to
+    load are skipped (and logged). Callers must not mutate the returned rows.
+
+    Pass value_render_option='UNFORMATTED_VALUE' to get numeric cells as
+    Python numbers instead of formatted strings (note that house numbers in
+    column B then come back as ints too).
+
+    Pass max_age=0 to always read the sheets now (duplicate checks): writes
+    from the web app or manual edits don't invalidate this cache, and Drive's
+    modifiedTime can lag behind them.
+    """
+    if not sheets:
+        return {}
+
+    reasons = [reason for reason in PAYMENT_REASONS.keys() if sheets.get(reason)]
+    if not reasons:
+        return {}
+
+    loop = asyncio.get_running_loop()
+    spreadsheet = sheets[reasons[0]].spreadsheet
+    cache_key = (spreadsheet.id, value_render_option)
+    cached = _sheet_values_cache.get(cache_key)
+    generation = _sheet_values_generation.get(spreadsheet.id, 0)
+    now = time.monotonic()
+
+    if cached and now - cached[0] < max_age:
+        return cached[2]
+
+    modified_time = None
+    try:
+        modified_time = await loop.run_in_executor(_sheets_pool, _get_spreadsheet_modified_time, spreadsheet)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not check spreadsheet revision: {e}")
+
+    if max_age and cached and modified_time and modified_time == cached[1]:
+        _store_sheet_values(cache_key, generation, (now, modified_time, cached[2]))
+        return cached[2]
+
+    try:
+        reason_values = await loop.run_in_executor(
+            _sheets_pool, _batch_get_reason_values, sheets, reasons, value_render_option)
+        _store_sheet_values(cache_key, generation, (now, modified_time, reason_values))
+        return reason_values
+    except Exception as e:
+        logger.warning(f"⚠️ batchGet failed, reading sheets one by one: {e}")
+
+    results = await asyncio.gather(
+        *[loop.run_in_executor(_sheets_pool, partial(sheets[reason].get_all_values,
+                                                     value_render_option=value_render_option))
+          for reason in reasons],
+        return_exceptions=True)
+
+    reason_values = {}
+    for reason, result in zip(reasons, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error reading {reason}: {result}")
+            continue
+        reason_values[reason] = result
+    return reason_values
+
+# Column-B lookup tables for the cached values above: {house_number: row_index}.
+# Rebuilt only when fetch_all_reason_values hands back a different values list.
+_house_index_cache = {}  # {(spreadsheet_id, sheet_title): (values, house_index)}
+
+def get_house_index(sheet, values):
+    """Return {house_number: row_index} for a reason sheet's data rows (first match wins)"""
+    cache_key = (sheet.spreadsheet.id, sheet.title)
+    cached = _house_index_cache.get(cache_key)
+    if cached and cached[0] is values:
+        return cached[1]
+
+    house_index = {}
+    # Every row below the headers: houses appended later (web app append_row)
+    # sit below the TOTAL row, which is the only one skipped
+    for i, row in enumerate(values[2:], start=2):
+        if len(row) > 1:
+            house = str(row[1]).strip()
+            if house and house != 'TOTAL':
+                house_index.setdefault(house, i)
+    _house_index_cache[cache_key] = (values, house_index)
+    return house_index
+
+def build_txid_index(reason_values):
+    """Return {txid: (reason, row_number, col_idx)} for every ID in the FT No columns.
+
+    Cells holding several payments ('FT1, FT2') contribute each ID; row_number
+    is the 1-based sheet row. The first occurrence wins.
+    """
+    txid_index = {}
+    for reason, values in reason_values.items():
+        for row_number, row in enumerate(values[2:], start=3):  # Skip 2 header rows
+            # FT No columns: every even column starting from column E=4
+            for col_idx in range(4, len(row), 2):
+                cell_value = str(row[col_idx]).strip()
+                if cell_value:
+                    for t in cell_value.split(','):
+                        t = t.strip()
+                        if t:
+                            txid_index.setdefault(t, (reason, row_number, col_idx))
+    return txid_index
+
+# TXID lookup tables for the cached values, rebuilt only when
+# fetch_all_reason_values hands back a different result
+_txid_index_cache = {}  # {spreadsheet_id: (reason_values, txid_index)}
+
+def get_txid_index(spreadsheet_id, reason_values):
+    """Cached build_txid_index() for one spreadsheet's values"""
+    cached = _txid_index_cache.get(spreadsheet_id)
+    if cached and cached[0] is reason_values:
+        return cached[1]
+    txid_index = build_txid_index(reason_values)
+    _txid_index_cache[spreadsheet_id] = (reason_values, txid_index)
+    return txid_index
+
+def collect_recorded_txids(reason_values):
+    """Return the set of every transaction ID already in the FT No columns.
+
+    Used by the history scanner so duplicate checks are set lookups instead
+    of a full read of every sheet per receipt.
+    """
+    return set(build_txid_index(reason_values))
+
 # ========== SIMPLE SAVE TO SHEETS (for history scanner) ==========
 def save_to_sheets(sheets, house_number, amount, txid, month, reason, chat_id):
     """
@@ -744,6 +1145,7 @@ def save_to_sheets(sheets, house_number, amount, txid, month, reason, chat_id):
                           value_input_option='USER_ENTERED')
         target_sheet.update(f'{ftno_col}{row_index}', [[final_txid]], 
                           value_input_option='USER_ENTERED')
+        invalidate_sheet_values_cache(target_sheet)
         
         logger.info(f"✓ Saved to {reason}: House {house_number}, Month {month}")
         return True
@@ -753,12 +1155,260 @@ def save_to_sheets(sheets, house_number, amount, txid, month, reason, chat_id):
         return False
 
 
+# ========== BATCHED SAVES (for history scanner) ==========
+# A backfill can save hundreds of receipts. Instead of two cell updates per
+# receipt, stage them in memory and write each reason sheet with a single
+# batch_update every SCAN_SAVE_BATCH_SIZE receipts (and at the end).
+SCAN_SAVE_BATCH_SIZE = 50
+
+def queue_sheet_save(pending, sheets, house_number, amount, txid, month, reason, msg_key=None,
+                     reason_values=None):
+    """
+    Stage a payment for flush_sheet_saves(). Same cell rules as save_to_sheets().
+    pending is {reason: {'sheet', 'values', 'cells': {(house, month): [(amount, txid, msg_key)]}}}.
+    reason_values ({reason: values}, e.g. loaded by the scan up front) is used
+    to check the house exists without a blocking sheet read.
+    Returns False if the house or sheet is not found.
+    """
+    target_sheet = sheets.get(reason)
+    if not target_sheet:
+        target_sheet = sheets.get('other')
+        reason = 'other'
+    
+    if not target_sheet:
+        logger.error(f"No sheet found for reason '{reason}'")
+        return False
+    
+    batch = pending.get(reason)
+    if batch is None:
+        # Houses are checked against the preloaded values (one read per reason
+        # per batch without them); the cells themselves are re-read when the
+        # batch is written
+        values = (reason_values or {}).get(reason)
+        if values is None:
+            values = target_sheet.get_all_values()
+        batch = {'sheet': target_sheet, 'values': values, 'cells': {}}
+        pending[reason] = batch
+    
+    house_key = str(house_number).strip()
+    if house_key not in get_house_index(target_sheet, batch['values']):
+        logger.warning(f"House {house_number} not found in sheet {reason}")
+        return False
+    
+    if month not in ETHIOPIAN_MONTHS:
+        logger.warning(f"Month '{month}' not recognized, using Tir")
+        month = 'Tir'
+    
+    batch['cells'].setdefault((house_key, month), []).append((amount, txid, msg_key))
+    return True
+
+def flush_sheet_saves(pending):
+    """Write all staged payments (one batch_update per reason sheet).
+
+    Each sheet is read again right before its write, so payments recorded
+    since the batch was staged (live receipts, the web app, manual edits) are
+    appended to instead of overwritten.
+    Returns the msg_keys of the payments that were written; reasons whose
+    write failed are dropped and logged.
+    """
+    saved_keys = []
+    for reason, batch in pending.items():
+        if not batch['cells']:
+            continue
+        try:
+            values = batch['sheet'].get_all_values()
+        except Exception as e:
+            logger.error(f"Batch save error for {reason}: {e}")
+            continue
+        house_index = get_house_index(batch['sheet'], values)
+        data = []
+        batch_keys = []
+        for (house_key, month), payments in batch['cells'].items():
+            row_idx = house_index.get(house_key)
+            if row_idx is None:
+                logger.warning(f"House {house_key} no longer found in sheet {reason}")
+                continue
+            amount_col_idx = 3 + ETHIOPIAN_MONTHS.index(month) * 2
+            ftno_col_idx = amount_col_idx + 1
+            row = values[row_idx]
+            current_amount = row[amount_col_idx].strip() if len(row) > amount_col_idx else ''
+            current_txid = row[ftno_col_idx].strip() if len(row) > ftno_col_idx else ''
+            
+            # Append to existing values like save_to_sheets does
+            amounts = [str(amount) for amount, _, _ in payments if amount]
+            if current_amount:
+                final_amount = f"={'+'.join([current_amount] + amounts)}"
+            elif len(amounts) > 1:
+                final_amount = f"={'+'.join(amounts)}"
+            else:
+                final_amount = float(amounts[0]) if amounts else 0
+            final_txid = ", ".join([t for t in [current_txid] + [txid for _, txid, _ in payments] if t])
+            batch_keys.extend(key for _, _, key in payments if key is not None)
+            
+            data.append({'range': gspread.utils.rowcol_to_a1(row_idx + 1, amount_col_idx + 1),
+                         'values': [[final_amount]]})
+            data.append({'range': gspread.utils.rowcol_to_a1(row_idx + 1, ftno_col_idx + 1),
+                         'values': [[final_txid]]})
+        if not data:
+            continue
+        try:
+            batch['sheet'].batch_update(data, value_input_option='USER_ENTERED')
+            saved_keys.extend(batch_keys)
+            logger.info(f"✓ Saved {len(data) // 2} cell(s) to {reason} in one batch")
+        except Exception as e:
+            logger.error(f"Batch save error for {reason}: {e}")
+        invalidate_sheet_values_cache(batch['sheet'])
+    pending.clear()
+    return saved_keys
+
+
 # ========== OCR ==========
+# OCR is a blocking HTTP call; run it on a dedicated pool so the event loop
+# keeps serving other chats. Submit with loop.run_in_executor(_ocr_pool, ...)
+# directly - asyncio.to_thread would also copy the contextvars context.
+# OCR.space does the recognition, so the workers only wait on the network:
+# threads are enough (no process pool needed). Pool sizes can be tuned to
+# the OCR.space plan's rate limit with OCR_WORKERS / SCAN_OCR_WORKERS.
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '4'))
+SCAN_OCR_WORKERS = int(os.getenv('SCAN_OCR_WORKERS', '4'))
+_ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+# History scans get their own pool so a large backfill never queues ahead of
+# receipts that are being posted right now
+_scan_ocr_pool = ThreadPoolExecutor(max_workers=SCAN_OCR_WORKERS, thread_name_prefix="scan-ocr")
+
+# One long-lived HTTP session for OCR.space: keep-alive connections are reused
+# across images and retries instead of a new TCP + TLS handshake per request.
+# Sized so every OCR worker thread can hold its own pooled connection.
+_ocr_session = requests.Session()
+_ocr_session.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=1, pool_maxsize=OCR_WORKERS + SCAN_OCR_WORKERS))
+
+# History scans download and OCR several photos at once. Downloads are capped
+# separately to stay well inside Telegram's flood limits.
+SCAN_WORKERS = 8
+SCAN_DOWNLOAD_CONCURRENCY = 4
+SCAN_DOWNLOAD_PART_SIZE_KB = 512  # Largest part size MTProto allows
+
+# Photos whose largest size is below either limit can't hold a readable
+# receipt (avatars, stickers-as-photos, thumbnails); scans skip them before
+# downloading instead of paying for the download and OCR first
+MIN_RECEIPT_PIXELS = 200 * 200
+MIN_RECEIPT_BYTES = 5000
+
+def is_receipt_sized(photo):
+    """Check a Telethon photo's largest size against the receipt minimums (no download)"""
+    largest_area = 0
+    largest_bytes = 0
+    for size in photo.sizes:
+        largest_area = max(largest_area, getattr(size, 'w', 0) * getattr(size, 'h', 0))
+        # PhotoSize has .size, PhotoSizeProgressive has .sizes (one per progressive step)
+        largest_bytes = max(largest_bytes, getattr(size, 'size', 0) or max(getattr(size, 'sizes', None) or [0]))
+    if not largest_area:
+        return True  # No size metadata: let OCR decide
+    return largest_area >= MIN_RECEIPT_PIXELS and largest_bytes >= MIN_RECEIPT_BYTES
+
+async def download_photo_bytes(client, photo):
+    """
+    Download the largest size of a Telethon photo as bytes.
+    Calls download_file directly with 512 KB parts (download_media picks
+    smaller parts, i.e. more round-trips per file); falls back to
+    download_media if the photo has no downloadable size.
+    """
+    from telethon import types
+    
+    sizes = [size for size in photo.sizes
+             if isinstance(size, (types.PhotoSize, types.PhotoSizeProgressive))]
+    if not sizes:
+        return await client.download_media(photo, bytes)
+    
+    def byte_size(size):
+        return max(size.sizes) if isinstance(size, types.PhotoSizeProgressive) else size.size
+    
+    largest = max(sizes, key=byte_size)
+    location = types.InputPhotoFileLocation(
+        id=photo.id,
+        access_hash=photo.access_hash,
+        file_reference=photo.file_reference,
+        thumb_size=largest.type
+    )
+    return await client.download_file(location, bytes,
+                                      part_size_kb=SCAN_DOWNLOAD_PART_SIZE_KB,
+                                      file_size=byte_size(largest),
+                                      dc_id=photo.dc_id)
+
+async def run_message_pipeline(messages, handle, workers=SCAN_WORKERS):
+    """
+    Feed items from an async iterator to `workers` concurrent handle() calls.
+    Fetching runs ahead of processing through a bounded queue, so slow
+    downloads/OCR don't stall iter_messages. handle() should catch its own
+    errors; an error from the iterator is re-raised once the workers finish.
+    """
+    queue = asyncio.Queue(maxsize=workers * 4)
+    
+    async def produce():
+        try:
+            async for item in messages:
+                await queue.put(item)
+        finally:
+            # One stop marker per worker
+            for _ in range(workers):
+                await queue.put(None)
+    
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await handle(item)
+    
+    results = await asyncio.gather(produce(), *[work() for _ in range(workers)],
+                                   return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+# Photos larger than this (longest side, px) are shrunk before upload. Receipt
+# text stays well readable at this size and OCR.space gets a smaller file to
+# transfer and process.
+OCR_MAX_DIMENSION = 1600
+
+def prepare_image_for_ocr(image_bytes):
+    """Downscale oversized images to OCR_MAX_DIMENSION and re-encode as grayscale JPEG.
+
+    Images that are already small enough (most Telegram photos) are returned
+    untouched, without re-encoding. Any decoding problem also returns the
+    original bytes.
+    """
+    if Image is None:
+        return image_bytes
+    try:
+        # Lazy: only reads the header. For bytes input BytesIO shares the
+        # buffer instead of copying it
+        img = Image.open(io.BytesIO(image_bytes))
+        if max(img.size) <= OCR_MAX_DIMENSION:
+            return image_bytes
+        original_size = img.size
+        img.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.convert('L').save(buffer, format='JPEG', quality=90)
+        logger.info(f"📐 Downscaled image {original_size[0]}x{original_size[1]} -> {img.size[0]}x{img.size[1]} for OCR")
+        return buffer.getvalue()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not preprocess image, sending original: {e}")
+        return image_bytes
+
 def extract_text_from_image(image_bytes):
-    """Extract text from image using OCR with retry logic"""
+    """Extract text from image using OCR with retry logic.
+
+    Accepts any bytes-like object (bytes, bytearray, memoryview) so callers
+    can hand over downloaded buffers without copying them first.
+    """
     max_retries = 3
     timeout_seconds = 45
     
+    # Shrink huge images once, before any upload attempt
+    image_bytes = prepare_image_for_ocr(image_bytes)
+    
     for attempt in range(1, max_retries + 1):
         try:
             if attempt > 1:
@@ -776,10 +1426,10 @@ def extract_text_from_image(image_bytes):
             }
 
             files = {'file': ('image.jpg', image_bytes, 'image/jpeg')}
-            response = requests.post(OCR_API_URL,
-                                     files=files,
-                                     data=payload,
-                                     timeout=timeout_seconds)
+            response = _ocr_session.post(OCR_API_URL,
+                                         files=files,
+                                         data=payload,
+                                         timeout=timeout_seconds)
 
             if response.status_code == 200:
                 result = response.json()
@@ -811,6 +1461,31 @@ def extract_text_from_image(image_bytes):
     logger.warning(f"✗ OCR failed after {max_retries} attempts")
     return ""
 
+# OCR text of recently scanned photos keyed by the image's SHA-256, so /rescan
+# and overlapping history scans don't send the same photo to OCR.space again
+OCR_CACHE_SIZE = 4096
+_ocr_cache = OrderedDict()  # {sha256 digest: text}, oldest first
+_ocr_cache_lock = threading.Lock()
+
+def extract_text_from_image_cached(image_bytes):
+    """extract_text_from_image() with an in-memory LRU cache (failed OCR is not cached)"""
+    digest = hashlib.sha256(image_bytes).digest()
+    with _ocr_cache_lock:
+        text = _ocr_cache.get(digest)
+        if text is not None:
+            _ocr_cache.move_to_end(digest)
+            logger.info(f"📸 OCR cache hit: {len(text)} chars")
+            return text
+    
+    text = extract_text_from_image(image_bytes)
+    if text:
+        with _ocr_cache_lock:
+            _ocr_cache[digest] = text
+            _ocr_cache.move_to_end(digest)
+            if len(_ocr_cache) > OCR_CACHE_SIZE:
+                _ocr_cache.popitem(last=False)
+    return text
+
 
 # ========== RECEIPT-SPECIFIC EXTRACTION ==========
 
@@ -858,6 +1533,26 @@ def normalize_amount_lines(text):
     return '\n'.join(normalized_lines)
 
 
+# Receipt patterns are compiled once at import; they run on every OCR'd
+# receipt, in priority order, so they stay separate patterns
+_SETTLED_AMOUNT_RE = re.compile(r'settled\s+amount[:\s]*ETB\s*([0-9,]+(?:\.[0-9]{2})?)', re.IGNORECASE | re.DOTALL)
+_WITHOUT_VAT_AMOUNT_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:subtotal|sub-total|sub total|before vat|excluding vat|excl\.? vat)[:\s]*(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)',
+    r'(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)\s*(?:before vat|excluding vat|excl\.? vat)',
+)]
+_DEBITED_AMOUNT_RE = re.compile(r'ETB\s*([0-9,]+(?:\.[0-9]{2})?)\s+debited', re.IGNORECASE)
+_STANDARD_AMOUNT_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:debited|Debited|DEBITED).*?ETB\s*([0-9,]+(?:\.[0-9]{2})?)',
+    r'(?:Amount|amount|AMOUNT).*?(?:ETB|birr)?\s*([0-9,]+(?:\.[0-9]{2})?)',
+    r'(?:ETB|birr|ብር)\s*([0-9,]+(?:\.[0-9]{2})?)',
+    r'([0-9,]+(?:\.[0-9]{2})?)\s*(?:ETB|birr|ብር)',
+)]
+_FALLBACK_AMOUNT_RES = [re.compile(pattern, re.MULTILINE | re.IGNORECASE) for pattern in (
+    # Just number followed by Birr (even if label is garbled)
+    r'(?:^|\n|\s)([0-9,]+\.00)\s*Birr',
+    r'(?:^|\n|\s)([0-9,]+\.[0-9]{2})\s*(?:Birr|ETB)',
+)]
+
 def extract_amount_from_receipt(text):
     """Extract amount from receipt (WITHOUT VAT if possible)"""
     logger.info("Extracting AMOUNT (without VAT)...")
@@ -868,8 +1563,7 @@ def extract_amount_from_receipt(text):
     # Try normalized text first, then fall back to original text
     for search_text in [normalized_text, text]:
         # Priority 1: Look for "Settled Amount" specifically (Zemen Bank format)
-        settled_pattern = r'settled\s+amount[:\s]*ETB\s*([0-9,]+(?:\.[0-9]{2})?)'
-        match = re.search(settled_pattern, search_text, re.IGNORECASE | re.DOTALL)
+        match = _SETTLED_AMOUNT_RE.search(search_text)
         if match:
             amount_str = match.group(1).replace(',', '')
             try:
@@ -881,13 +1575,8 @@ def extract_amount_from_receipt(text):
                 pass
         
         # Priority 2: Look for amounts specifically marked as WITHOUT VAT or Subtotal
-        without_vat_patterns = [
-            r'(?:subtotal|sub-total|sub total|before vat|excluding vat|excl\.? vat)[:\s]*(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)\s*(?:before vat|excluding vat|excl\.? vat)',
-        ]
-
-        for pattern in without_vat_patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
+        for pattern in _WITHOUT_VAT_AMOUNT_RES:
+            match = pattern.search(search_text)
             if match:
                 amount_str = match.group(1).replace(',', '')
                 try:
@@ -899,8 +1588,7 @@ def extract_amount_from_receipt(text):
                     pass
 
         # Priority 3: Look for "ETB X debited" pattern (base amount, not total)
-        debited_pattern = r'ETB\s*([0-9,]+(?:\.[0-9]{2})?)\s+debited'
-        match = re.search(debited_pattern, search_text, re.IGNORECASE)
+        match = _DEBITED_AMOUNT_RE.search(search_text)
         if match:
             amount_str = match.group(1).replace(',', '')
             try:
@@ -915,16 +1603,9 @@ def extract_amount_from_receipt(text):
                 pass
 
         # Priority 4: Standard amount extraction (fallback)
-        standard_patterns = [
-            r'(?:debited|Debited|DEBITED).*?ETB\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:Amount|amount|AMOUNT).*?(?:ETB|birr)?\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:ETB|birr|ብር)\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'([0-9,]+(?:\.[0-9]{2})?)\s*(?:ETB|birr|ብር)',
-        ]
-
         all_amounts = []
-        for pattern in standard_patterns:
-            for match in re.finditer(pattern, search_text, re.IGNORECASE):
+        for pattern in _STANDARD_AMOUNT_RES:
+            for match in pattern.finditer(search_text):
                 amount_str = match.group(1).replace(',', '')
                 try:
                     amount_val = float(amount_str)
@@ -949,14 +1630,8 @@ def extract_amount_from_receipt(text):
     # Just find "1000.00 Birr" or similar standalone amounts
     logger.info("Standard patterns failed, trying final fallback for standalone amounts...")
     
-    fallback_patterns = [
-        # Just number followed by Birr (even if label is garbled)
-        r'(?:^|\n|\s)([0-9,]+\.00)\s*Birr',
-        r'(?:^|\n|\s)([0-9,]+\.[0-9]{2})\s*(?:Birr|ETB)',
-    ]
-    
-    for pattern in fallback_patterns:
-        for match in re.finditer(pattern, search_text, re.MULTILINE | re.IGNORECASE):
+    for pattern in _FALLBACK_AMOUNT_RES:
+        for match in pattern.finditer(search_text):
             amount_str = match.group(1).replace(',', '')
             try:
                 amount_val = float(amount_str)
@@ -991,6 +1666,39 @@ def extract_date_from_receipt(text):
     return ""
 
 
+# Priority 1: Payment order number or Reference No (Zemen Bank specific)
+_ZEMEN_TXID_RES = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]*\n?\s*([A-Z0-9]{10,})',
+    r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]+([A-Z0-9]{10,})',
+    r'(?:thy\s+HY\s+PiP\s+Payment\s+order\s+number)[:\s]*\n?\s*([A-Z0-9]{10,})',  # OCR-specific pattern
+)]
+# Priority 2: Telebirr invoice number (e.g., DAE3SX92FL, DAE15X922FL)
+_TELEBIRR_INVOICE_RES = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    # Invoice No: DAE3SX92FL format (after label)
+    r'(?:invoice\s+no\.?|Ph?ES\s+PC)[:\s]*\n?\s*([A-Z]{3}[A-Z0-9]{7,12})',
+    # Standalone format (no label, just the invoice number itself)
+    r'\b([A-Z]{3}[0-9][A-Z0-9]{2}[A-Z]{2}[A-Z0-9]{2,5})\b',
+)]
+# Priority 3: Transaction ID variants
+_LABELED_TXID_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    # Transaction ID variants WITH COLON
+    r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)\s*:\s*([A-Za-z0-9]+)',
+
+    # Transaction ID variants WITHOUT COLON (just whitespace)
+    r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)\s+([A-Za-z0-9]+)',
+
+    # VAT invoice/receipt patterns with optional parentheses
+    r'(?:reference\s+no\.?\s*\(vat\s+invoice\s+no\.?\)|vat\s+invoice\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
+    r'(?:vat\s+receipt\s+number|vat\s+receipt\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
+    r'(?:vat\s+invoice\s+number|vat\s+invoice\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
+
+    # Generic reference patterns (but NOT payment reason)
+    r'(?:reference\s+number|ref\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
+)]
+_HYPHENATED_TXID_RE = re.compile(r'([A-Za-z0-9]+-[A-Za-z0-9]+-[A-Za-z0-9]+)')
+_REASON_TOKEN_RE = re.compile(r'([A-Z0-9]{8,})', re.IGNORECASE)
+_ALNUM_TXID_RE = re.compile(r'\b([A-Z]{2}[A-Za-z0-9]{8,}|[0-9]{2}[A-Z]{2,}[A-Z0-9]{6,}|[A-Z0-9]{10,})\b')
+
 def extract_txid_from_receipt(text):
     """Extract transaction ID from receipt"""
     logger.info("Extracting TRANSACTION ID...")
@@ -1005,14 +1713,8 @@ def extract_txid_from_receipt(text):
 
     # Priority 1: Payment order number or Reference No (Zemen Bank specific)
     # Look for patterns near these labels, even if the value is on a different line
-    zemen_patterns = [
-        r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]*\n?\s*([A-Z0-9]{10,})',
-        r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]+([A-Z0-9]{10,})',
-        r'(?:thy\s+HY\s+PiP\s+Payment\s+order\s+number)[:\s]*\n?\s*([A-Z0-9]{10,})',  # OCR-specific pattern
-    ]
-    
-    for pattern in zemen_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    for pattern in _ZEMEN_TXID_RES:
+        match = pattern.search(text)
         if match:
             txid = match.group(1).strip()
             logger.info(f"🔍 Found candidate from Zemen pattern: {txid}")
@@ -1025,15 +1727,8 @@ def extract_txid_from_receipt(text):
 
     # Priority 2: Telebirr invoice number (e.g., DAE3SX92FL, DAE15X922FL)
     # Pattern: 3 letters + alphanumeric + 2-3 letters + more alphanumeric (10-15 chars total)
-    telebirr_invoice_patterns = [
-        # Invoice No: DAE3SX92FL format (after label)
-        r'(?:invoice\s+no\.?|Ph?ES\s+PC)[:\s]*\n?\s*([A-Z]{3}[A-Z0-9]{7,12})',
-        # Standalone format (no label, just the invoice number itself)
-        r'\b([A-Z]{3}[0-9][A-Z0-9]{2}[A-Z]{2}[A-Z0-9]{2,5})\b',
-    ]
-    
-    for pattern in telebirr_invoice_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    for pattern in _TELEBIRR_INVOICE_RES:
+        match = pattern.search(text)
         if match:
             txid = match.group(1).strip().upper()
             # Validate: 10-15 chars, starts with 3 letters, has mix of letters and numbers
@@ -1045,24 +1740,8 @@ def extract_txid_from_receipt(text):
                 return txid
 
     # Priority 3: Transaction ID variants
-    priority_patterns = [
-        # Transaction ID variants WITH COLON
-        r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)\s*:\s*([A-Za-z0-9]+)',
-
-        # Transaction ID variants WITHOUT COLON (just whitespace)
-        r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)\s+([A-Za-z0-9]+)',
-
-        # VAT invoice/receipt patterns with optional parentheses
-        r'(?:reference\s+no\.?\s*\(vat\s+invoice\s+no\.?\)|vat\s+invoice\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
-        r'(?:vat\s+receipt\s+number|vat\s+receipt\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
-        r'(?:vat\s+invoice\s+number|vat\s+invoice\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
-
-        # Generic reference patterns (but NOT payment reason)
-        r'(?:reference\s+number|ref\s+no\.?)\s*:\s*([A-Za-z0-9]+)',
-    ]
-
-    for pattern in priority_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _LABELED_TXID_RES:
+        match = pattern.search(text)
         if match:
             txid = match.group(1).strip()
             # Filter out common words and require mixed alphanumeric
@@ -1074,7 +1753,7 @@ def extract_txid_from_receipt(text):
                 return txid
 
     # Fallback: hyphenated format (e.g., ABC-DEF-123) but NOT dates or currency patterns
-    matches = re.findall(r'([A-Za-z0-9]+-[A-Za-z0-9]+-[A-Za-z0-9]+)', text)
+    matches = _HYPHENATED_TXID_RE.findall(text)
     for match in matches:
         # Must contain at least one letter (exclude pure date formats like 2025-11-05)
         # Also exclude currency-related patterns (ETB, BIRR, FTB) and payment reason patterns
@@ -1092,12 +1771,11 @@ def extract_txid_from_receipt(text):
     for i, line in enumerate(lines):
         if 'payment reason' in line.lower():
             # Find alphanumeric patterns in this line
-            reason_matches = re.findall(r'([A-Z0-9]{8,})', line, re.IGNORECASE)
+            reason_matches = _REASON_TOKEN_RE.findall(line)
             # Mark these for exclusion
             excluded_words.extend([m.lower() for m in reason_matches])
     
-    matches = re.findall(
-        r'\b([A-Z]{2}[A-Za-z0-9]{8,}|[0-9]{2}[A-Z]{2,}[A-Z0-9]{6,}|[A-Z0-9]{10,})\b', text)
+    matches = _ALNUM_TXID_RE.findall(text)
     for match in matches:
         # Must contain at least one letter and one number, and not be a common word or payment reason
         if (match.lower() not in excluded_words and not match.isnumeric()
@@ -1133,6 +1811,45 @@ def extract_name_from_receipt(text):
     return ""
 
 
+# Beneficiary extraction / validation patterns, compiled once at import
+_RECEIVER_LABEL_RE = re.compile(r'(?<!Source\s)(?<!Source Account\s)\b(Receiver Name|Beneficiary Name|Beneficiary)\b', re.IGNORECASE)
+_RECEIVER_LINE_RE = re.compile(r'\b(Receiver Name|Beneficiary Name|Beneficiary)\b', re.IGNORECASE)
+_SOURCE_RE = re.compile(r'Source', re.IGNORECASE)
+_LEADING_DIGIT_RE = re.compile(r'^\d')
+# Receipt field labels; a line containing any of them is a label, not a name
+_FIELD_KEYWORDS = ('TRANSACTION', 'REFERENCE', 'TYPE', 'BANK', 'NOTE', 'ACCOUNT',
+                   'AMOUNT', 'DATE', 'TIME', 'SOURCE', 'ETB', 'FTB')
+_NAME_PAIR_RE = re.compile(r'\b[A-Z]{2,}\s+[A-Z]{2,}')
+
+def _has_name_pair(line):
+    """True if the line has two consecutive uppercase words (same as _NAME_PAIR_RE.search)"""
+    # Fast path for the usual name line ("SEYOUM ASSEFA ..."): the first two
+    # words are plain capitals, which a split and a few str checks confirm
+    words = line.split(None, 2)
+    if len(words) >= 2:
+        first, second = words[0], words[1][:2]
+        if (len(first) >= 2 and first.isascii() and first.isalpha() and first.isupper()
+                and len(second) == 2 and second.isascii() and second.isalpha() and second.isupper()):
+            return True
+    return _NAME_PAIR_RE.search(line) is not None
+_AND_SLASH_OR_RE = re.compile(r'AND\s*/\s*OR', re.IGNORECASE)
+_ANDOR_RE = re.compile(r'ANDOR', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+_CURRENCY_TAIL_RE = re.compile(r'\s+(ETB|FTB|BIRR).*$', re.IGNORECASE)
+_JOINT_NAME_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s+OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
+    r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s*/\s*OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
+    r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+ANDOR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
+)]
+_SOURCE_ACCOUNT_NAME_RE = re.compile(r'source\s+account\s+name', re.IGNORECASE)
+_RECEIVER_CONTEXT_RE = re.compile(r'receiver|beneficiary|payee|paid to|credited to', re.IGNORECASE)
+_CONTEXT_NAME_RE = re.compile(r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,}){0,4})\b')
+_GENERIC_NAME_RE = re.compile(r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,}){0,2})\b')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+# Every ASCII char that [^\w\s] would match, mapped to a space
+_ASCII_PUNCT_TABLE = str.maketrans({c: ' ' for c in map(chr, range(128))
+                                    if not (c.isalnum() or c == '_' or c.isspace())})
+
 def extract_beneficiary_from_receipt(text):
     """Extract beneficiary/receiver from receipt (who received the payment)
     
@@ -1147,90 +1864,97 @@ def extract_beneficiary_from_receipt(text):
     # STRATEGY 1: Look for "Receiver Name" label SPECIFICALLY, then find the corresponding VALUE
     # In table layouts, the value appears AFTER all labels, in the same position
     # CRITICAL: Must match "Receiver Name" NOT "Receiver Account"
-    receiver_label_match = re.search(r'(?<!Source\s)(?<!Source Account\s)\b(Receiver Name|Beneficiary Name|Beneficiary)\b', text, re.IGNORECASE)
+    # Split text into lines once; the same lines are reused by the fallbacks
+    lines = text.split('\n')
+    receiver_label_line_idx = None
     
-    if receiver_label_match:
-        logger.info(f"Found receiver label at position {receiver_label_match.start()}: '{receiver_label_match.group(1)}'")
+    # Find which line contains the receiver NAME label (NOT receiver account)
+    # in a single pass over the lines
+    for i, line in enumerate(lines):
+        # MUST match "Receiver Name" or "Beneficiary Name", NOT just "Receiver" or "Receiver Account"
+        label_matches = list(_RECEIVER_LINE_RE.finditer(line))
+        if not label_matches:
+            continue
+        # Make sure it's not "Source Account Name"
+        if _SOURCE_RE.search(line):
+            continue
+        # A label at the very start of the line right after a line ending in
+        # "Source" / "Source Account" is that source label wrapped; only if
+        # that's all this line has, check the rest of the text for a real one
+        wrapped_source = i > 0 and lines[i - 1].lower().endswith(('source', 'source account'))
+        if (wrapped_source and all(m.start() == 0 for m in label_matches)
+                and not _RECEIVER_LABEL_RE.search(text)):
+            break
+        receiver_label_line_idx = i
+        logger.info(f"Receiver NAME label found on line {i}: '{line}'")
+        break
+    
+    if receiver_label_line_idx is not None:
+        # Strategy: Look for the value in nearby lines (within 5-10 lines after the label)
+        # The value should be a sequence of uppercase words, possibly with "AND OR"
+        search_start = receiver_label_line_idx + 1
+        search_end = min(receiver_label_line_idx + 12, len(lines))
         
-        # Split text into lines
-        lines = text.split('\n')
-        receiver_label_line_idx = None
+        logger.info(f"Searching for receiver value in lines {search_start} to {search_end}")
         
-        # Find which line contains the receiver NAME label (NOT receiver account)
-        for i, line in enumerate(lines):
-            # MUST match "Receiver Name" or "Beneficiary Name", NOT just "Receiver" or "Receiver Account"
-            if re.search(r'\b(Receiver Name|Beneficiary Name|Beneficiary)\b', line, re.IGNORECASE):
-                # Make sure it's not "Source Account Name"
-                if not re.search(r'Source', line, re.IGNORECASE):
-                    receiver_label_line_idx = i
-                    logger.info(f"Receiver NAME label found on line {i}: '{line}'")
-                    break
+        # Track candidates to find the right one
+        candidates = []
+        skip_next_names = False
         
-        if receiver_label_line_idx is not None:
-            # Strategy: Look for the value in nearby lines (within 5-10 lines after the label)
-            # The value should be a sequence of uppercase words, possibly with "AND OR"
-            search_start = receiver_label_line_idx + 1
-            search_end = min(receiver_label_line_idx + 12, len(lines))
+        for i in range(search_start, search_end):
+            line = lines[i].strip()
+            logger.info(f"Checking line {i}: '{line}'")
             
-            logger.info(f"Searching for receiver value in lines {search_start} to {search_end}")
+            # Skip empty lines
+            if not line:
+                continue
             
-            # Track candidates to find the right one
-            candidates = []
-            skip_next_names = False
+            # Skip lines that are clearly labels or numbers
+            if _LEADING_DIGIT_RE.match(line):  # Starts with digit (account numbers, etc)
+                logger.info(f"  Skipping (starts with digit)")
+                # After seeing a digit line, we've passed sender account number, next names should be beneficiary
+                if candidates:
+                    skip_next_names = True  # Clear sender names, start fresh for beneficiary
+                candidates.clear()
+                continue
+            upper_line = line.upper()
+            if any(keyword in upper_line for keyword in _FIELD_KEYWORDS):
+                logger.info(f"  Skipping (contains field keyword)")
+                continue
             
-            for i in range(search_start, search_end):
-                line = lines[i].strip()
-                logger.info(f"Checking line {i}: '{line}'")
-                
-                # Skip empty lines
-                if not line:
-                    continue
+            # Look for uppercase name pattern (possibly with AND OR)
+            if _has_name_pair(line):
+                # Found a potential name - clean it up
+                beneficiary = line.strip()
+                beneficiary = _AND_SLASH_OR_RE.sub('AND OR', beneficiary)
+                beneficiary = _ANDOR_RE.sub('AND OR', beneficiary)
+                beneficiary = _WHITESPACE_RE.sub(' ', beneficiary).strip()
                 
-                # Skip lines that are clearly labels or numbers
-                if re.match(r'^\d', line):  # Starts with digit (account numbers, etc)
-                    logger.info(f"  Skipping (starts with digit)")
-                    # After seeing a digit line, we've passed sender account number, next names should be beneficiary
-                    if candidates:
-                        skip_next_names = True  # Clear sender names, start fresh for beneficiary
-                    candidates.clear()
-                    continue
-                if re.search(r'(Transaction|Reference|Type|Bank|Note|Account|Amount|Date|Time|Source|ETB|FTB)', line, re.IGNORECASE):
-                    logger.info(f"  Skipping (contains field keyword)")
-                    continue
+                # Remove common suffixes
+                beneficiary = _CURRENCY_TAIL_RE.sub('', beneficiary)
                 
-                # Look for uppercase name pattern (possibly with AND OR)
-                if re.search(r'\b[A-Z]{2,}\s+[A-Z]{2,}', line):
-                    # Found a potential name - clean it up
-                    beneficiary = line.strip()
-                    beneficiary = re.sub(r'AND\s*/\s*OR', 'AND OR', beneficiary, flags=re.IGNORECASE)
-                    beneficiary = re.sub(r'ANDOR', 'AND OR', beneficiary, flags=re.IGNORECASE)
-                    beneficiary = re.sub(r'\s+', ' ', beneficiary).strip()
-                    
-                    # Remove common suffixes
-                    beneficiary = re.sub(r'\s+(ETB|FTB|BIRR).*$', '', beneficiary, flags=re.IGNORECASE)
-                    
-                    # Validate: at least 2 words or contains "AND OR"
-                    if len(beneficiary.split()) >= 2 or 'AND OR' in beneficiary.upper():
-                        # Exclude known source account names
-                        if beneficiary.upper() in ['SEBLE FULIE SHUME', 'SEBLE FULIE', 'FULIE SHUME']:
-                            logger.info(f"  Skipping source account name: '{beneficiary}'")
-                            continue
-                        candidates.append(beneficiary)
-                        logger.info(f"  Found candidate: '{beneficiary}'")
-            
-            # Prefer candidates containing "AND OR" (joint accounts)
-            for cand in candidates:
-                if 'AND OR' in cand.upper():
-                    logger.info(f"✓ Beneficiary (table layout - joint account): {cand}")
-                    return cand
-            
-            # Otherwise return the last valid candidate (likely beneficiary after passing account number line)
-            # If no candidates, fall back to first if available
-            if candidates:
-                chosen = candidates[-1] if skip_next_names else candidates[0]
-                logger.info(f"✓ Beneficiary (table layout - {'last' if skip_next_names else 'first'} candidate): {chosen}")
-                return chosen
-    
+                # Validate: at least 2 words or contains "AND OR"
+                if len(beneficiary.split()) >= 2 or 'AND OR' in beneficiary.upper():
+                    # Exclude known source account names
+                    if beneficiary.upper() in ['SEBLE FULIE SHUME', 'SEBLE FULIE', 'FULIE SHUME']:
+                        logger.info(f"  Skipping source account name: '{beneficiary}'")
+                        continue
+                    candidates.append(beneficiary)
+                    logger.info(f"  Found candidate: '{beneficiary}'")
+        
+        # Prefer candidates containing "AND OR" (joint accounts)
+        for cand in candidates:
+            if 'AND OR' in cand.upper():
+                logger.info(f"✓ Beneficiary (table layout - joint account): {cand}")
+                return cand
+        
+        # Otherwise return the last valid candidate (likely beneficiary after passing account number line)
+        # If no candidates, fall back to first if available
+        if candidates:
+            chosen = candidates[-1] if skip_next_names else candidates[0]
+            logger.info(f"✓ Beneficiary (table layout - {'last' if skip_next_names else 'first'} candidate): {chosen}")
+            return chosen
+
     logger.info("Table layout strategy didn't work, trying direct pattern matching...")
 
 
@@ -1240,17 +1964,11 @@ def extract_beneficiary_from_receipt(text):
     
     # Fallback 1: Look for "WORD WORD AND OR WORD WORD" pattern (joint account names)
     # e.g., "JOHN DOE AND OR JANE SMITH" or "SEYSOA ASSEFA AND OR SENAIT DAGNE"
-    joint_patterns = [
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s+OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s*/\s*OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+ANDOR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-    ]
-    
-    for pattern in joint_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _JOINT_NAME_RES:
+        match = pattern.search(text)
         if match:
             beneficiary = match.group(1).strip()
-            beneficiary = re.sub(r'\s+', ' ', beneficiary).strip()
+            beneficiary = _WHITESPACE_RE.sub(' ', beneficiary).strip()
             if 10 <= len(beneficiary) <= 80:  # Reasonable length for joint names
                 logger.info(f"✓ Beneficiary (fallback - joint account): {beneficiary}")
                 return beneficiary
@@ -1260,21 +1978,19 @@ def extract_beneficiary_from_receipt(text):
     # e.g., "JOHN DOE", "MARY JANE SMITH"
     # CRITICAL: Must appear AFTER "Receiver" context, NOT after "Source"
     
-    # Strategy: Split text by lines and look for names that appear in receiver context
-    lines = text.split('\n')
+    # Strategy: look for names in the lines that appear in receiver context
     for i, line in enumerate(lines):
         # Check if this line or previous line mentions "Receiver" or "Beneficiary"
         context = '\n'.join(lines[max(0, i-2):i+1])  # Look at previous 2 lines + current
         
         # Skip if in "Source" context
-        if re.search(r'source\s+account\s+name', context, re.IGNORECASE):
+        if _SOURCE_ACCOUNT_NAME_RE.search(context):
             continue
             
         # Look for receiver context
-        if re.search(r'receiver|beneficiary|payee|paid to|credited to', context, re.IGNORECASE):
+        if _RECEIVER_CONTEXT_RE.search(context):
             # Extract name from current line
-            name_pattern = r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,}){0,4})\b'
-            match = re.search(name_pattern, line)
+            match = _CONTEXT_NAME_RE.search(line)
             if match:
                 name = match.group(1)
                 # Skip if it's a label/field name
@@ -1286,8 +2002,7 @@ def extract_beneficiary_from_receipt(text):
                     return name
     
     # Last resort: generic name matching with strict exclusions
-    name_pattern = r'\b([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,}){0,2})\b'
-    matches = re.findall(name_pattern, text)
+    matches = _GENERIC_NAME_RE.findall(text)
     
     # Filter out common non-name phrases
     excluded_phrases = [
@@ -1323,15 +2038,13 @@ def normalize_name(name):
     if not name:
         return ""
     # Uppercase
-    name = name.upper()
-    # Normalize "and/or" variations to "AND OR" before removing punctuation
-    name = re.sub(r'AND\s*/\s*OR', 'AND OR', name)
-    name = re.sub(r'&', 'AND', name)
-    # Remove punctuation except spaces
-    name = re.sub(r'[^\w\s]', ' ', name)
+    name = name.upper().replace('&', 'AND')
+    # Remove punctuation except spaces ("AND/OR" variants become "AND OR"
+    # here too, once the whitespace is collapsed). ASCII text only needs the
+    # translate table; the regex is kept for Unicode punctuation.
+    name = name.translate(_ASCII_PUNCT_TABLE) if name.isascii() else _NON_WORD_RE.sub(' ', name)
     # Collapse whitespace
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
+    return ' '.join(name.split())
 
 
 def validate_beneficiary(beneficiary_text):
@@ -1349,41 +2062,20 @@ def validate_beneficiary(beneficiary_text):
     normalized = normalize_name(beneficiary_text)
     logger.info(f"🔍 Validating beneficiary: '{normalized}'")
     
-    # Tokenize extracted beneficiary
-    extracted_tokens = set(normalized.split())
-    
-    # Expanded connector words to handle "AND OR", "ANDOR", etc.
-    connectors = {'AND', 'OR', 'ANDOR', 'THE', 'OF', 'TO', 'A', 'AN', '&', '/'}
-    extracted_tokens_clean = extracted_tokens - connectors
-    
-    logger.info(f"Extracted tokens (cleaned): {extracted_tokens_clean}")
-    
-    # Authorized tokens - accept if ANY of these is found
-    # FULL ACCOUNT NAME: "SEYOUM ASSEFA AND OR SENAIT DAGNE"
-    # BUT accept ANY PARTIAL match (receipt may show truncated name)
-    # Include ALL possible spelling variations due to OCR errors
-    authorized_tokens = {
-        # First name variations
-        'SEYOUM', 'SEYSOA', 'SEYSOM', 'SEYSUM', 'SEYOAM',
-        # First surname variations
-        'ASSEFA', 'ASEFA', 'ASEFFA',
-        # Second name variations
-        'SENAIT', 'SENIET', 'SENAYT', 'SENAITE',
-        # Second surname variations
-        'DAGNIE', 'DAGNE', 'DAGINE', 'DAGNY', 'DAGNHE'
-    }
-    
-    # Check if ANY authorized token is present (even just one word from the full name)
-    matching_tokens = extracted_tokens_clean & authorized_tokens
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Extracted tokens (cleaned): {set(normalized.split()) - BENEFICIARY_CONNECTORS}")
     
-    if matching_tokens:
-        logger.info(f"✅ Beneficiary VALID - found authorized token(s): {matching_tokens}")
-        logger.info(f"   (Partial match accepted - receipt may show truncated name)")
-        return True, normalized
+    # Check if ANY authorized token is present (even just one word from the full name).
+    # Connectors never overlap the authorized set, so the first hit decides.
+    for token in normalized.split():
+        if token in AUTHORIZED_BENEFICIARY_TOKENS:
+            logger.info(f"✅ Beneficiary VALID - found authorized token: {token}")
+            logger.info(f"   (Partial match accepted - receipt may show truncated name)")
+            return True, normalized
     
     # No match found
     logger.warning(f"❌ Beneficiary INVALID: '{normalized}' does not contain any authorized tokens")
-    logger.info(f"Expected to find at least one of: {sorted(authorized_tokens)}")
+    logger.info(f"Expected to find at least one of: {sorted(AUTHORIZED_BENEFICIARY_TOKENS)}")
     logger.info(f"Note: Receipt should contain SEYOUM ASSEFA AND OR SENAIT DAGNE (or any portion)")
     return False, normalized
 
@@ -1846,24 +2538,61 @@ user_thread_ids = {}
 user_buffered_message_ids = defaultdict(dict)  # {chat_id: {user_id: [message_ids]}}
 
 
-async def delete_message_after(message, delay_seconds: int):
-    """Delete a message after specified delay in seconds"""
-    try:
-        logger.info(f"⏰ Scheduled delete for message in {delay_seconds}s (chat: {message.chat_id}, msg: {message.message_id})")
-        await asyncio.sleep(delay_seconds)
-        await message.delete()
-        logger.info(f"✓ Auto-deleted message {message.message_id} after {delay_seconds}s")
-    except Exception as e:
-        logger.error(f"Error deleting message {message.message_id}: {e}")
+# Auto-deletes share one worker task instead of one sleeping task per message:
+# pending deletes sit in a heap of (due_time, seq, message) and the worker
+# sleeps until the earliest one is due (or an earlier one is scheduled)
+_delete_heap = []
+_delete_seq = itertools.count()
+_delete_wakeup = None  # asyncio.Event, created with the worker on its event loop
+_delete_worker = None
 
 # Keep track of background tasks so they don't get garbage collected
 _background_tasks = set()
 
+
+async def _delete_worker_loop():
+    """Delete scheduled messages as their deadlines come up"""
+    while True:
+        if not _delete_heap:
+            _delete_wakeup.clear()
+            await _delete_wakeup.wait()
+            continue
+
+        due, _, message = _delete_heap[0]
+        wait = due - time.monotonic()
+        if wait > 0:
+            _delete_wakeup.clear()
+            try:
+                await asyncio.wait_for(_delete_wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        heapq.heappop(_delete_heap)
+        try:
+            await message.delete()
+            logger.info(f"✓ Auto-deleted message {message.message_id}")
+        except Exception as e:
+            logger.error(f"Error deleting message {message.message_id}: {e}")
+
+
 def schedule_delete(message, delay_seconds: int):
-    """Schedule a message deletion with proper task tracking"""
-    task = asyncio.create_task(delete_message_after(message, delay_seconds))
-    _background_tasks.add(task)
-    task.add_done_callback(_background_tasks.discard)
+    """Schedule a message deletion on the shared delete worker"""
+    global _delete_worker, _delete_wakeup
+    if message is None:
+        return
+
+    logger.info(f"⏰ Scheduled delete for message in {delay_seconds}s (chat: {message.chat_id}, msg: {message.message_id})")
+    heapq.heappush(_delete_heap, (time.monotonic() + delay_seconds, next(_delete_seq), message))
+
+    # (Re)start the worker if it isn't running on the current event loop
+    loop = asyncio.get_running_loop()
+    if _delete_worker is None or _delete_worker.done() or _delete_worker.get_loop() is not loop:
+        _delete_wakeup = asyncio.Event()
+        _delete_worker = loop.create_task(_delete_worker_loop())
+        _background_tasks.add(_delete_worker)
+        _delete_worker.add_done_callback(_background_tasks.discard)
+    _delete_wakeup.set()
 
 
 async def check_message_exists(bot, chat_id: int, message_id: int) -> bool:
@@ -1951,7 +2680,7 @@ async def expire_edit_mode(user_id: int, chat_id: int, context: ContextTypes.DEF
                     f"⏰ የማስተካከያ ጊዜ ከ{EDIT_MODE_DELAY} ሰከንዶች በኋላ አልቋል።\nእንደገና ለማስተካከል /edit ብለው ይጻፉ ወይም ይጫኑት።"
                 )
                 # Auto-delete this notification message after 60 seconds
-                asyncio.create_task(delete_message_after(sent_msg, 60))
+                schedule_delete(sent_msg, 60)
             else:
                 logger.warning(f"No thread ID found for user {user_id}, skipping expiry notification")
         except Exception as e:
@@ -2092,7 +2821,7 @@ async def process_buffered_messages(user_id: int,
         if reply_msg:
             error_msg = await safe_reply_text(reply_msg, f"❌ የመረጃ ስህተት\nError extracting payment data: {str(e)}")
             if error_msg:
-                asyncio.create_task(delete_message_after(error_msg, 180))
+                schedule_delete(error_msg, 180)
         user_message_buffers[chat_id][user_id].clear()
         if chat_id in user_message_buffers and user_id in user_message_buffers[chat_id]:
             del user_message_buffers[chat_id][user_id]
@@ -2134,7 +2863,7 @@ async def process_buffered_messages(user_id: int,
                 reply_markup=reply_markup)
             # Auto-delete warning message after 10 minutes
             if warning_msg:
-                asyncio.create_task(delete_message_after(warning_msg, 600))
+                schedule_delete(warning_msg, 600)
         user_message_buffers[chat_id][user_id].clear()
         # Delete the key to ensure expire_edit_mode timeout can fire properly
         if chat_id in user_message_buffers and user_id in user_message_buffers[chat_id]:
@@ -2188,7 +2917,7 @@ async def process_buffered_messages(user_id: int,
                     reply_markup=reply_markup)
             # Auto-delete error message after 3 minutes
             if error_msg:
-                asyncio.create_task(delete_message_after(error_msg, 180))
+                schedule_delete(error_msg, 180)
         
         # Clean up and exit without saving
         user_message_buffers[chat_id][user_id].clear()
@@ -2212,7 +2941,7 @@ async def process_buffered_messages(user_id: int,
         if reply_msg:
             error_msg = await safe_reply_text(reply_msg, f"❌ ስህተት በGoogle Sheets አገልግሎት\nError: {str(e)}")
             if error_msg:
-                asyncio.create_task(delete_message_after(error_msg, 600))
+                schedule_delete(error_msg, 600)
         return
     
     target_sheet = sheets.get(reason) if sheets else None
@@ -2245,7 +2974,7 @@ async def process_buffered_messages(user_id: int,
                 if reply_msg:
                     error_msg = await safe_reply_text(reply_msg, f"❌ ቤት {house_number} በዝርዝር ውስጥ አልተገኘም")
                     if error_msg:
-                        asyncio.create_task(delete_message_after(error_msg, 600))
+                        schedule_delete(error_msg, 600)
                 return
             
             # Find the column for the month (need this BEFORE duplicate check)
@@ -2259,7 +2988,7 @@ async def process_buffered_messages(user_id: int,
                 if reply_msg:
                     error_msg = await safe_reply_text(reply_msg, f"❌ ወሩ '{month}' አልታወቀም")
                     if error_msg:
-                        asyncio.create_task(delete_message_after(error_msg, 600))
+                        schedule_delete(error_msg, 600)
                 return
             
             # Calculate column positions for this month (2 columns per month: Amount, FT No)
@@ -2297,6 +3026,7 @@ async def process_buffered_messages(user_id: int,
                                             
                                             sheet.update(amount_cell, [[""]])
                                             sheet.update(ftno_cell, [[""]])
+                                            invalidate_sheet_values_cache(sheet)
                                             
                                             logger.info(f"✅ [EDIT MODE] Deleted old entry from '{sheet_reason}' row {idx} ({amount_cell}, {ftno_cell})")
                                             old_entry_deleted = True
@@ -2325,30 +3055,16 @@ async def process_buffered_messages(user_id: int,
                 duplicate_found = False
                 duplicate_sheet = None
                 duplicate_row = None
-                duplicate_sheet = None
-                duplicate_row = None
                 
-                # Check ALL sheets, not just the current one
-                for sheet_reason, sheet in sheets.items():
-                    sheet_values = sheet.get_all_values()
-                    
-                    for idx, row in enumerate(sheet_values[2:], start=3):  # Skip 2 header rows
-                        # Check all FT No columns (every even column starting from column E=4)
-                        for col_idx in range(4, len(row), 2):  # Start at 4 (column E), step by 2
-                            if len(row) > col_idx:
-                                cell_value = row[col_idx].strip()
-                                if cell_value:
-                                    existing_txids = [t.strip() for t in cell_value.split(',')]
-                                    if txid.strip() in existing_txids:
-                                        duplicate_found = True
-                                        duplicate_sheet = sheet_reason
-                                        duplicate_row = idx
-                                        logger.warning(f"❌ DUPLICATE TRANSACTION ID DETECTED: {txid} found in sheet '{sheet_reason}' at row {idx}, col {col_idx}")
-                                        break
-                        if duplicate_found:
-                            break
-                    if duplicate_found:
-                        break
+                # Check ALL sheets, not just the current one: one fresh batched
+                # read (never the TTL cache - the web app and manual edits write
+                # behind its back), then an exact lookup in the {txid: location} index
+                reason_values = await fetch_all_reason_values(sheets, max_age=0)
+                duplicate = get_txid_index(target_sheet.spreadsheet.id, reason_values).get(txid.strip())
+                if duplicate:
+                    duplicate_found = True
+                    duplicate_sheet, duplicate_row, col_idx = duplicate
+                    logger.warning(f"❌ DUPLICATE TRANSACTION ID DETECTED: {txid} found in sheet '{duplicate_sheet}' at row {duplicate_row}, col {col_idx}")
                 
                 if duplicate_found:
                     # Display Amharic message and don't save
@@ -2376,7 +3092,7 @@ async def process_buffered_messages(user_id: int,
                         
                         # Auto-delete error message after 3 minutes
                         if error_msg:
-                            asyncio.create_task(delete_message_after(error_msg, 180))
+                            schedule_delete(error_msg, 180)
                     
                     # Clean up and exit without saving
                     user_message_buffers[chat_id][user_id].clear()
@@ -2493,6 +3209,7 @@ async def process_buffered_messages(user_id: int,
             # Update FT No column (keep as text, not formula)
             target_sheet.update(f'{ftno_col}{row_index}', [[final_txid]], 
                               value_input_option='USER_ENTERED')
+            invalidate_sheet_values_cache(target_sheet)
             
             logger.info(f"✓ Updated {reason} - House {house_number}, Month {month} at row {row_index}, cols {amount_col}/{ftno_col}")
 
@@ -2574,7 +3291,7 @@ async def process_buffered_messages(user_id: int,
                 error_msg = await safe_reply_text(reply_msg, f"❌ ስህተት በማስቀመጥ ላይ\nError: {str(e)}")
                 # Auto-delete error message after 10 minutes
                 if error_msg:
-                    asyncio.create_task(delete_message_after(error_msg, 600))
+                    schedule_delete(error_msg, 600)
     else:
         if reply_msg:
             # Add failure reaction to original message
@@ -2586,7 +3303,7 @@ async def process_buffered_messages(user_id: int,
             error_msg = await safe_reply_text(reply_msg, "❌ ስህተት በመረጃ - ቤት")
             # Auto-delete error message after 10 minutes
             if error_msg:
-                asyncio.create_task(delete_message_after(error_msg, 600))
+                schedule_delete(error_msg, 600)
 
     # Clear buffer and edit mode flag
     if chat_id in user_message_buffers and user_id in user_message_buffers[chat_id]:
@@ -2601,6 +3318,9 @@ async def process_buffered_messages(user_id: int,
 
 
 # ========== MESSAGE HANDLER ==========
+# House number typed by an admin in search mode (3 or 4 digits)
+_HOUSE_RE = re.compile(r'\d{3,4}')
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.effective_message
     user_id = update.effective_user.id
@@ -2612,11 +3332,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"📨 Received message - Chat ID: {chat_id}, Thread ID: {thread_id}, User: {user_id}, Message ID: {message_id}")
 
     # Create composite key for message tracking (supports multi-group)
-    message_key = (chat_id, message_id, thread_id)
+    message_key = pack_message_key(chat_id, message_id, thread_id)
     
     # Check if this message has already been processed (for offline scenario)
     if message_key in processed_message_ids:
-        logger.info(f"⏭️ Skipping already processed message {message_key}")
+        logger.info(f"⏭️ Skipping already processed message {(chat_id, message_id, thread_id)}")
         return
 
     # ========== START DATE/MESSAGE ID FILTER ==========
@@ -2627,17 +3347,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         skip_reason = ""
         
         # Date-based filtering
-        if BOT_START_DATE:
-            try:
-                from datetime import datetime, timezone
-                start_date = datetime.strptime(BOT_START_DATE, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-                message_date = msg.date  # Telegram message has timezone-aware datetime
-                
-                if message_date < start_date:
-                    should_skip = True
-                    skip_reason = f"message date {message_date.strftime('%Y-%m-%d %H:%M:%S')} < start date {BOT_START_DATE}"
-            except ValueError as e:
-                logger.error(f"❌ Invalid BOT_START_DATE format: '{BOT_START_DATE}'. Use YYYY-MM-DD format. Error: {e}")
+        if BOT_START_DATETIME:
+            message_date = msg.date  # Telegram message has timezone-aware datetime
+            
+            if message_date < BOT_START_DATETIME:
+                should_skip = True
+                skip_reason = f"message date {message_date.strftime('%Y-%m-%d %H:%M:%S')} < start date {BOT_START_DATE}"
         
         # Message ID filtering (independent of date filter)
         if MIN_MESSAGE_ID and not should_skip:
@@ -2652,11 +3367,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if should_skip:
             logger.info(f"⏭️ [FILTER] Skipping message {message_id} in chat {chat_id} ({skip_reason})")
             # Mark as processed to avoid re-checking on next restart
-            processed_message_ids.add(message_key)
-            save_processed_messages()
+            mark_message_processed(message_key)
             return
     # ========== END FILTER ==========
 
+    # Nothing to handle (stickers, whitespace-only text, service messages):
+    # return before the search-mode, group and edit-mode lookups
+    if not msg.photo and not (msg.text or "").strip() and not (msg.caption or "").strip():
+        return
+
     # Check if admin is in search mode (BEFORE group/topic filters)
     # Now uses chat_id as key (where user types) and stores group_id as value
     search_group_id = admin_search_mode.get(chat_id, {}).get(user_id)
@@ -2665,7 +3384,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         house_number = (msg.text or "").strip()
 
         # Validate house number (3 or 4 digits)
-        if house_number.isdigit() and len(house_number) in [3, 4]:
+        if _HOUSE_RE.fullmatch(house_number):
             # Clear search mode for this chat
             del admin_search_mode[chat_id][user_id]
 
@@ -2713,28 +3432,32 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             photo = msg.photo[-1]
             file = await photo.get_file()
-            image_bytes = await file.download_as_bytearray()
-            text = extract_text_from_image(bytes(image_bytes))
+            # Download into our own BytesIO: getvalue() then hands over its
+            # buffer without a copy, and io.BytesIO(bytes) in
+            # prepare_image_for_ocr shares it too (a bytearray gets copied
+            # at both steps)
+            buffer = io.BytesIO()
+            await file.download_to_memory(buffer)
+            image_bytes = buffer.getvalue()
+            text = await asyncio.get_running_loop().run_in_executor(
+                _ocr_pool, extract_text_from_image, image_bytes)
             is_ocr = True  # Text from OCR
 
-            if not text and not caption:
+            if not text.strip() and not caption.strip():
                 error_msg = await safe_reply_text(msg, "❌ በምስሉ ላይ ጽሁፍ አልተገኘም")
                 if error_msg:
-                    asyncio.create_task(delete_message_after(error_msg, 600))
+                    schedule_delete(error_msg, 600)
                 return
         except Exception as e:
             logger.error(f"Image error: {e}")
             error_msg = await safe_reply_text(msg, f"❌ ስህተት: {e}")
             if error_msg:
-                asyncio.create_task(delete_message_after(error_msg, 600))
+                schedule_delete(error_msg, 600)
             return
     else:
         text = msg.text or ""
         is_ocr = False  # User-typed text
 
-    if not text and not caption:
-        return
-
     # Check if user is in edit mode (affects delay and merging behavior)
     is_edit = user_edit_mode.get(chat_id, {}).get(user_id, False)
 
@@ -2767,8 +3490,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         process_buffered_messages(user_id, chat_id, context, is_edit_mode=is_edit))
 
     # Mark message as processed ONLY AFTER successful buffering (prevents lock-out on errors)
-    processed_message_ids.add(message_key)
-    save_processed_messages()
+    mark_message_processed(message_key)
 
     logger.info(
         f"⏱️ Started {delay_time}s timer for user {user_id} (edit_mode={is_edit})"
@@ -2803,7 +3525,7 @@ async def handle_edit_command(update: Update,
     if not user_last_submissions.get(chat_id, {}).get(user_id):
         error_msg = await msg.reply_text(
             "❌ ቀየተመዘገበ መረጃ አልተገኘም።\n\nመጀመሪያ ክፍያ ያስገቡ፣ ከዛ ማስተካከል ይችላሉ።")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
         return
 
     last_sub = user_last_submissions[chat_id][user_id]
@@ -2912,38 +3634,39 @@ async def show_house_payments_amharic(query, house_number, group_id):
         
         house_data = []
 
-        for reason in PAYMENT_REASONS.keys():
+        reason_values = await fetch_all_reason_values(sheets)
+        house_key = house_number.strip()
+
+        for reason, values in reason_values.items():
             try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
+                # Nothing below the 2 header rows: no houses to look at
+                if len(values) < 3:
                     continue
-
-                values = sheet.get_all_values()
-                for i in range(2, len(values) - 1):  # Skip headers and TOTALS
-                    row = values[i]
-                    if len(row) > 1 and row[1].strip() == house_number.strip():
-                        house_name = row[2] if len(row) > 2 else ''
+                
+                # Jump straight to the house's row via the column-B index
+                row_idx = get_house_index(sheets[reason], values).get(house_key)
+                if row_idx is None:
+                    continue
+                row = values[row_idx]
+                house_name = row[2] if len(row) > 2 else ''
+                
+                # Precomputed (month, amount col, FT No col) offsets
+                for month, amount_col_idx, ftno_col_idx in MONTH_COLUMNS:
+                    if len(row) > amount_col_idx:
+                        amount = row[amount_col_idx]
+                        txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
                         
-                        for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                            amount_col_idx = 3 + (month_idx * 2)
-                            ftno_col_idx = amount_col_idx + 1
-                            
-                            if len(row) > amount_col_idx:
-                                amount = row[amount_col_idx]
-                                txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
-                                
-                                if amount and amount.strip():
-                                    try:
-                                        amount_value = float(amount)
-                                        house_data.append({
-                                            'name': house_name,
-                                            'amount': str(amount_value),
-                                            'month': month,
-                                            'txid': txid,
-                                            'type': reason
-                                        })
-                                    except ValueError:
-                                        pass
+                        # Parsed once; the float is kept for the total
+                        amount_value = parse_amount(amount)
+                        if amount_value is not None:
+                            house_data.append({
+                                'name': house_name,
+                                'amount': str(amount_value),
+                                'value': amount_value,
+                                'month': month,
+                                'txid': txid,
+                                'type': reason
+                            })
             except Exception as e:
                 logger.warning(f"Error reading {reason}: {e}")
 
@@ -2955,7 +3678,7 @@ async def show_house_payments_amharic(query, house_number, group_id):
 
         # Get house name
         house_name = house_data[0]['name'] if house_data else "—"
-        total = sum(float(p['amount']) for p in house_data if p['amount'])
+        total = sum(p['value'] for p in house_data)
 
         message = f"🏠 **ቤት {house_number}**\n"
         message += f"👤 ስም: {house_name}\n"
@@ -2992,38 +3715,39 @@ async def show_house_payments_in_dm(context, user_id, house_number, group_id, qu
         
         house_data = []
 
-        for reason in PAYMENT_REASONS.keys():
+        reason_values = await fetch_all_reason_values(sheets)
+        house_key = house_number.strip()
+
+        for reason, values in reason_values.items():
             try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
+                # Nothing below the 2 header rows: no houses to look at
+                if len(values) < 3:
                     continue
-
-                values = sheet.get_all_values()
-                for i in range(2, len(values) - 1):  # Skip headers and TOTALS
-                    row = values[i]
-                    if len(row) > 1 and row[1].strip() == house_number.strip():
-                        house_name = row[2] if len(row) > 2 else ''
+                
+                # Jump straight to the house's row via the column-B index
+                row_idx = get_house_index(sheets[reason], values).get(house_key)
+                if row_idx is None:
+                    continue
+                row = values[row_idx]
+                house_name = row[2] if len(row) > 2 else ''
+                
+                # Precomputed (month, amount col, FT No col) offsets
+                for month, amount_col_idx, ftno_col_idx in MONTH_COLUMNS:
+                    if len(row) > amount_col_idx:
+                        amount = row[amount_col_idx]
+                        txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
                         
-                        for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                            amount_col_idx = 3 + (month_idx * 2)
-                            ftno_col_idx = amount_col_idx + 1
-                            
-                            if len(row) > amount_col_idx:
-                                amount = row[amount_col_idx]
-                                txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
-                                
-                                if amount and amount.strip():
-                                    try:
-                                        amount_value = float(amount)
-                                        house_data.append({
-                                            'name': house_name,
-                                            'amount': str(amount_value),
-                                            'month': month,
-                                            'txid': txid,
-                                            'type': reason
-                                        })
-                                    except ValueError:
-                                        pass
+                        # Parsed once; the float is kept for the total
+                        amount_value = parse_amount(amount)
+                        if amount_value is not None:
+                            house_data.append({
+                                'name': house_name,
+                                'amount': str(amount_value),
+                                'value': amount_value,
+                                'month': month,
+                                'txid': txid,
+                                'type': reason
+                            })
             except Exception as e:
                 logger.warning(f"Error reading {reason}: {e}")
 
@@ -3042,7 +3766,7 @@ async def show_house_payments_in_dm(context, user_id, house_number, group_id, qu
 
         # Get house name
         house_name = house_data[0]['name'] if house_data else "—"
-        total = sum(float(p['amount']) for p in house_data if p['amount'])
+        total = sum(p['value'] for p in house_data)
 
         message = f"📋 **የክፍያ ታሪክ - Payment History**\n"
         message += f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
@@ -3114,7 +3838,7 @@ async def handle_edit_button(update: Update,
     if user_id != button_user_id:
         error_msg = await safe_reply_text(query.message, "❌ ማስተካከል የሚችሉት የራስዎን መረጃ ብቻ ነው!")
         if error_msg:
-            asyncio.create_task(delete_message_after(error_msg, 600))
+            schedule_delete(error_msg, 600)
         logger.warning(
             f"User {user_id} tried to edit submission from user {button_user_id}"
         )
@@ -3124,7 +3848,7 @@ async def handle_edit_button(update: Update,
     if not user_last_submissions.get(chat_id, {}).get(user_id):
         error_msg = await safe_reply_text(query.message, "❌ ከዚ በፊት የተመዘገበ መረጃ አልተገኘም።")
         if error_msg:
-            asyncio.create_task(delete_message_after(error_msg, 600))
+            schedule_delete(error_msg, 600)
         return
 
     last_sub = user_last_submissions[chat_id][user_id]
@@ -3188,28 +3912,69 @@ def get_admin_groups(user_id: int) -> dict:
     return admin_groups
 
 
+# Static keyboards are built once: telegram objects are immutable, so the same
+# markup can be reused for every callback instead of being reallocated per click
+_ADMIN_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📊 Dashboard", callback_data="admin_dashboard"),
+        InlineKeyboardButton("📅 Monthly", callback_data="admin_monthly_totals")
+    ],
+    [
+        InlineKeyboardButton("🔍 Search", callback_data="admin_search"),
+        InlineKeyboardButton("📋 Houses", callback_data="admin_houses")
+    ],
+    [
+        InlineKeyboardButton("🗂️ Recent", callback_data="admin_recent"),
+        InlineKeyboardButton("📥 Excel", callback_data="admin_download_excel")
+    ],
+    [
+        InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")
+    ]
+])
+
+BACK_TO_START_KEYBOARD = InlineKeyboardMarkup(
+    [[InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")]])
+
+_ROLE_BUTTONS = [
+    InlineKeyboardButton("👨‍💼 Admin Access", callback_data="role_admin"),
+    InlineKeyboardButton("👤 User Access", callback_data="role_user")
+]
+
+
 def get_admin_menu_keyboard():
     """Get the professional admin menu with horizontal layout"""
+    return _ADMIN_MENU_KEYBOARD
+
+
+@lru_cache(maxsize=4)
+def get_role_keyboard(webapp_url: str = ''):
+    """Get the /start role selection keyboard (plus Mini App button if configured)"""
+    keyboard = [_ROLE_BUTTONS]
+    if webapp_url:
+        keyboard.append([
+            InlineKeyboardButton("📊 Open Dashboard", web_app=WebAppInfo(url=webapp_url))
+        ])
+    return InlineKeyboardMarkup(keyboard)
+
+
+@lru_cache(maxsize=64)
+def _group_selector_keyboard(groups: tuple):
+    """Build the group selector for a tuple of (group_chat_id, group_name)"""
     keyboard = [
-        [
-            InlineKeyboardButton("📊 Dashboard", callback_data="admin_dashboard"),
-            InlineKeyboardButton("📅 Monthly", callback_data="admin_monthly_totals")
-        ],
-        [
-            InlineKeyboardButton("🔍 Search", callback_data="admin_search"),
-            InlineKeyboardButton("📋 Houses", callback_data="admin_houses")
-        ],
-        [
-            InlineKeyboardButton("🗂️ Recent", callback_data="admin_recent"),
-            InlineKeyboardButton("📥 Excel", callback_data="admin_download_excel")
-        ],
-        [
-            InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")
-        ]
+        [InlineKeyboardButton(f"📊 {group_name}", callback_data=f"select_group_{group_chat_id}")]
+        for group_chat_id, group_name in groups
     ]
+    keyboard.append([InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")])
     return InlineKeyboardMarkup(keyboard)
 
 
+def get_group_selector_keyboard(admin_groups: dict):
+    """Get the (cached) group selector keyboard for an admin's groups"""
+    return _group_selector_keyboard(tuple(
+        (group_chat_id, group_config.get('name', f'Group {group_chat_id}'))
+        for group_chat_id, group_config in admin_groups.items()))
+
+
 def get_admin_panel_text(group_name: str) -> str:
     """Get professional admin panel header text"""
     return (
@@ -3247,21 +4012,8 @@ async def handle_start_command(update: Update,
         # Check for webapp URL in environment
         webapp_url = os.getenv('WEBAPP_URL', '')
         
-        keyboard = [
-            [
-                InlineKeyboardButton("👨‍💼 Admin Access", callback_data="role_admin"),
-                InlineKeyboardButton("👤 User Access", callback_data="role_user")
-            ]
-        ]
-        
-        # Add Mini App button if URL is configured
-        if webapp_url:
-            from telegram import WebAppInfo
-            keyboard.append([
-                InlineKeyboardButton("📊 Open Dashboard", web_app=WebAppInfo(url=webapp_url))
-            ])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Role buttons (+ Mini App button if URL is configured)
+        reply_markup = get_role_keyboard(webapp_url)
         
         # Professional welcome message
         welcome_msg = (
@@ -3363,38 +4115,40 @@ async def show_history_in_dm(update: Update, context: ContextTypes.DEFAULT_TYPE,
         
         house_data = []
 
-        for reason in PAYMENT_REASONS.keys():
+        reason_values = await fetch_all_reason_values(sheets)
+        target = house_number.strip()
+
+        for reason, values in reason_values.items():
             try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
+                # A house has at most one row per reason sheet: find it with a
+                # single list.index over column B instead of comparing row by row
+                # Skip headers; houses the web app appended sit below TOTALS,
+                # and TOTAL itself never matches a house number
+                data_rows = values[2:]
+                house_col = [r[1].strip() if len(r) > 1 else '' for r in data_rows]
+                try:
+                    row = data_rows[house_col.index(target)]
+                except ValueError:
                     continue
 
-                values = sheet.get_all_values()
-                for i in range(2, len(values) - 1):  # Skip headers and TOTALS
-                    row = values[i]
-                    if len(row) > 1 and row[1].strip() == house_number.strip():
-                        house_name = row[2] if len(row) > 2 else ''
+                house_name = row[2] if len(row) > 2 else ''
+                row_len = len(row)
+                
+                for month, amount_col_idx, ftno_col_idx in MONTH_COLUMNS:
+                    if row_len > amount_col_idx:
+                        amount = row[amount_col_idx]
+                        txid = row[ftno_col_idx] if row_len > ftno_col_idx else ''
                         
-                        for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                            amount_col_idx = 3 + (month_idx * 2)
-                            ftno_col_idx = amount_col_idx + 1
-                            
-                            if len(row) > amount_col_idx:
-                                amount = row[amount_col_idx]
-                                txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
-                                
-                                if amount and amount.strip():
-                                    try:
-                                        amount_value = float(amount)
-                                        house_data.append({
-                                            'name': house_name,
-                                            'amount': str(amount_value),
-                                            'month': month,
-                                            'txid': txid,
-                                            'type': reason
-                                        })
-                                    except ValueError:
-                                        pass
+                        amount_value = parse_amount(amount)
+                        if amount_value is not None:
+                            house_data.append({
+                                'name': house_name,
+                                'amount': str(amount_value),
+                                'value': amount_value,
+                                'month': month,
+                                'txid': txid,
+                                'type': reason
+                            })
             except Exception as e:
                 logger.warning(f"Error reading {reason}: {e}")
 
@@ -3413,30 +4167,37 @@ async def show_history_in_dm(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
         # Get house name and build message
         house_name = house_data[0]['name'] if house_data else "—"
-        total = sum(float(p['amount']) for p in house_data if p['amount'])
+        total = sum(p['value'] for p in house_data)
 
-        message = f"📋 **የክፍያ ታሪክ - Payment History**\n"
-        message += f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
-        message += f"🏠 **ቤት {house_number}**\n"
-        message += f"👤 ስም: {house_name}\n"
-        message += f"💰 ጠቅላላ: {total:,.2f} birr\n\n"
-        message += f"📊 **ክፍያዎች:**\n"
-        message += f"─────────────────────\n"
+        # Collect fragments and join once per Telegram message (avoids O(n²) +=)
+        parts = [
+            f"📋 **የክፍያ ታሪክ - Payment History**\n"
+            f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
+            f"🏠 **ቤት {house_number}**\n"
+            f"👤 ስም: {house_name}\n"
+            f"💰 ጠቅላላ: {total:,.2f} birr\n\n"
+            f"📊 **ክፍያዎች:**\n"
+            f"─────────────────────\n"
+        ]
+        size = len(parts[0])
 
         for i, p in enumerate(house_data, 1):
             reason_display = PAYMENT_REASONS_AMHARIC.get(p['type'], p['type'].capitalize())
             month_display = ETHIOPIAN_MONTHS_AMHARIC.get(p['month'], p['month'])
-            message += (f"{i}. {reason_display}\n"
-                        f"   💰 {p['amount']} birr | 📆 {month_display}\n"
-                        f"   🔖 {p['txid']}\n\n")
+            piece = (f"{i}. {reason_display}\n"
+                     f"   💰 {p['amount']} birr | 📆 {month_display}\n"
+                     f"   🔖 {p['txid']}\n\n")
+            parts.append(piece)
+            size += len(piece)
 
             # Split long messages
-            if len(message) > 3500:
-                await send_dm_message(update, context, message)
-                message = ""
+            if size > 3500:
+                await send_dm_message(update, context, "".join(parts))
+                parts = []
+                size = 0
 
-        if message:
-            await send_dm_message(update, context, message)
+        if parts:
+            await send_dm_message(update, context, "".join(parts))
             
         logger.info(f"✅ Successfully sent history for house {house_number} to user {user_id}")
 
@@ -3471,7 +4232,7 @@ async def handle_admin_command(update: Update,
 
     if not is_admin(user_id, chat_id):
         error_msg = await update.message.reply_text("❌ You don't have admin access.")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
         return
 
     # Get groups where user is admin
@@ -3522,6 +4283,10 @@ async def handle_admin_callbacks(update: Update,
     first_name = update.effective_user.first_name or ""
     data = query.data
     
+    # Look up the user's admin groups once per callback; every branch below
+    # (role check, admin check, group selection) reuses this result
+    admin_groups = get_admin_groups(user_id)
+    
     # Handle role selection from /start (no admin check needed for initial selection)
     if data == "role_user":
         # Show user info panel
@@ -3539,16 +4304,14 @@ async def handle_admin_callbacks(update: Update,
             f"🆔 Your ID: `{user_id}`\n"
             f"ℹ️ Share this ID with admin for access."
         )
-        keyboard = [[InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")]]
         await query.edit_message_text(
             user_msg,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=BACK_TO_START_KEYBOARD,
             parse_mode='Markdown')
         return
     
     if data == "role_admin":
         # Check if user is actually an admin
-        admin_groups = get_admin_groups(user_id)
         if not admin_groups:
             # Not an admin - show access denied
             deny_msg = (
@@ -3559,32 +4322,21 @@ async def handle_admin_callbacks(update: Update,
                 f"🆔 Your ID: `{user_id}`\n\n"
                 f"Contact @sphinxlike to get access."
             )
-            keyboard = [[InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")]]
             await query.edit_message_text(
                 deny_msg,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=BACK_TO_START_KEYBOARD,
                 parse_mode='Markdown')
             return
         
         # User is admin - show group selection or admin panel
         if len(admin_groups) > 1:
-            keyboard = []
-            for group_chat_id, group_config in admin_groups.items():
-                group_name = group_config.get('name', f'Group {group_chat_id}')
-                keyboard.append([
-                    InlineKeyboardButton(
-                        f"📊 {group_name}",
-                        callback_data=f"select_group_{group_chat_id}"
-                    )
-                ])
-            keyboard.append([InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")])
             await query.edit_message_text(
                 f"━━━━━━━━━━━━━━━━━━━━━━\n"
                 f"👨‍💼 **Select Group**\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
                 f"You manage {len(admin_groups)} group(s).\n"
                 f"Please select one:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=get_group_selector_keyboard(admin_groups),
                 parse_mode='Markdown')
         else:
             # Only one group
@@ -3599,12 +4351,6 @@ async def handle_admin_callbacks(update: Update,
     
     if data == "back_to_start":
         # Go back to start menu
-        keyboard = [
-            [
-                InlineKeyboardButton("👨‍💼 Admin Access", callback_data="role_admin"),
-                InlineKeyboardButton("👤 User Access", callback_data="role_user")
-            ]
-        ]
         welcome_msg = (
             f"━━━━━━━━━━━━━━━━━━━━━━\n"
             f"🏦 **Payment Receipt Bot**\n"
@@ -3619,14 +4365,20 @@ async def handle_admin_callbacks(update: Update,
         )
         await query.edit_message_text(
             welcome_msg,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=get_role_keyboard(),
             parse_mode='Markdown')
         return
 
-    # From here, admin access is required
-    if not is_admin(user_id, chat_id):
+    # From here, admin access is required (same rule as is_admin(): admin of
+    # this group, or of any group when used from a private chat)
+    if chat_id in GROUP_CONFIGS:
+        has_admin_access = chat_id in admin_groups
+    else:
+        has_admin_access = bool(admin_groups)
+    if not has_admin_access:
+        logger.warning(f"⚠️ User {user_id} is not an admin for chat {chat_id}")
         error_msg = await query.message.reply_text("❌ You don't have admin access.")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
         return
     
     # Handle group selection
@@ -3647,29 +4399,18 @@ async def handle_admin_callbacks(update: Update,
     
     # If not set (e.g., in private chat without prior selection), detect from admin groups
     if not admin_group_id or admin_group_id not in GROUP_CONFIGS:
-        admin_groups = get_admin_groups(user_id)
         if len(admin_groups) == 1:
             # Only one group - use it automatically
             admin_group_id = list(admin_groups.keys())[0]
             context.user_data['admin_group_id'] = admin_group_id
         elif len(admin_groups) > 1:
             # Multiple groups - show selector
-            keyboard = []
-            for group_chat_id, group_config in admin_groups.items():
-                group_name = group_config.get('name', f'Group {group_chat_id}')
-                keyboard.append([
-                    InlineKeyboardButton(
-                        f"📊 {group_name}",
-                        callback_data=f"select_group_{group_chat_id}"
-                    )
-                ])
-            keyboard.append([InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")])
             await query.edit_message_text(
                 f"━━━━━━━━━━━━━━━━━━━━━━\n"
                 f"👨‍💼 **Select Group**\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
                 f"Please select a group first:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=get_group_selector_keyboard(admin_groups),
                 parse_mode='Markdown')
             return
         else:
@@ -3683,25 +4424,14 @@ async def handle_admin_callbacks(update: Update,
 
     if data == "admin_start":
         # Handle admin_start from /start command in DM
-        admin_groups = get_admin_groups(user_id)
         if len(admin_groups) > 1:
-            keyboard = []
-            for group_chat_id, group_config in admin_groups.items():
-                group_name = group_config.get('name', f'Group {group_chat_id}')
-                keyboard.append([
-                    InlineKeyboardButton(
-                        f"📊 {group_name}",
-                        callback_data=f"select_group_{group_chat_id}"
-                    )
-                ])
-            keyboard.append([InlineKeyboardButton("🔙 Back to Start", callback_data="back_to_start")])
             await query.edit_message_text(
                 f"━━━━━━━━━━━━━━━━━━━━━━\n"
                 f"👨‍💼 **Select Group**\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
                 f"You manage {len(admin_groups)} group(s).\n"
                 f"Please select one:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=get_group_selector_keyboard(admin_groups),
                 parse_mode='Markdown')
         else:
             # Only one group
@@ -3731,11 +4461,29 @@ async def handle_admin_callbacks(update: Update,
         await show_house_payments(query, house_number, admin_group_id)
 
 
+# Authorized HTTP session for Drive/Sheets exports, built once and reused so
+# each download skips the key parsing and gets a warm keep-alive connection
+_export_session = None
+_export_session_lock = threading.Lock()
+
+def get_export_session():
+    """Return the shared AuthorizedSession used for spreadsheet exports"""
+    global _export_session
+    if _export_session is None:
+        with _export_session_lock:
+            if _export_session is None:
+                creds = service_account.Credentials.from_service_account_file(
+                    CREDENTIALS_FILE,
+                    scopes=['https://www.googleapis.com/auth/spreadsheets',
+                            'https://www.googleapis.com/auth/drive.readonly']
+                )
+                _export_session = AuthorizedSession(creds)
+    return _export_session
+
+
 async def download_excel(query, context, group_id):
     """Download the payment data as Excel file and send to user"""
     try:
-        import io
-        
         await query.message.reply_text("⏳ Generating Excel file... Please wait.")
         
         group_config = GROUP_CONFIGS.get(group_id)
@@ -3751,31 +4499,22 @@ async def download_excel(query, context, group_id):
         # Get the spreadsheet export URL
         export_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=xlsx"
         
-        # We need to use the authenticated client to download
-        # Get the credentials from our existing setup
-        creds = service_account.Credentials.from_service_account_file(
-            CREDENTIALS_FILE,
-            scopes=['https://www.googleapis.com/auth/spreadsheets',
-                    'https://www.googleapis.com/auth/drive.readonly']
-        )
-        
-        # Use requests with the authorized session
-        from google.auth.transport.requests import AuthorizedSession
-        authed_session = AuthorizedSession(creds)
+        # Download with the shared authenticated session
+        authed_session = get_export_session()
         
-        response = authed_session.get(export_url)
+        # Blocking download runs off the event loop so other chats keep being served
+        response = await asyncio.get_running_loop().run_in_executor(
+            _sheets_pool, authed_session.get, export_url)
         
         if response.status_code == 200:
-            # Create file-like object from content
-            excel_file = io.BytesIO(response.content)
-            excel_file.name = f"payments_{group_config.get('name', 'group')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+            filename = f"payments_{group_config.get('name', 'group')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
             
-            # Send the file to user
+            # Send the downloaded bytes as-is (no extra BytesIO copy)
             group_name = group_config.get('name', 'Group')
             await context.bot.send_document(
                 chat_id=query.message.chat_id,
-                document=excel_file,
-                filename=excel_file.name,
+                document=response.content,
+                filename=filename,
                 caption=f"📊 Payment data for {group_name}\n"
                         f"📅 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
             )
@@ -3789,6 +4528,42 @@ async def download_excel(query, context, group_id):
         await query.message.reply_text(f"❌ Error generating Excel: {str(e)}")
 
 
+def scan_reason_values(reason, values):
+    """Summarize one reason sheet in a single pass over its house rows.
+
+    Returns (month_totals, paid_houses): month_totals maps month -> amount
+    from the TOTAL row (None if the sheet has no TOTAL row) and paid_houses
+    is the set of house numbers with a positive amount in any month.
+    """
+    totals_idx = find_totals_row(values)
+    totals_row = values[totals_idx] if totals_idx is not None else None
+    paid_houses = set()
+    # House rows are everything below the 2 header rows except TOTAL itself;
+    # houses appended later (web app append_row) land below the TOTAL row
+    for idx, row in enumerate(values[2:], start=2):
+        if idx == totals_idx or len(row) < 2 or row[1] == '':
+            continue
+        house_number = str(row[1]).strip()
+        if not house_number:
+            continue
+        # any() stops at the first month with a positive amount
+        if any((parse_amount(amount) or 0) > 0 for amount in row[AMOUNT_COLUMNS]):
+            paid_houses.add(house_number)
+
+    if totals_row is None:
+        return None, paid_houses
+
+    month_totals = {}
+    for month, value in zip(ETHIOPIAN_MONTHS, totals_row[AMOUNT_COLUMNS]):
+        month_val = parse_amount(value)
+        if month_val is not None:
+            month_totals[month] = month_val
+        elif str(value).strip() and not str(value).startswith('='):
+            # Empty cells and unevaluated formula strings are skipped silently
+            logger.warning(f"Could not parse total value '{value}' for {reason} month {month}")
+    return month_totals, paid_houses
+
+
 async def show_dashboard(query, group_id):
     """Show comprehensive dashboard with overall statistics and monthly overview"""
     try:
@@ -3799,93 +4574,49 @@ async def show_dashboard(query, group_id):
         unique_people_all = set()
         monthly_totals = {month: 0 for month in ETHIOPIAN_MONTHS}
 
-        for reason in PAYMENT_REASONS.keys():
-            try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
-                    continue
+        # Unformatted values: amounts arrive as numbers, no comma stripping/parsing
+        reason_values = await fetch_all_reason_values(sheets, value_render_option='UNFORMATTED_VALUE')
 
-                all_values = sheet.get_all_values()
-                
-                # Find TOTAL row (should have "TOTAL" in column B)
-                totals_row = None
-                for row in all_values:
-                    if len(row) > 1 and row[1] == 'TOTAL':
-                        totals_row = row
-                        break
+        for reason, all_values in reason_values.items():
+            try:
+                month_totals, unique_houses = scan_reason_values(reason, all_values)
                 
-                if totals_row:
-                    # Calculate total for this reason from all monthly totals
+                if month_totals is not None:
                     reason_total = 0
-                    for month_idx in range(len(ETHIOPIAN_MONTHS)):
-                        amount_col_idx = 3 + (month_idx * 2)
-                        if amount_col_idx < len(totals_row):
-                            try:
-                                value_str = str(totals_row[amount_col_idx]).strip()
-                                # Skip if empty or is a formula string
-                                if value_str and not value_str.startswith('='):
-                                    # Remove commas from formatted numbers
-                                    value_str = value_str.replace(',', '')
-                                    month_val = float(value_str)
-                                    monthly_totals[ETHIOPIAN_MONTHS[month_idx]] += month_val
-                                    reason_total += month_val
-                            except ValueError as e:
-                                logger.warning(f"Could not parse total value '{totals_row[amount_col_idx]}' for {reason} month {month_idx}")
-                                pass
-                    
-                    # Count unique house numbers that actually paid (have at least one amount)
-                    unique_houses = set()
-                    for row in all_values[2:]:  # Skip headers (rows 1-2)
-                        if row and len(row) > 1 and row[1] and row[1] != 'TOTAL':
-                            house_number = row[1].strip()
-                            if house_number:
-                                # Check if this house has any payment in any month
-                                has_payment = False
-                                for month_idx in range(len(ETHIOPIAN_MONTHS)):
-                                    amount_col_idx = 3 + (month_idx * 2)  # Amount column for each month
-                                    if amount_col_idx < len(row):
-                                        amount = row[amount_col_idx]
-                                        if amount and str(amount).strip():  # Has a value
-                                            try:
-                                                if float(amount) > 0:
-                                                    has_payment = True
-                                                    break
-                                            except:
-                                                pass
-                                
-                                if has_payment:
-                                    unique_houses.add(house_number)
-                                    unique_people_all.add(house_number)
+                    for month, month_val in month_totals.items():
+                        monthly_totals[month] += month_val
+                        reason_total += month_val
                     
+                    unique_people_all.update(unique_houses)
                     stats[reason] = {'total': reason_total, 'people': len(unique_houses)}
                     total_all += reason_total
 
             except Exception as e:
                 logger.error(f"Error reading stats for {reason}: {e}")
 
-        message = "📊 **Payment Dashboard**\n\n"
-        message += f"💰 **Grand Total: {total_all:,.2f} birr**\n"
-        message += f"👥 **Total People Paid: {len(unique_people_all)}**\n\n"
+        parts = ["📊 **Payment Dashboard**\n\n",
+                 f"💰 **Grand Total: {total_all:,.2f} birr**\n",
+                 f"👥 **Total People Paid: {len(unique_people_all)}**\n\n"]
         
-        message += "**By Payment Type:**\n"
+        parts.append("**By Payment Type:**\n")
         for reason, data in stats.items():
             if data['total'] > 0:
                 reason_display = PAYMENT_REASONS_AMHARIC.get(reason, reason.capitalize())
-                message += f"  • {reason_display}: {data['total']:,.2f} birr ({data['people']} people)\n"
+                parts.append(f"  • {reason_display}: {data['total']:,.2f} birr ({data['people']} people)\n")
         
-        message += "\n**Top 3 Months:**\n"
+        parts.append("\n**Top 3 Months:**\n")
         sorted_months = sorted(monthly_totals.items(), key=lambda x: x[1], reverse=True)[:3]
         for month, total in sorted_months:
             if total > 0:
                 month_display = ETHIOPIAN_MONTHS_AMHARIC.get(month, month)
-                message += f"  {month_display}: {total:,.2f} birr\n"
+                parts.append(f"  {month_display}: {total:,.2f} birr\n")
 
-        await query.message.reply_text(message, parse_mode='Markdown')
+        await query.message.reply_text("".join(parts), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error in show_dashboard: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 async def show_monthly_totals(query, group_id):
@@ -3896,73 +4627,56 @@ async def show_monthly_totals(query, group_id):
         monthly_totals = {month: 0 for month in ETHIOPIAN_MONTHS}
         monthly_breakdown = {month: {} for month in ETHIOPIAN_MONTHS}
 
-        for reason in PAYMENT_REASONS.keys():
-            try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
-                    continue
+        # Unformatted values: TOTAL row sums arrive as numbers, no comma stripping/parsing
+        reason_values = await fetch_all_reason_values(sheets, value_render_option='UNFORMATTED_VALUE')
 
-                # Use get_all_values() which returns formatted/calculated values
-                all_values = sheet.get_all_values()
-                
+        for reason, all_values in reason_values.items():
+            try:
                 # Find TOTAL row
-                totals_row = None
-                totals_row_idx = None
-                for idx, row in enumerate(all_values):
-                    if len(row) > 1 and row[1] == 'TOTAL':
-                        totals_row = row
-                        totals_row_idx = idx
-                        break
+                totals_row_idx = find_totals_row(all_values)
                 
-                if totals_row:
-                    for month_idx in range(len(ETHIOPIAN_MONTHS)):
-                        amount_col_idx = 3 + (month_idx * 2)
-                        if amount_col_idx < len(totals_row):
-                            try:
-                                value_str = str(totals_row[amount_col_idx]).strip()
-                                # Skip if empty or is a formula string
-                                if value_str and not value_str.startswith('='):
-                                    # Remove commas from formatted numbers
-                                    value_str = value_str.replace(',', '')
-                                    month_val = float(value_str)
-                                    month_name = ETHIOPIAN_MONTHS[month_idx]
-                                    monthly_totals[month_name] += month_val
-                                    
-                                    if month_val > 0:
-                                        if month_name not in monthly_breakdown:
-                                            monthly_breakdown[month_name] = {}
-                                        monthly_breakdown[month_name][reason] = month_val
-                            except ValueError as e:
-                                logger.warning(f"Could not parse value '{totals_row[amount_col_idx]}' for {reason} month {month_idx}: {e}")
-                                pass
+                if totals_row_idx is not None:
+                    totals_row = all_values[totals_row_idx]
+                    for month_name, value in zip(ETHIOPIAN_MONTHS, totals_row[AMOUNT_COLUMNS]):
+                        month_val = parse_amount(value)
+                        if month_val is not None:
+                            monthly_totals[month_name] += month_val
+                            
+                            if month_val > 0:
+                                if month_name not in monthly_breakdown:
+                                    monthly_breakdown[month_name] = {}
+                                monthly_breakdown[month_name][reason] = month_val
+                        elif str(value).strip() and not str(value).startswith('='):
+                            # Empty cells and unevaluated formula strings are skipped silently
+                            logger.warning(f"Could not parse value '{value}' for {reason} month {month_name}")
 
             except Exception as e:
                 logger.error(f"Error reading monthly totals for {reason}: {e}")
 
-        message = "📅 **Monthly Totals Report**\n\n"
+        parts = ["📅 **Monthly Totals Report**\n\n"]
         
         for month in ETHIOPIAN_MONTHS:
             total = monthly_totals[month]
             if total > 0:
                 month_display = ETHIOPIAN_MONTHS_AMHARIC.get(month, month)
-                message += f"**{month_display}:** {total:,.2f} birr\n"
+                parts.append(f"**{month_display}:** {total:,.2f} birr\n")
                 
                 # Show breakdown by payment type
                 if month in monthly_breakdown:
                     for reason, amount in monthly_breakdown[month].items():
                         reason_display = PAYMENT_REASONS_AMHARIC.get(reason, reason.capitalize())
-                        message += f"  • {reason_display}: {amount:,.2f} birr\n"
-                message += "\n"
+                        parts.append(f"  • {reason_display}: {amount:,.2f} birr\n")
+                parts.append("\n")
 
         if all(v == 0 for v in monthly_totals.values()):
-            message += "No payments recorded yet."
+            parts.append("No payments recorded yet.")
 
-        await query.message.reply_text(message, parse_mode='Markdown')
+        await query.message.reply_text("".join(parts), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error in show_monthly_totals: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 async def show_recent_payments(query, group_id):
@@ -3970,68 +4684,57 @@ async def show_recent_payments(query, group_id):
     try:
         sheets = setup_sheets(group_id)
         
-        all_payments = []
+        # Only the last 10 payments are shown: keep a bounded window of cheap
+        # (reason, row, month, amount_col, ftno_col) tuples while scanning and
+        # build dicts for the survivors only
+        recent_refs = deque(maxlen=10)
 
-        for reason in PAYMENT_REASONS.keys():
-            try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
-                    continue
+        reason_values = await fetch_all_reason_values(sheets)
 
-                values = sheet.get_all_values()
+        for reason, values in reason_values.items():
+            try:
                 # Skip 2 header rows, data starts at row 3 (index 2)
-                # Last row is TOTALS, skip it
-                for i in range(2, len(values) - 1):
-                    row = values[i]
-                    if len(row) > 2:
-                        house_number = row[1] if len(row) > 1 else ''  # Column B
-                        house_name = row[2] if len(row) > 2 else ''    # Column C
+                # Skip the TOTALS row (houses appended later can sit below it)
+                for row in values[2:]:
+                    if len(row) > 2 and row[1] != 'TOTAL':
+                        row_len = len(row)
                         
                         # Check each month's columns for payments
-                        for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                            amount_col_idx = 3 + (month_idx * 2)  # Amount column
-                            ftno_col_idx = amount_col_idx + 1     # FT No column
-                            
-                            if amount_col_idx < len(row):
-                                amount = row[amount_col_idx]
-                                if amount and str(amount).strip():
-                                    try:
-                                        float(amount)  # Validate it's a number
-                                        txid = row[ftno_col_idx] if ftno_col_idx < len(row) else ''
-                                        all_payments.append({
-                                            'house': house_number,
-                                            'name': house_name,
-                                            'amount': amount,
-                                            'month': month,
-                                            'txid': txid,
-                                            'type': reason
-                                        })
-                                    except:
-                                        pass
+                        for month, amount_col_idx, ftno_col_idx in MONTH_COLUMNS:
+                            if amount_col_idx < row_len:
+                                if parse_amount(row[amount_col_idx]) is not None:  # Validate it's a number
+                                    recent_refs.append((reason, row, month, amount_col_idx, ftno_col_idx))
             except Exception as e:
                 logger.error(f"Error reading {reason}: {e}")
 
         # Just take last 10 (can't sort by time since we don't have timestamps in this format)
-        recent = all_payments[-10:] if len(all_payments) > 10 else all_payments
+        recent = [{
+            'house': row[1],   # Column B
+            'name': row[2],    # Column C
+            'amount': row[amount_col_idx],
+            'month': month,
+            'txid': row[ftno_col_idx] if ftno_col_idx < len(row) else '',
+            'type': reason
+        } for reason, row, month, amount_col_idx, ftno_col_idx in recent_refs]
 
         if not recent:
             await query.message.reply_text("📭 No payments found.")
             return
 
-        message = "📊 **Last 10 Payments:**\n\n"
+        parts = ["📊 **Last 10 Payments:**\n\n"]
         for i, p in enumerate(recent, 1):
             reason_display = PAYMENT_REASONS_AMHARIC.get(p['type'], p['type'].capitalize())
             month_display = ETHIOPIAN_MONTHS_AMHARIC.get(p['month'], p['month'])
-            message += (f"{i}. 🏠 {p['house']} | {p['name']}\n"
-                        f"   💰 {p['amount']} birr | {reason_display}\n"
-                        f"   📆 {month_display}\n\n")
+            parts.append(f"{i}. 🏠 {p['house']} | {p['name']}\n"
+                         f"   💰 {p['amount']} birr | {reason_display}\n"
+                         f"   📆 {month_display}\n\n")
 
-        await query.message.reply_text(message, parse_mode='Markdown')
+        await query.message.reply_text("".join(parts), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error in show_recent_payments: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 async def prompt_house_search(query, group_id):
@@ -4057,24 +4760,20 @@ async def show_payment_stats(query, group_id):
         total_all = 0
         count_all = 0
 
-        for reason in PAYMENT_REASONS.keys():
-            try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
-                    continue
+        reason_values = await fetch_all_reason_values(sheets)
 
-                values = sheet.get_all_values()
+        for reason, values in reason_values.items():
+            try:
                 total_row = len(values)
 
-                # Get total from last row
+                # Get total from the TOTAL row already in `values` (sum of the
+                # monthly SUM cells) instead of a second acell() round-trip
                 if total_row > 1:
-                    total_value = sheet.acell(
-                        f'C{total_row}',
-                        value_render_option='UNFORMATTED_VALUE').value
-                    try:
-                        total = float(total_value) if total_value else 0
-                    except:
-                        total = 0
+                    totals_idx = find_totals_row(values)
+                    total = 0
+                    if totals_idx is not None:
+                        total = sum(parse_amount(value) or 0
+                                    for value in values[totals_idx][AMOUNT_COLUMNS])
 
                     count = total_row - 2  # Exclude header and total row
                     stats[reason] = {'total': total, 'count': count}
@@ -4101,7 +4800,7 @@ async def show_payment_stats(query, group_id):
     except Exception as e:
         logger.error(f"Error in show_payment_stats: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 async def show_all_houses(query, group_id):
@@ -4109,38 +4808,25 @@ async def show_all_houses(query, group_id):
     try:
         sheets = setup_sheets(group_id)
         
-        house_payments = defaultdict(int)
+        house_payments = Counter()
 
-        for reason in PAYMENT_REASONS.keys():
-            try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
-                    continue
+        reason_values = await fetch_all_reason_values(sheets)
+        amount_cols = AMOUNT_COLUMNS
+        parse = parse_amount
 
-                values = sheet.get_all_values()
+        for reason, values in reason_values.items():
+            try:
                 # Skip 2 header rows, data starts at row 3 (index 2)
-                # Last row is TOTALS, skip it
-                for i in range(2, len(values) - 1):
-                    row = values[i]
-                    if len(row) > 1:
-                        house_number = row[1]  # Column B (H.No)
-                        if house_number and house_number.strip():
-                            # Count how many months this house has payments for
-                            payment_count = 0
-                            for month_idx in range(len(ETHIOPIAN_MONTHS)):
-                                amount_col_idx = 3 + (month_idx * 2)  # Amount column
-                                if amount_col_idx < len(row):
-                                    amount = row[amount_col_idx]
-                                    if amount and str(amount).strip():
-                                        try:
-                                            if float(amount) > 0:
-                                                payment_count += 1
-                                        except ValueError as e:
-                                            logger.warning(f"Skipping non-numeric amount '{amount}' for house {house_number} in {reason}: {e}")
-                                            pass
-                            
-                            if payment_count > 0:
-                                house_payments[house_number] += payment_count
+                # Skip the TOTALS row (houses appended later can sit below it).
+                # Each paid month yields the house number (column B) once, so
+                # Counter.update tallies payments per house in one C-level pass
+                # (empty and non-numeric cells count as no payment)
+                house_payments.update(
+                    row[1]
+                    for row in values[2:]
+                    if len(row) > 1 and row[1] and row[1].strip() and row[1] != 'TOTAL'
+                    for amount in row[amount_cols]
+                    if (parse(amount) or 0) > 0)
             except Exception as e:
                 logger.error(f"Error reading houses from {reason}: {e}")
 
@@ -4151,18 +4837,11 @@ async def show_all_houses(query, group_id):
         # Sort by house number
         sorted_houses = sorted(house_payments.items())
 
-        # Create buttons (max 5 per row)
-        keyboard = []
-        row = []
-        for house, count in sorted_houses:
-            row.append(
-                InlineKeyboardButton(f"🏠 {house} ({count})",
-                                     callback_data=f"house_{house}"))
-            if len(row) == 3:
-                keyboard.append(row)
-                row = []
-        if row:
-            keyboard.append(row)
+        # Create buttons (3 per row)
+        buttons = [InlineKeyboardButton(f"🏠 {house} ({count})",
+                                        callback_data=f"house_{house}")
+                   for house, count in sorted_houses]
+        keyboard = [buttons[i:i + 3] for i in range(0, len(buttons), 3)]
 
         reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -4175,7 +4854,7 @@ async def show_all_houses(query, group_id):
     except Exception as e:
         logger.error(f"Error in show_all_houses: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 async def show_house_payments(query, house_number, group_id):
@@ -4186,50 +4865,47 @@ async def show_house_payments(query, house_number, group_id):
         
         house_data = []
 
-        for reason in PAYMENT_REASONS.keys():
+        reason_values = await fetch_all_reason_values(sheets)
+        house_key = house_number.strip()
+
+        for reason, values in reason_values.items():
             try:
-                sheet = sheets.get(reason) if sheets else None
-                if not sheet:
+                # Nothing below the 2 header rows: no houses to look at
+                if len(values) < 3:
+                    continue
+                
+                # House number is in column B (index 1); jump straight to its row
+                row_idx = get_house_index(sheets[reason], values).get(house_key)
+                if row_idx is None:
                     continue
+                row = values[row_idx]
 
-                values = sheet.get_all_values()
-                # Skip 2 header rows, data starts at row 3 (index 2)
-                # Last row is TOTALS, so skip it too
-                for i in range(2, len(values) - 1):
-                    row = values[i]
-                    # House number is in column B (index 1) - trim whitespace for comparison
-                    if len(row) > 1 and row[1].strip() == house_number.strip():
-                        # For each payment found, search all month columns
-                        # Structure: No (A=0), H.No (B=1), Name (C=2), then 2 cols per month
-                        house_name = row[2] if len(row) > 2 else ''
+                # Structure: No (A=0), H.No (B=1), Name (C=2), then 2 cols per month
+                house_name = row[2] if len(row) > 2 else ''
+                
+                row_len = len(row)
+                
+                # Check each month's Amount column for a payment
+                for month, amount_col_idx, ftno_col_idx in MONTH_COLUMNS:
+                    if row_len > amount_col_idx:
+                        amount = row[amount_col_idx]
                         
-                        # Check each month's Amount column for a payment
-                        for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                            amount_col_idx = 3 + (month_idx * 2)  # Amount column
-                            ftno_col_idx = amount_col_idx + 1     # FT No column
-                            
-                            if len(row) > amount_col_idx:
-                                amount = row[amount_col_idx]
-                                txid = row[ftno_col_idx] if len(row) > ftno_col_idx else ''
-                                
-                                # Only add if there's an amount
-                                if amount and amount.strip():
-                                    try:
-                                        # Try to convert to float to validate it's a number
-                                        amount_value = float(amount)
-                                        house_data.append({
-                                            'name': house_name,
-                                            'amount': str(amount_value),
-                                            'month': month,
-                                            'txid': txid,
-                                            'date': '',  # Not stored in current format
-                                            'recorded': '',  # Not stored in current format
-                                            'type': reason
-                                        })
-                                    except ValueError as e:
-                                        # Log the error for debugging but continue
-                                        logger.warning(f"Skipping non-numeric amount '{amount}' for house {house_number} in {reason}/{month}: {e}")
-                                        pass
+                        # Only add if there's a numeric amount
+                        amount_value = parse_amount(amount)
+                        if amount_value is not None:
+                            house_data.append({
+                                'name': house_name,
+                                'amount': str(amount_value),
+                                'value': amount_value,
+                                'month': month,
+                                'txid': row[ftno_col_idx] if row_len > ftno_col_idx else '',
+                                'date': '',  # Not stored in current format
+                                'recorded': '',  # Not stored in current format
+                                'type': reason
+                            })
+                        elif amount and amount.strip():
+                            # Log the error for debugging but continue
+                            logger.warning(f"Skipping non-numeric amount '{amount}' for house {house_number} in {reason}/{month}")
             except:
                 pass
 
@@ -4247,34 +4923,44 @@ async def show_house_payments(query, house_number, group_id):
         # Get house name from first payment
         house_name = house_data[0]['name'] if house_data else "Unknown"
 
-        total = sum(
-            float(p['amount']) if p['amount'] else 0 for p in house_data)
+        total = sum(p['value'] for p in house_data)
 
-        message = f"🏠 **House {house_number}**\n"
-        message += f"👤 {house_name}\n"
-        message += f"💰 Total: {total:,.2f} birr\n"
-        message += f"📊 {len(house_data)} payments\n\n"
-        message += "**Payment History:**\n\n"
+        # Collect fragments and join once per Telegram message (avoids O(n²) +=)
+        parts = [
+            f"🏠 **House {house_number}**\n"
+            f"👤 {house_name}\n"
+            f"💰 Total: {total:,.2f} birr\n"
+            f"📊 {len(house_data)} payments\n\n"
+            "**Payment History:**\n\n"
+        ]
+        size = len(parts[0])
+
+        # Bind the lookups once instead of per payment
+        reason_name = PAYMENT_REASONS_AMHARIC.get
+        month_name = ETHIOPIAN_MONTHS_AMHARIC.get
 
         for i, p in enumerate(house_data, 1):
-            reason_display = PAYMENT_REASONS_AMHARIC.get(p['type'], p['type'].capitalize())
-            month_display = ETHIOPIAN_MONTHS_AMHARIC.get(p['month'], p['month'])
-            message += (f"{i}. {reason_display}\n"
-                        f"   💰 {p['amount']} birr | 📆 {month_display}\n"
-                        f"   🔖 {p['txid']}\n\n")
+            reason_display = reason_name(p['type'], p['type'].capitalize())
+            month_display = month_name(p['month'], p['month'])
+            piece = (f"{i}. {reason_display}\n"
+                     f"   💰 {p['amount']} birr | 📆 {month_display}\n"
+                     f"   🔖 {p['txid']}\n\n")
+            parts.append(piece)
+            size += len(piece)
 
             # Split long messages
-            if len(message) > 3500:
-                await query.message.reply_text(message, parse_mode='Markdown')
-                message = ""
+            if size > 3500:
+                await query.message.reply_text("".join(parts), parse_mode='Markdown')
+                parts = []
+                size = 0
 
-        if message:
-            await query.message.reply_text(message, parse_mode='Markdown')
+        if parts:
+            await query.message.reply_text("".join(parts), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error in show_house_payments: {e}")
         error_msg = await query.message.reply_text(f"❌ Error: {e}")
-        asyncio.create_task(delete_message_after(error_msg, 600))
+        schedule_delete(error_msg, 600)
 
 
 # ========== HISTORY SCANNER (Telethon) ==========
@@ -4319,8 +5005,7 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
         return
     
     try:
-        from datetime import datetime
-        scan_date = datetime.strptime(args[0], '%Y-%m-%d')
+        scan_date = datetime.fromisoformat(args[0])
     except ValueError:
         await update.message.reply_text(
             "❌ Invalid date format. Use YYYY-MM-DD\n"
@@ -4340,18 +5025,6 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
     group_config = GROUP_CONFIGS[chat_id]
     topic_id = group_config.get('topic_id')
     
-    # Import Telethon
-    try:
-        from telethon import TelegramClient
-        from telethon.tl.types import MessageMediaPhoto
-    except ImportError:
-        await update.message.reply_text(
-            "❌ **Telethon not installed**\n\n"
-            "Run: `pip install telethon`",
-            parse_mode='Markdown'
-        )
-        return
-    
     # Send initial status message
     status_msg = await update.message.reply_text(
         f"🔍 **Starting history scan...**\n\n"
@@ -4362,12 +5035,16 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
     )
     
     try:
-        # Initialize Telethon client
-        global telethon_client
-        session_file = "telethon_session"
-        
-        client = TelegramClient(session_file, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
-        await client.start()
+        # Shared Telethon client (connected once, reused across scans)
+        try:
+            client = await get_telethon_client()
+        except ImportError:
+            await status_msg.edit_text(
+                "❌ **Telethon not installed**\n\n"
+                "Run: `pip install telethon`",
+                parse_mode='Markdown'
+            )
+            return
         
         if not await client.is_user_authorized():
             await status_msg.edit_text(
@@ -4376,7 +5053,6 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
                 "This is a one-time setup.",
                 parse_mode='Markdown'
             )
-            await client.disconnect()
             return
         
         # Get the target entity (group/channel)
@@ -4384,11 +5060,9 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
             entity = await client.get_entity(chat_id)
         except Exception as e:
             await status_msg.edit_text(f"❌ Could not access group: {e}")
-            await client.disconnect()
             return
         
         # Fetch messages with photos from the specified date
-        from datetime import timezone
         scan_date_utc = scan_date.replace(tzinfo=timezone.utc)
         
         messages_found = 0
@@ -4403,56 +5077,104 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
             parse_mode='Markdown'
         )
         
-        # Iterate through messages
-        async for message in client.iter_messages(
-            entity,
-            offset_date=None,  # Start from now
-            reverse=False,  # Go backwards in time
-        ):
-            # Stop if message is before our scan date
-            if message.date.replace(tzinfo=timezone.utc) < scan_date_utc:
-                break
-            
-            # Skip if no photo
-            if not message.photo:
-                continue
-            
-            # Skip if already processed
-            msg_key = (chat_id, message.id, message.reply_to.reply_to_top_id if message.reply_to else None)
-            if msg_key in processed_message_ids:
-                continue
-            
-            # Check topic if applicable
-            if topic_id:
-                msg_topic = message.reply_to.reply_to_top_id if message.reply_to else None
-                if msg_topic != topic_id:
+        loop = asyncio.get_running_loop()
+        download_slots = asyncio.Semaphore(SCAN_DOWNLOAD_CONCURRENCY)
+        pending_saves = {}
+        staged_saves = 0
+        scan_txids = set()
+        staged_digests = {}  # {msg_key: image digest} for receipts waiting in a batch
+        flush_tasks = set()  # Batch writes still in flight
+        flush_lock = asyncio.Lock()
+        
+        async def flush_scan_saves(batch):
+            """Write one staged batch and mark its messages as processed"""
+            nonlocal messages_saved
+            # One batch write at a time: each re-reads the cells it appends to
+            async with flush_lock:
+                saved_keys = await loop.run_in_executor(_sheets_pool, flush_sheet_saves, batch)
+            messages_saved += len(saved_keys)
+            # Persist right away so a crashed scan doesn't redo this batch
+            mark_messages_processed(saved_keys)
+            remember_saved_images(staged_digests.pop(key) for key in saved_keys if key in staged_digests)
+        
+        def start_flush():
+            """Hand the staged receipts to a background write and start a new batch"""
+            nonlocal pending_saves, staged_saves
+            # Swapped here, not when the task first runs, so nothing staged in
+            # the meantime can trigger a second write of the same batch
+            batch, pending_saves, staged_saves = pending_saves, {}, 0
+            task = asyncio.create_task(flush_scan_saves(batch))
+            flush_tasks.add(task)
+            task.add_done_callback(flush_tasks.discard)
+        
+        async def photo_messages():
+            """Walk the history and yield photo messages that still need processing"""
+            nonlocal messages_found
+            is_processed = processed_message_ids.__contains__  # Bound once, not per message
+            # With reverse=True, offset_date is a lower bound: Telegram only
+            # returns messages after the scan date, oldest first
+            async for message in client.iter_messages(
+                entity,
+                offset_date=scan_date_utc,
+                reverse=True,
+            ):
+                # Skip if no photo, or one too small to be a receipt
+                if not message.photo or not is_receipt_sized(message.photo):
                     continue
-            
-            messages_found += 1
-            
-            # Update progress every 10 messages
-            if messages_found % 10 == 0:
-                await status_msg.edit_text(
-                    f"🔍 **Scanning messages...**\n\n"
-                    f"📅 From: {args[0]}\n"
-                    f"📊 Found: {messages_found} photos\n"
-                    f"✅ Processed: {messages_processed}\n"
-                    f"💾 Saved: {messages_saved}",
-                    parse_mode='Markdown'
-                )
+                
+                # Thread id is read once and reused for the key and the topic check
+                # (getattr also covers reply headers without reply_to_top_id)
+                msg_topic = getattr(message.reply_to, 'reply_to_top_id', None)
+                
+                # Check topic if applicable
+                if topic_id and msg_topic != topic_id:
+                    continue
+                
+                # Skip if already processed
+                msg_key = pack_message_key(chat_id, message.id, msg_topic)
+                if is_processed(msg_key):
+                    continue
+                
+                messages_found += 1
+                
+                # Update progress every 10 messages
+                if messages_found % 10 == 0:
+                    await status_msg.edit_text(
+                        f"🔍 **Scanning messages...**\n\n"
+                        f"📅 From: {args[0]}\n"
+                        f"📊 Found: {messages_found} photos\n"
+                        f"✅ Processed: {messages_processed}\n"
+                        f"💾 Saved: {messages_saved}",
+                        parse_mode='Markdown'
+                    )
+                
+                yield message, msg_key
+        
+        async def process(item):
+            """Download, OCR and stage one photo message"""
+            nonlocal messages_processed, staged_saves
+            message, msg_key = item
             
             try:
                 # Download the photo
-                photo_bytes = await client.download_media(message.photo, bytes)
+                async with download_slots:
+                    photo_bytes = await download_photo_bytes(client, message.photo)
                 
                 if not photo_bytes:
-                    continue
+                    return
+                
+                # Same image as a receipt that is already saved: skip OCR
+                digest = image_digest(photo_bytes)
+                if digest in saved_image_digests:
+                    logger.info(f"⏭️ Skipping msg {message.id}: receipt image already saved")
+                    mark_message_processed(msg_key)
+                    return
                 
-                # Run OCR
-                ocr_text = extract_text_from_image(photo_bytes)
+                # Run OCR off the event loop
+                ocr_text = await loop.run_in_executor(_scan_ocr_pool, extract_text_from_image_cached, photo_bytes)
                 
                 if not ocr_text or len(ocr_text) < 20:
-                    continue
+                    return
                 
                 messages_processed += 1
                 
@@ -4470,32 +5192,31 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
                 
                 # Skip if missing critical data
                 if not amount or not txid:
-                    continue
+                    return
+                
+                # Already in the sheets, or posted twice during this scan
+                if txid.strip() in scan_txids:
+                    logger.info(f"⏭️ Skipping duplicate TXID: {txid}")
+                    return
                 
                 # Try to save to sheets
-                sheets = setup_sheets(chat_id)
                 if sheets:
                     try:
-                        # Check for duplicate TXID first
-                        is_duplicate = check_duplicate_txid(sheets, txid, None, group_id=chat_id)
-                        if is_duplicate:
-                            logger.info(f"⏭️ Skipping duplicate TXID: {txid}")
-                            continue
-                        
-                        # Save to appropriate sheet
-                        save_to_sheets(
-                            sheets=sheets,
-                            house_number=house_number or "Unknown",
-                            amount=amount,
-                            txid=txid,
-                            month=month,
-                            reason=payment_type,
-                            chat_id=chat_id
-                        )
-                        messages_saved += 1
-                        
-                        # Mark as processed
-                        processed_message_ids.add(msg_key)
+                        # Stage for the next batched write
+                        if queue_sheet_save(pending_saves, sheets,
+                                            house_number=house_number or "Unknown",
+                                            amount=amount,
+                                            txid=txid,
+                                            month=month,
+                                            reason=payment_type,
+                                            msg_key=msg_key,
+                                            reason_values=scan_values):
+                            scan_txids.add(txid.strip())
+                            staged_digests[msg_key] = digest
+                            staged_saves += 1
+                            if staged_saves >= SCAN_SAVE_BATCH_SIZE:
+                                # Write in the background; downloads and OCR carry on
+                                start_flush()
                         
                     except Exception as e:
                         errors.append(f"Save error for msg {message.id}: {str(e)[:50]}")
@@ -4505,11 +5226,26 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
                 errors.append(f"Processing error for msg {message.id}: {str(e)[:50]}")
                 logger.error(f"Error processing historical message {message.id}: {e}")
         
-        # Save processed message IDs
-        save_processed_messages()
+        # Open the sheets once for the whole scan
+        sheets = setup_sheets(chat_id)
         
-        # Disconnect Telethon
-        await client.disconnect()
+        # Load every sheet once: recorded TXIDs make duplicate checks set
+        # lookups, and staging checks houses against the same values. Read
+        # fresh (max_age=0): TXIDs the web app or a manual edit wrote within
+        # the cache window must not be recorded a second time
+        scan_values = await fetch_all_reason_values(sheets, max_age=0)
+        scan_txids.update(collect_recorded_txids(scan_values))
+        
+        # Fetching keeps running while earlier photos are downloaded and OCR'd
+        try:
+            await run_message_pipeline(photo_messages(), process)
+        finally:
+            # Write whatever is still staged (even if fetching failed part way)
+            # and wait for every batch write, so the saved count is final
+            if pending_saves:
+                start_flush()
+            if flush_tasks:
+                await asyncio.gather(*flush_tasks)
         
         # Final status
         result_msg = (
@@ -4534,6 +5270,33 @@ async def handle_scan_history_command(update: Update, context: ContextTypes.DEFA
 
 
 # ========== RESCAN COMMAND (ADMIN ONLY) ==========
+async def handle_reload_sheets_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Admin-only command to reopen this group's Google Sheets.
+    setup_sheets() caches the opened sheets for the life of the process; use
+    this after tabs were renamed, recreated or the spreadsheet was replaced.
+    """
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    
+    group_config = GROUP_CONFIGS.get(chat_id)
+    if not group_config:
+        await update.message.reply_text("❌ This group is not configured.")
+        return
+    
+    if user_id not in group_config.get('admin_user_ids', []):
+        await update.message.reply_text("❌ This command is for admins only.")
+        return
+    
+    invalidate_sheets_cache(chat_id)
+    sheets = await asyncio.get_running_loop().run_in_executor(_sheets_pool, setup_sheets, chat_id)
+    if sheets:
+        logger.info(f"🔄 Sheets reloaded for {chat_id} by admin {user_id}")
+        await update.message.reply_text(f"✅ Google Sheets reloaded ({len(sheets)} sheets)")
+    else:
+        await update.message.reply_text("❌ Could not open Google Sheets. Check the logs.")
+
+
 async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Admin-only command to rescan a specific message and its context.
@@ -4574,13 +5337,8 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
     status_msg = await update.message.reply_text("🔍 Rescan in progress...")
     
     try:
-        from telethon import TelegramClient
-        from datetime import timedelta
-        
-        # Initialize Telethon
-        session_file = "telethon_session"
-        client = TelegramClient(session_file, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
-        await client.start()
+        # Shared Telethon client
+        client = await get_telethon_client()
         
         # Get entity
         entity = await client.get_entity(chat_id)
@@ -4607,7 +5365,6 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
                 collected_messages.append(msg)
         
         if not collected_messages:
-            await client.disconnect()
             await status_msg.edit_text("❌ No messages found from this user in the time window.")
             return
         
@@ -4616,7 +5373,6 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
         text_messages = [m for m in collected_messages if m.message and not m.photo]
         
         if not photo_messages:
-            await client.disconnect()
             await status_msg.edit_text("❌ No photo messages found in the time window.")
             return
         
@@ -4635,11 +5391,13 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
         load_houses_for_group(chat_id)
         
         # Process each photo (client is still connected)
+        loop = asyncio.get_running_loop()
+        sheets = setup_sheets(chat_id)
         results = []
         for photo_msg in photo_messages:
             # Download and OCR
             try:
-                photo_bytes = await client.download_media(photo_msg.photo, bytes)
+                photo_bytes = await download_photo_bytes(client, photo_msg.photo)
             except Exception as dl_err:
                 results.append(f"⚠️ Download error for msg {photo_msg.id}: {dl_err}")
                 continue
@@ -4648,7 +5406,8 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
                 results.append(f"⚠️ Could not download photo {photo_msg.id}")
                 continue
             
-            ocr_text = extract_text_from_image(photo_bytes)
+            # OCR off the event loop so other chats keep being served
+            ocr_text = await loop.run_in_executor(_scan_ocr_pool, extract_text_from_image_cached, photo_bytes)
             if not ocr_text or len(ocr_text) < 20:
                 results.append(f"⚠️ OCR failed for msg {photo_msg.id}")
                 continue
@@ -4675,7 +5434,6 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
                 continue
             
             # Save to sheets
-            sheets = setup_sheets(chat_id)
             if sheets:
                 try:
                     save_to_sheets(
@@ -4704,9 +5462,6 @@ async def handle_rescan_command(update: Update, context: ContextTypes.DEFAULT_TY
                 except Exception as e:
                     results.append(f"❌ Save error: {e}")
         
-        # Disconnect client
-        await client.disconnect()
-        
         # Send result
         result_text = f"🔍 **Rescan Complete**\n\n"
         result_text += f"📊 Found {len(collected_messages)} messages from user\n"
@@ -4732,7 +5487,6 @@ def get_last_run_time():
 
 def save_last_run_time():
     """Save current time as last run time"""
-    from datetime import datetime
     try:
         with open(LAST_RUN_FILE, 'w') as f:
             json.dump({'last_run': datetime.now().isoformat()}, f)
@@ -4741,8 +5495,6 @@ def save_last_run_time():
 
 async def auto_scan_missed_messages():
     """Automatically scan messages missed while bot was offline"""
-    from datetime import datetime, timezone
-    
     # Check if Telethon is configured
     if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
         logger.info("ℹ️ Auto-scan skipped: Telethon not configured (set TELEGRAM_API_ID and TELEGRAM_API_HASH)")
@@ -4757,37 +5509,32 @@ async def auto_scan_missed_messages():
     
     try:
         last_run_dt = datetime.fromisoformat(last_run)
-    except:
+    except (TypeError, ValueError):
         logger.warning("⚠️ Could not parse last run time, skipping auto-scan")
         save_last_run_time()
         return
     
-    # Import Telethon
-    try:
-        from telethon import TelegramClient
-    except ImportError:
-        logger.warning("⚠️ Auto-scan skipped: Telethon not installed")
-        return
-    
     logger.info("=" * 60)
     logger.info("🔄 AUTO-SCAN: Checking for missed messages...")
     logger.info(f"📅 Last run: {last_run}")
     logger.info("=" * 60)
     
-    # Initialize Telethon
-    session_file = "telethon_session"
-    client = TelegramClient(session_file, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
-    
     try:
-        await client.start()
+        # Connect the shared Telethon client (kept open for later scans)
+        try:
+            client = await get_telethon_client()
+        except ImportError:
+            logger.warning("⚠️ Auto-scan skipped: Telethon not installed")
+            return
         
         if not await client.is_user_authorized():
             logger.warning("⚠️ Telethon not authenticated - run with --scan-history first")
-            await client.disconnect()
             save_last_run_time()
             return
         
         total_saved = 0
+        loop = asyncio.get_running_loop()
+        download_slots = asyncio.Semaphore(SCAN_DOWNLOAD_CONCURRENCY)
         
         # Scan each configured group
         for group_id, group_config in GROUP_CONFIGS.items():
@@ -4803,40 +5550,68 @@ async def auto_scan_missed_messages():
             
             messages_found = 0
             messages_saved = 0
+            # Receipts are staged and written one batch_update per reason sheet
+            # every SCAN_SAVE_BATCH_SIZE receipts, on _sheets_pool
+            pending_saves = {}
+            staged_saves = 0
+            staged_digests = {}  # {msg_key: image digest} for receipts waiting in a batch
+            flush_lock = asyncio.Lock()
             last_run_utc = last_run_dt.replace(tzinfo=timezone.utc) if last_run_dt.tzinfo is None else last_run_dt
             
+            # Only messages after the last run (offset_date is a lower bound with reverse=True)
+            iter_kwargs = {'offset_date': last_run_utc, 'reverse': True}
             # For forum topics, use reply_to parameter
-            iter_kwargs = {'reverse': False}
             if topic_id:
                 iter_kwargs['reply_to'] = topic_id
             
-            async for message in client.iter_messages(entity, **iter_kwargs):
-                msg_date = message.date.replace(tzinfo=timezone.utc) if message.date.tzinfo is None else message.date
-                
-                # Stop if message is before last run
-                if msg_date < last_run_utc:
-                    break
-                
-                # Skip non-photo
-                if not message.photo:
-                    continue
-                
-                # Skip if already processed
-                msg_key = (group_id, message.id, message.reply_to.reply_to_top_id if message.reply_to else None)
-                if msg_key in processed_message_ids:
-                    continue
-                
-                messages_found += 1
-                
+            async def missed_photos():
+                nonlocal messages_found
+                is_processed = processed_message_ids.__contains__  # Bound once, not per message
+                async for message in client.iter_messages(entity, **iter_kwargs):
+                    # Skip non-photo (and photos too small to be a receipt)
+                    if not message.photo or not is_receipt_sized(message.photo):
+                        continue
+                    
+                    # Skip if already processed
+                    msg_key = pack_message_key(group_id, message.id, getattr(message.reply_to, 'reply_to_top_id', None))
+                    if is_processed(msg_key):
+                        continue
+                    
+                    messages_found += 1
+                    yield message, msg_key
+            
+            async def flush_group_saves():
+                """Write the staged receipts and mark their messages as processed"""
+                nonlocal pending_saves, staged_saves, messages_saved
+                batch, pending_saves, staged_saves = pending_saves, {}, 0
+                # One batch write at a time: each re-reads the cells it appends to
+                async with flush_lock:
+                    saved_keys = await loop.run_in_executor(_sheets_pool, flush_sheet_saves, batch)
+                messages_saved += len(saved_keys)
+                mark_messages_processed(saved_keys)
+                remember_saved_images(staged_digests.pop(key) for key in saved_keys if key in staged_digests)
+                if saved_keys:
+                    logger.info(f"  ✅ Saved {len(saved_keys)} receipt(s)")
+            
+            async def process(item):
+                nonlocal staged_saves
+                message, msg_key = item
                 try:
                     # Download and OCR
-                    photo_bytes = await client.download_media(message.photo, bytes)
+                    async with download_slots:
+                        photo_bytes = await download_photo_bytes(client, message.photo)
                     if not photo_bytes:
-                        continue
+                        return
                     
-                    ocr_text = extract_text_from_image(photo_bytes)
+                    # Same image as a receipt that is already saved: skip OCR
+                    digest = image_digest(photo_bytes)
+                    if digest in saved_image_digests:
+                        mark_message_processed(msg_key)
+                        return
+                    
+                    ocr_text = await loop.run_in_executor(_scan_ocr_pool, extract_text_from_image_cached, photo_bytes)
                     if not ocr_text or len(ocr_text) < 20:
-                        continue
+                        return
                     
                     # Extract data using main extraction function
                     caption = message.message or ""
@@ -4849,35 +5624,46 @@ async def auto_scan_missed_messages():
                     payment_type = data.get('reason', 'other')
                     
                     if not amount or not txid:
-                        continue
+                        return
                     
-                    # Save to sheets
-                    sheets = setup_sheets(group_id)
+                    # Stage for the next batched write (no sheet I/O on the event loop)
                     if sheets:
-                        save_to_sheets(
-                            sheets=sheets,
-                            house_number=house_number or "Unknown",
-                            amount=amount,
-                            txid=txid,
-                            month=month,
-                            reason=payment_type,
-                            chat_id=group_id
-                        )
-                        messages_saved += 1
-                        processed_message_ids.add(msg_key)
-                        logger.info(f"  ✅ Saved: House {house_number}, {amount} birr")
+                        if queue_sheet_save(pending_saves, sheets,
+                                            house_number=house_number or "Unknown",
+                                            amount=amount,
+                                            txid=txid,
+                                            month=month,
+                                            reason=payment_type,
+                                            msg_key=msg_key,
+                                            reason_values=group_values):
+                            staged_digests[msg_key] = digest
+                            staged_saves += 1
+                            if staged_saves >= SCAN_SAVE_BATCH_SIZE:
+                                await flush_group_saves()
+                        else:
+                            # House or sheet not found: nothing to retry later
+                            mark_message_processed(msg_key)
                 
                 except Exception as e:
                     logger.error(f"  ❌ Error processing msg {message.id}: {e}")
             
+            # Open this group's sheets once, not per receipt, and read them once
+            # so staging can check houses without a sheet read per batch
+            sheets = setup_sheets(group_id)
+            group_values = await fetch_all_reason_values(sheets)
+            
+            # Fetch and process concurrently so downloads/OCR don't stall iter_messages
+            try:
+                await run_message_pipeline(missed_photos(), process)
+            finally:
+                # Write whatever is still staged
+                if pending_saves:
+                    await flush_group_saves()
+            
             if messages_found > 0:
                 logger.info(f"  📊 {group_name}: Found {messages_found}, Saved {messages_saved}")
                 total_saved += messages_saved
         
-        # Save progress
-        save_processed_messages()
-        await client.disconnect()
-        
         if total_saved > 0:
             logger.info(f"✅ Auto-scan complete: {total_saved} new receipts saved")
         else:
@@ -4885,10 +5671,6 @@ async def auto_scan_missed_messages():
         
     except Exception as e:
         logger.error(f"❌ Auto-scan error: {e}")
-        try:
-            await client.disconnect()
-        except:
-            pass
     
     # Update last run time
     save_last_run_time()
@@ -4906,6 +5688,11 @@ async def post_init(application):
     # Run auto-scan for missed messages
     await auto_scan_missed_messages()
 
+async def post_shutdown(application):
+    """Close the shared Telethon connection and compact the processed-messages DB"""
+    await close_telethon_client()
+    compact_processed_db()
+
 
 
 # ========== USER REGISTRATION APPROVAL SYSTEM ==========
@@ -5014,8 +5801,6 @@ async def notify_admins_of_registration(bot, request):
         )
         
         # Create inline keyboard with Approve/Reject buttons
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-        
         keyboard = [
             [
                 InlineKeyboardButton("✅ Approve", callback_data=f"reg_approve:{request_id}"),
@@ -5081,7 +5866,6 @@ async def handle_registration_callbacks(update: Update, context: ContextTypes.DE
                 # Update request status
                 request['status'] = 'approved'
                 request['approved_by'] = query.from_user.id
-                from datetime import datetime
                 request['approved_at'] = datetime.now().isoformat()
                 save_pending_registrations_file(pending)
                 
@@ -5112,7 +5896,6 @@ async def handle_registration_callbacks(update: Update, context: ContextTypes.DE
             # Update request status
             request['status'] = 'rejected'
             request['rejected_by'] = query.from_user.id
-            from datetime import datetime
             request['rejected_at'] = datetime.now().isoformat()
             save_pending_registrations_file(pending)
             
@@ -5157,7 +5940,7 @@ def main():
     
     logger.info("=" * 60)
 
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    application = Application.builder().token(BOT_TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
 
     # Add command handlers
     application.add_handler(CommandHandler("start", handle_start_command))
@@ -5166,6 +5949,7 @@ def main():
     application.add_handler(CommandHandler("admin", handle_admin_command))
     application.add_handler(CommandHandler("scan_history", handle_scan_history_command))
     application.add_handler(CommandHandler("rescan", handle_rescan_command))
+    application.add_handler(CommandHandler("reload_sheets", handle_reload_sheets_command))
 
     # Add button click handlers
     application.add_handler(
@@ -5215,11 +5999,9 @@ async def run_terminal_history_scan(scan_date_str: str, group_id: int = None, no
         group_id: Group ID to scan (optional)
         notify: If True, send confirmation messages to the group
     """
-    from datetime import datetime, timezone
-    
     # Validate date
     try:
-        scan_date = datetime.strptime(scan_date_str, '%Y-%m-%d')
+        scan_date = datetime.fromisoformat(scan_date_str)
     except ValueError:
         logger.error(f"❌ Invalid date format: {scan_date_str}. Use YYYY-MM-DD")
         return
@@ -5280,271 +6062,296 @@ async def run_terminal_history_scan(scan_date_str: str, group_id: int = None, no
     # Load house map for this group (needed for name lookup during extraction)
     load_houses_for_group(group_id)
     
-    # ========== PHASE 1: Collect all messages ==========
-    logger.info("⏳ Phase 1: Collecting messages...")
+    # ========== Collect, group and process as one stream ==========
+    # Phase 1 (collect), Phase 2 (group by user) and Phase 3 (OCR and save)
+    # overlap: each photo goes to the workers as soon as its grouping window
+    # closes, so Telegram I/O and OCR run at the same time.
+    logger.info("⏳ Scanning messages (collect, group and process)...")
     
     scan_date_utc = scan_date.replace(tzinfo=timezone.utc)
-    all_messages = []
     
+    # Only messages after the scan date: with reverse=True Telethon treats
+    # offset_date as a lower bound, so older history is never transferred
+    iter_kwargs = {'offset_date': scan_date_utc, 'reverse': True}
     # For forum topics, we need to use reply_to parameter to filter by topic
-    iter_kwargs = {'reverse': False}
     if topic_id:
         iter_kwargs['reply_to'] = topic_id
         logger.info(f"🔍 Filtering by topic ID: {topic_id}")
     
-    async for message in client.iter_messages(entity, **iter_kwargs):
-        # Stop if message is before scan date
-        if message.date.replace(tzinfo=timezone.utc) < scan_date_utc:
-            break
-        
-        # Skip if already processed
-        msg_key = (group_id, message.id, message.reply_to.reply_to_top_id if message.reply_to else None)
-        if msg_key in processed_message_ids:
-            continue
-        
-        all_messages.append(message)
-    
-    logger.info(f"📊 Collected {len(all_messages)} messages")
-    
-    # ========== PHASE 2: Group messages by user with time window ==========
-    logger.info("⏳ Phase 2: Grouping messages by user...")
-    
-    from datetime import timedelta
     GROUP_WINDOW = timedelta(minutes=3)  # Group messages within 3 minutes
     
-    # Group messages: {user_id: [(photo_msg, [nearby_text_msgs])]}
-    user_message_groups = {}
+    messages_collected = 0
+    messages_found = 0
+    messages_processed = 0
+    messages_saved = 0
+    loop = asyncio.get_running_loop()
+    sheets = setup_sheets(group_id)  # Opened once for the whole scan
+    
+    # Read every sheet once (one batchGet, fresh rather than from the values
+    # cache so no recently written TXID is missed) and keep the recorded TXIDs
+    # in a set, instead of re-reading all sheets for every photo
+    scan_values = await fetch_all_reason_values(sheets, max_age=0)
+    seen_txids = collect_recorded_txids(scan_values)
+    logger.info(f"📊 Loaded {len(seen_txids)} existing TXIDs")
+    
+    # Receipts are staged and written one batch_update per reason sheet every
+    # SCAN_SAVE_BATCH_SIZE receipts; notifications go out once a batch is written
+    pending_saves = {}
+    saved_details = {}  # {msg_key: (message, data, house_number, amount, month, txid, payment_type)}
+    staged_digests = {}  # {msg_key: image digest}
+    
+    # One pooled HTTP client for every Bot API call of this scan (replies and
+    # their auto-deletes), instead of a new connection + TLS handshake per call
+    bot_api_client = None
+    if notify:
+        import httpx
+        bot_api_client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=20))
+    
+    async def delete_after_delay(msg_id, delay):
+        await asyncio.sleep(delay)
+        try:
+            del_url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteMessage"
+            del_payload = {"chat_id": group_id, "message_id": msg_id}
+            await bot_api_client.post(del_url, json=del_payload)
+        except:
+            pass
     
-    for msg in all_messages:
-        if not msg.photo:
-            continue
+    async def notify_saved(message, data, house_number, amount, month, txid, payment_type):
+        """Reply to a saved receipt in the group (same format as the live bot)"""
+        try:
+            # Get month and reason in Amharic for display
+            month_display = ETHIOPIAN_MONTHS_AMHARIC.get(month, month)
+            reason_display = PAYMENT_REASONS_AMHARIC.get(payment_type, payment_type.capitalize())
+            
+            # Match the normal bot message format
+            sender_id = message.sender_id or 0
+            notify_msg = (
+                f"✅ ተመዝግቧል!\n\n"
+                f"🏠 ቤት: {house_number or '—'}\n"
+                f"👤 ስም: {data.get('name') or '—'}\n"
+                f"💰 መጠን: {amount} ብር\n"
+                f"📆 ወር: {month_display or '—'}\n"
+                f"🔖 T: {txid or '—'}\n"
+                f"📊 ምክንያት: {reason_display}"
+            )
+            
+            # Create inline keyboard with Edit and History buttons
+            history_url = f"https://t.me/{BOT_USERNAME}?start=history_{sender_id}_{house_number}_{group_id}" if BOT_USERNAME else None
+            
+            if history_url:
+                inline_keyboard = [
+                    [
+                        {"text": "እንደገና ልላክ ✏️", "callback_data": f"edit_{sender_id}"},
+                        {"text": "ታሪክ 📋", "url": history_url}
+                    ]
+                ]
+            else:
+                inline_keyboard = [
+                    [
+                        {"text": "እንደገና ልላክ ✏️", "callback_data": f"edit_{sender_id}"},
+                        {"text": "ታሪክ 📋", "callback_data": f"history_{sender_id}_{house_number}"}
+                    ]
+                ]
+            
+            # Use Bot API to send message (so it comes from the bot, not user)
+            bot_api_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+            payload = {
+                "chat_id": group_id,
+                "text": notify_msg,
+                "reply_to_message_id": message.id,
+                "reply_markup": {"inline_keyboard": inline_keyboard}
+            }
+            # Add topic_id if it's a forum group
+            if topic_id:
+                payload["message_thread_id"] = topic_id
+            
+            response = await bot_api_client.post(bot_api_url, json=payload)
+            if response.status_code == 200:
+                # Schedule auto-delete after 10 minutes (600 seconds)
+                result = response.json()
+                if result.get('ok') and result.get('result', {}).get('message_id'):
+                    sent_msg_id = result['result']['message_id']
+                    # Create task for deletion (non-blocking)
+                    asyncio.create_task(delete_after_delay(sent_msg_id, 600))
+            else:
+                logger.warning(f"⚠️ Bot API error: {response.text}")
+            
+        except Exception as notify_err:
+            logger.warning(f"⚠️ Could not send notification: {notify_err}")
+    
+    async def flush_saves():
+        nonlocal messages_saved
+        saved_keys = flush_sheet_saves(pending_saves)
+        # Take this batch's details before awaiting; other workers keep staging
+        details = saved_details.copy()
+        saved_details.clear()
+        mark_messages_processed(saved_keys)
+        remember_saved_images(staged_digests.pop(key) for key in saved_keys if key in staged_digests)
+        messages_saved += len(saved_keys)
+        for key in saved_keys:
+            message, data, house_number, amount, month, txid, payment_type = details[key]
+            logger.info(f"✅ Saved: House {house_number}, {amount} birr, TXID: {txid[:15]}...")
+            if notify:
+                await notify_saved(message, data, house_number, amount, month, txid, payment_type)
+    
+    download_slots = asyncio.Semaphore(SCAN_DOWNLOAD_CONCURRENCY)
+    
+    async def photo_groups():
+        """Yield (photo_msg, msg_key, nearby_texts) as soon as each photo's time window closes"""
+        nonlocal messages_collected
+        # Messages arrive oldest first, so once a message is more than
+        # GROUP_WINDOW newer than a photo, no later text can join its group
+        user_texts = defaultdict(deque)  # {user_id: deque of (date, text)}, oldest first
+        waiting_photos = deque()  # (photo, msg_key) whose window is still open, oldest first
         
-        user_id = msg.sender_id or 0
-        if user_id not in user_message_groups:
-            user_message_groups[user_id] = []
+        is_processed = processed_message_ids.__contains__  # Bound once, not per message
         
-        # Find nearby text messages from the same user (within time window)
-        nearby_texts = []
-        for other_msg in all_messages:
-            if other_msg.id == msg.id:
-                continue
-            if (other_msg.sender_id or 0) != user_id:
-                continue
-            if other_msg.photo:  # Skip other photos
-                continue
-            if not other_msg.message:  # Skip empty messages
+        def close_window(waiting):
+            photo_msg, msg_key = waiting
+            # Nearby text messages from the same user, newest first
+            start = photo_msg.date - GROUP_WINDOW
+            end = photo_msg.date + GROUP_WINDOW
+            nearby_texts = [text for date, text in user_texts.get(photo_msg.sender_id or 0, ()) if start <= date <= end]
+            nearby_texts.reverse()
+            return photo_msg, msg_key, nearby_texts
+        
+        async for message in client.iter_messages(entity, **iter_kwargs):
+            # Skip if already processed
+            msg_key = pack_message_key(group_id, message.id, getattr(message.reply_to, 'reply_to_top_id', None))
+            if is_processed(msg_key):
                 continue
+            messages_collected += 1
             
-            # Check if within time window
-            time_diff = abs((msg.date - other_msg.date).total_seconds())
-            if time_diff <= GROUP_WINDOW.total_seconds():
-                nearby_texts.append(other_msg.message)
+            while waiting_photos and waiting_photos[0][0].date + GROUP_WINDOW < message.date:
+                yield close_window(waiting_photos.popleft())
+            
+            if message.photo:
+                # Photos too small to be a receipt are never downloaded
+                if is_receipt_sized(message.photo):
+                    waiting_photos.append((message, msg_key))  # Key travels with the photo
+            elif message.message:
+                texts = user_texts[message.sender_id or 0]
+                texts.append((message.date, message.message))
+                # Texts this old can't fall in any still-open window
+                while texts[0][0] < message.date - 2 * GROUP_WINDOW:
+                    texts.popleft()
         
-        user_message_groups[user_id].append((msg, nearby_texts))
-    
-    total_groups = sum(len(groups) for groups in user_message_groups.values())
-    logger.info(f"📊 Created {total_groups} message groups from {len(user_message_groups)} users")
-    
-    # ========== PHASE 3: Process each message group ==========
-    logger.info("⏳ Phase 3: Processing message groups...")
-    
-    messages_found = 0
-    messages_processed = 0
-    messages_saved = 0
-    
-    for user_id, groups in user_message_groups.items():
-        for photo_msg, nearby_texts in groups:
-            messages_found += 1
+        while waiting_photos:
+            yield close_window(waiting_photos.popleft())
+    
+    async def process(item):
+        """Download, OCR, extract and stage one photo (with its nearby texts)"""
+        nonlocal messages_found, messages_processed
+        photo_msg, msg_key, nearby_texts = item
+        messages_found += 1
+        
+        if messages_found % 10 == 0:
+            logger.info(f"📊 Found: {messages_found} | Processed: {messages_processed} | Saved: {messages_saved}")
+        
+        message = photo_msg  # For compatibility with rest of code
+        
+        try:
+            # Download photo (a few at a time, see SCAN_DOWNLOAD_CONCURRENCY)
+            async with download_slots:
+                photo_bytes = await download_photo_bytes(client, message.photo)
+            if not photo_bytes:
+                return
             
-            if messages_found % 10 == 0:
-                logger.info(f"📊 Found: {messages_found} | Processed: {messages_processed} | Saved: {messages_saved}")
+            # Same image as a receipt that is already saved: skip OCR
+            digest = image_digest(photo_bytes)
+            if digest in saved_image_digests:
+                logger.info(f"⏭️ Skipping msg {message.id}: receipt image already saved")
+                mark_message_processed(msg_key)
+                return
             
-            message = photo_msg  # For compatibility with rest of code
-            msg_key = (group_id, message.id, message.reply_to.reply_to_top_id if message.reply_to else None)
+            # Run OCR off the event loop
+            ocr_text = await loop.run_in_executor(_scan_ocr_pool, extract_text_from_image_cached, photo_bytes)
+            if not ocr_text or len(ocr_text) < 20:
+                return
             
-            try:
-                # Download photo
-                photo_bytes = await client.download_media(message.photo, bytes)
-                if not photo_bytes:
-                    continue
-                
-                # Run OCR
-                ocr_text = extract_text_from_image(photo_bytes)
-                if not ocr_text or len(ocr_text) < 20:
-                    continue
-                
-                messages_processed += 1
-                
-                # Combine caption + nearby text messages for better extraction
-                caption = message.message or ""
-                combined_user_text = " ".join(nearby_texts) if nearby_texts else ""
-                full_context = f"{caption} {combined_user_text}".strip()
-                
-                if nearby_texts:
-                    logger.info(f"   📝 Combined {len(nearby_texts)} nearby text(s): {nearby_texts}")
-                    logger.info(f"   📝 Full context: {full_context[:100]}...")
-                
-                # ========== FULL EXTRACTION (like normal bot) ==========
-                # Use the buffered extraction function for comprehensive extraction
-                data = extract_payment_data_buffered(
-                    combined_text=ocr_text,
-                    caption=full_context,
-                    user_text=combined_user_text,
-                    is_edit_mode=False,
-                    original_data=None,
-                    chat_id=group_id
-                )
-                
-                amount = data.get('amount')
-                txid = data.get('transaction_id')
-                house_number = data.get('house_number')
-                month = data.get('month') or 'Tir'
-                payment_type = data.get('reason', 'other')
-                sender_name = data.get('name') or '—'
-                
-                # Skip if missing critical data
-                if not amount or not txid:
-                    logger.info(f"⏭️ Skipping msg {message.id}: missing amount ({amount}) or TXID ({txid})")
-                    continue
-                
-                # ========== BENEFICIARY VALIDATION ==========
-                beneficiary = extract_beneficiary_from_receipt(ocr_text)
-                is_valid_beneficiary, normalized_beneficiary = validate_beneficiary(beneficiary)
-                
-                if not is_valid_beneficiary and beneficiary:
-                    logger.warning(f"⚠️ Invalid beneficiary: {beneficiary}")
-                    # Still process but log the warning
-                
-                # ========== DUPLICATE TXID CHECK ==========
-                sheets = setup_sheets(group_id)
-                if sheets:
-                    # Check all sheets for duplicate TXID
-                    is_duplicate = False
-                    duplicate_location = None
-                    
-                    for sheet_reason, sheet in sheets.items():
-                        try:
-                            all_values = sheet.get_all_values()
-                            for row in all_values:
-                                for cell in row:
-                                    if txid and txid in str(cell):
-                                        is_duplicate = True
-                                        duplicate_location = sheet_reason
-                                        break
-                                if is_duplicate:
-                                    break
-                        except Exception as e:
-                            logger.warning(f"Could not check sheet {sheet_reason}: {e}")
-                        if is_duplicate:
-                            break
-                    
-                    if is_duplicate:
-                        logger.info(f"⏭️ Skipping duplicate TXID: {txid} (found in {duplicate_location})")
-                        continue
-                    
-                    # ========== SAVE TO SHEETS ==========
-                    try:
-                        save_to_sheets(
-                            sheets=sheets,
-                            house_number=house_number or "Unknown",
-                            amount=amount,
-                            txid=txid,
-                            month=month,
-                            reason=payment_type,
-                            chat_id=group_id
-                        )
-                        messages_saved += 1
-                        processed_message_ids.add(msg_key)
-                        logger.info(f"✅ Saved: House {house_number}, {amount} birr, TXID: {txid[:15]}...")
-                        
-                        # Send notification to group if notify flag is set
-                        if notify:
-                            try:
-                                # Get month and reason in Amharic for display
-                                month_display = ETHIOPIAN_MONTHS_AMHARIC.get(month, month)
-                                reason_display = PAYMENT_REASONS_AMHARIC.get(payment_type, payment_type.capitalize())
-                                
-                                # Match the normal bot message format
-                                sender_id = message.sender_id or 0
-                                notify_msg = (
-                                    f"✅ ተመዝግቧል!\n\n"
-                                    f"🏠 ቤት: {house_number or '—'}\n"
-                                    f"👤 ስም: {data.get('name') or '—'}\n"
-                                    f"💰 መጠን: {amount} ብር\n"
-                                    f"📆 ወር: {month_display or '—'}\n"
-                                    f"🔖 T: {txid or '—'}\n"
-                                    f"📊 ምክንያት: {reason_display}"
-                                )
-                                
-                                # Create inline keyboard with Edit and History buttons
-                                history_url = f"https://t.me/{BOT_USERNAME}?start=history_{sender_id}_{house_number}_{group_id}" if BOT_USERNAME else None
-                                
-                                if history_url:
-                                    inline_keyboard = [
-                                        [
-                                            {"text": "እንደገና ልላክ ✏️", "callback_data": f"edit_{sender_id}"},
-                                            {"text": "ታሪክ 📋", "url": history_url}
-                                        ]
-                                    ]
-                                else:
-                                    inline_keyboard = [
-                                        [
-                                            {"text": "እንደገና ልላክ ✏️", "callback_data": f"edit_{sender_id}"},
-                                            {"text": "ታሪክ 📋", "callback_data": f"history_{sender_id}_{house_number}"}
-                                        ]
-                                    ]
-                                
-                                # Use Bot API to send message (so it comes from the bot, not user)
-                                import httpx
-                                bot_api_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-                                payload = {
-                                    "chat_id": group_id,
-                                    "text": notify_msg,
-                                    "reply_to_message_id": message.id,
-                                    "reply_markup": {"inline_keyboard": inline_keyboard}
-                                }
-                                # Add topic_id if it's a forum group
-                                if topic_id:
-                                    payload["message_thread_id"] = topic_id
-                                
-                                async with httpx.AsyncClient() as http_client:
-                                    response = await http_client.post(bot_api_url, json=payload)
-                                    if response.status_code == 200:
-                                        # Schedule auto-delete after 10 minutes (600 seconds)
-                                        result = response.json()
-                                        if result.get('ok') and result.get('result', {}).get('message_id'):
-                                            sent_msg_id = result['result']['message_id']
-                                            # Use asyncio to schedule deletion
-                                            async def delete_after_delay(msg_id, delay):
-                                                await asyncio.sleep(delay)
-                                                try:
-                                                    async with httpx.AsyncClient() as del_client:
-                                                        del_url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteMessage"
-                                                        del_payload = {"chat_id": group_id, "message_id": msg_id}
-                                                        await del_client.post(del_url, json=del_payload)
-                                                except:
-                                                    pass
-                                            # Create task for deletion (non-blocking)
-                                            import asyncio
-                                            asyncio.create_task(delete_after_delay(sent_msg_id, 600))
-                                    else:
-                                        logger.warning(f"⚠️ Bot API error: {response.text}")
-                                
-                            except Exception as notify_err:
-                                logger.warning(f"⚠️ Could not send notification: {notify_err}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Save error: {e}")
+            messages_processed += 1
             
-            except Exception as e:
-                logger.error(f"❌ Processing error for msg {message.id}: {e}")
+            # Combine caption + nearby text messages for better extraction
+            caption = message.message or ""
+            combined_user_text = " ".join(nearby_texts) if nearby_texts else ""
+            full_context = f"{caption} {combined_user_text}".strip()
+            
+            if nearby_texts and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"   📝 Combined {len(nearby_texts)} nearby text(s): {nearby_texts}")
+                logger.debug(f"   📝 Full context: {full_context[:100]}...")
+            
+            # ========== FULL EXTRACTION (like normal bot) ==========
+            # Use the buffered extraction function for comprehensive extraction
+            data = extract_payment_data_buffered(
+                combined_text=ocr_text,
+                caption=full_context,
+                user_text=combined_user_text,
+                is_edit_mode=False,
+                original_data=None,
+                chat_id=group_id
+            )
+            
+            amount = data.get('amount')
+            txid = data.get('transaction_id')
+            house_number = data.get('house_number')
+            month = data.get('month') or 'Tir'
+            payment_type = data.get('reason', 'other')
+            sender_name = data.get('name') or '—'
+            
+            # Skip if missing critical data
+            if not amount or not txid:
+                logger.info(f"⏭️ Skipping msg {message.id}: missing amount ({amount}) or TXID ({txid})")
+                return
+            
+            # ========== BENEFICIARY VALIDATION ==========
+            beneficiary = extract_beneficiary_from_receipt(ocr_text)
+            is_valid_beneficiary, normalized_beneficiary = validate_beneficiary(beneficiary)
+            
+            if not is_valid_beneficiary and beneficiary:
+                logger.warning(f"⚠️ Invalid beneficiary: {beneficiary}")
+                # Still process but log the warning
+            
+            # ========== DUPLICATE TXID CHECK ==========
+            if sheets:
+                # O(1) lookup in the TXIDs loaded before Phase 3
+                if txid.strip() in seen_txids:
+                    logger.info(f"⏭️ Skipping duplicate TXID: {txid}")
+                    return
+                
+                # ========== STAGE FOR BATCHED SAVE ==========
+                try:
+                    if queue_sheet_save(pending_saves, sheets,
+                                        house_number=house_number or "Unknown",
+                                        amount=amount,
+                                        txid=txid,
+                                        month=month,
+                                        reason=payment_type,
+                                        msg_key=msg_key,
+                                        reason_values=scan_values):
+                        seen_txids.add(txid.strip())
+                        saved_details[msg_key] = (message, data, house_number, amount, month, txid, payment_type)
+                        staged_digests[msg_key] = digest
+                        if len(saved_details) >= SCAN_SAVE_BATCH_SIZE:
+                            await flush_saves()
+                except Exception as e:
+                    logger.error(f"❌ Save error: {e}")
+        
+        except Exception as e:
+            logger.error(f"❌ Processing error for msg {message.id}: {e}")
+    
+    # Photos are downloaded and OCR'd concurrently by SCAN_WORKERS workers
+    await run_message_pipeline(photo_groups(), process)
+    
+    # Write whatever is still staged
+    await flush_saves()
     
-    # Save progress
-    save_processed_messages()
     await client.disconnect()
+    if bot_api_client:
+        await bot_api_client.aclose()
     
     logger.info("=" * 60)
     logger.info("✅ SCAN COMPLETE!")
+    logger.info(f"📨 Messages collected: {messages_collected}")
     logger.info(f"📸 Photos found: {messages_found}")
     logger.info(f"🔍 Processed: {messages_processed}")
     logger.info(f"💾 Saved: {messages_saved}")
@@ -5579,7 +6386,6 @@ if __name__ == "__main__":
     
     if args.scan_history:
         # Run terminal history scan
-        import asyncio
         asyncio.run(run_terminal_history_scan(args.scan_history, args.group, args.notify))
     else:
         # Normal bot operation
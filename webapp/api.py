@@ -5,20 +5,41 @@ Serves data from Google Sheets for the admin and user panels
 
 import os
 import sys
+import io
 import json
 import re
 import hmac
 import hashlib
-from urllib.parse import parse_qs
-from functools import wraps
+import logging
+import threading
+import time
+from urllib.parse import parse_qsl
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
+import requests
+from requests.adapters import HTTPAdapter
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: images are then sent to OCR as-is
+    Image = None
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
+# Request-path logging (upload, OCR, submit) - no per-line flush, lazy %-formatting
+logger = logging.getLogger('receipt')
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+
 # Custom URL converter for signed integers (negative group IDs)
 from werkzeug.routing import IntegerConverter
 class SignedIntConverter(IntegerConverter):
@@ -62,6 +83,43 @@ def load_group_configs():
 
 GROUP_CONFIGS = load_group_configs()
 
+# Flat lookups built from GROUP_CONFIGS so auth checks are single set/dict probes
+_ADMIN_SET = set()  # {(group_id, user_id)}
+_USER_HOUSE_LOOKUP = {}  # {(group_id, str(user_id)): house_number}
+
+def _build_group_lookups(configs):
+    global _ADMIN_SET, _USER_HOUSE_LOOKUP
+    _ADMIN_SET = {(group_id, admin_id)
+                  for group_id, config in configs.items()
+                  for admin_id in config.get('admin_user_ids', [])}
+    _USER_HOUSE_LOOKUP = {(group_id, user_id): house
+                          for group_id, config in configs.items()
+                          for user_id, house in config.get('user_houses', {}).items()}
+
+_build_group_lookups(GROUP_CONFIGS)
+
+try:
+    _groups_mtime = os.stat(GROUPS_FILE).st_mtime_ns
+except OSError:
+    _groups_mtime = None
+
+def refresh_group_configs():
+    """Reload groups.json if it changed on disk (e.g. the bot approved a new user)"""
+    global GROUP_CONFIGS, _groups_mtime
+    try:
+        mtime = os.stat(GROUPS_FILE).st_mtime_ns
+    except OSError:
+        return
+    if mtime == _groups_mtime:
+        return
+    
+    configs = load_group_configs()
+    if not configs and GROUP_CONFIGS:
+        return  # Unreadable (e.g. caught mid-write); keep the old config and retry next time
+    GROUP_CONFIGS = configs
+    _build_group_lookups(configs)
+    _groups_mtime = mtime
+
 # Ethiopian months
 ETHIOPIAN_MONTHS = [
     'Meskerem', 'Tikimt', 'Hidar', 'Tahsas', 'Tir', 'Yekatit',
@@ -77,6 +135,22 @@ ETHIOPIAN_MONTHS_AMHARIC = {
 
 PAYMENT_TYPES = ['water', 'electricity', 'development', 'penalty', 'other']
 
+# Amount cells are columns D, F, H, ... (one per month, each followed by its FT No)
+AMOUNT_COLUMNS = slice(3, 3 + 2 * len(ETHIOPIAN_MONTHS), 2)
+# Month -> (amount column, FT No column) as 1-based sheet columns for update_cell
+_MONTH_COLS = {month: (4 + i * 2, 5 + i * 2) for i, month in enumerate(ETHIOPIAN_MONTHS)}
+
+
+@lru_cache(maxsize=8192)
+def _parse_amount(cell):
+    """Parse an amount cell like '1,500' (cached - monthly dues repeat a lot).
+    Returns None for text that isn't a number so callers can skip the cell."""
+    try:
+        return float(cell.replace(',', ''))
+    except ValueError:
+        return None
+
+
 PAYMENT_TYPES_AMHARIC = {
     'water': 'ውሃ', 'electricity': 'መብራት', 'development': 'ልማት',
     'penalty': 'ቅጣት', 'other': 'ሌላ'
@@ -85,6 +159,17 @@ PAYMENT_TYPES_AMHARIC = {
 # Google Sheets connection cache
 sheets_cache = {}
 
+# Short-lived cache of sheet values so repeated dashboard / house list
+# refreshes don't hit the Sheets API every time (group_id: (fetched_at, {payment_type: values}))
+VALUES_CACHE_TTL = 45  # seconds
+_values_cache = {}
+_values_lock = threading.Lock()
+# Bumped by every invalidation, so a read that started before a write can't
+# put its pre-write values back into the cache (group_id: generation)
+_values_generation = {}
+# Per-group {payment_type: {house_number: row}} built from the cached values (group_id: (values, index))
+_house_rows_cache = {}
+
 # User last submissions for edit mode (group_id: {user_id: submission_data})
 user_last_submissions = {}
 
@@ -94,8 +179,8 @@ VALID_BENEFICIARIES = [
     "SENAIT DAGNIE",
     "SEYOUM ASSEFA AND SENAIT DAGNIE",
     "SEYOUM ASSEFA OR SENAIT DAGNIE",
-    "ASSEFA SEYOUM",
-    "DAGNIE SENAIT"
+    "ASSEFA SEYOUM",  # Reversed order variant
+    "DAGNIE SENAIT"   # Reversed order variant
 ]
 
 def normalize_name(name):
@@ -109,24 +194,29 @@ def normalize_name(name):
     name = re.sub(r'\s+', ' ', name).strip()
     return name
 
+_RECEIVER_LABEL_LINE_RE = re.compile(r'\b(Receiver Name|Beneficiary Name|Beneficiary)\b', re.IGNORECASE)
+_SOURCE_RE = re.compile(r'Source', re.IGNORECASE)
+# Both joint-account spellings in one pattern: "AND OR" and "AND/OR"
+_JOINT_ACCOUNT_RE = re.compile(
+    r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND(?:\s+|\s*/\s*)OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)', re.IGNORECASE)
+
+@lru_cache(maxsize=256)
 def extract_beneficiary_from_receipt(text):
     """Extract beneficiary/receiver from receipt text"""
     if not text:
         return ""
     
+    # Normalize Unicode dashes
     text = text.replace('\u2013', '-').replace('\u2014', '-')
     
+    # Look for "Receiver Name" or "Beneficiary Name" label
     receiver_label_match = re.search(r'(?<!Source\s)(?<!Source Account\s)\b(Receiver Name|Beneficiary Name|Beneficiary)\b', text, re.IGNORECASE)
     
     if receiver_label_match:
         lines = text.split('\n')
-        receiver_label_line_idx = None
-        
-        for i, line in enumerate(lines):
-            if re.search(r'\b(Receiver Name|Beneficiary Name|Beneficiary)\b', line, re.IGNORECASE):
-                if not re.search(r'Source', line, re.IGNORECASE):
-                    receiver_label_line_idx = i
-                    break
+        # First label line that isn't the sender's ("Source Account Name")
+        receiver_label_line_idx = next((i for i, line in enumerate(lines)
+                                        if _RECEIVER_LABEL_LINE_RE.search(line) and not _SOURCE_RE.search(line)), None)
         
         if receiver_label_line_idx is not None:
             search_start = receiver_label_line_idx + 1
@@ -151,79 +241,45 @@ def extract_beneficiary_from_receipt(text):
                         if beneficiary.upper() not in ['SEBLE FULIE SHUME', 'SEBLE FULIE', 'FULIE SHUME']:
                             candidates.append(beneficiary)
             
-            for cand in candidates:
-                if 'AND OR' in cand.upper():
-                    return cand
+            # Prefer joint accounts
+            joint = next((cand for cand in candidates if 'AND OR' in cand.upper()), None)
+            if joint:
+                return joint
             
             if candidates:
                 return candidates[-1]
     
-    # Fallback: joint account pattern
-    joint_patterns = [
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s+OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s*/\s*OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-    ]
-    
-    for pattern in joint_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            beneficiary = match.group(1).strip()
-            beneficiary = re.sub(r'\s+', ' ', beneficiary).strip()
-            if 10 <= len(beneficiary) <= 80:
-                return beneficiary
+    # Fallback: Look for joint account pattern ("X Y AND OR Z W" / "X Y AND/OR Z W")
+    match = _JOINT_ACCOUNT_RE.search(text)
+    if match:
+        beneficiary = ' '.join(match.group(1).split())
+        if 10 <= len(beneficiary) <= 80:
+            return beneficiary
     
     return ""
 
+# Any one of these (incl. OCR misspellings) marks the receipt as paid to the right account
+AUTHORIZED_BENEFICIARY_TOKENS = frozenset({
+    'SEYOUM', 'SEYSOA', 'SEYSOM', 'SEYSUM', 'SEYOAM',
+    'ASSEFA', 'ASEFA', 'ASEFFA',
+    'SENAIT', 'SENIET', 'SENAYT', 'SENAITE',
+    'DAGNIE', 'DAGNE', 'DAGINE', 'DAGNY', 'DAGNHE'
+})
+
+@lru_cache(maxsize=256)
 def validate_beneficiary(beneficiary_text):
     """Validate if beneficiary matches expected account names"""
     if not beneficiary_text:
         return False, ""
     
     normalized = normalize_name(beneficiary_text)
-    extracted_tokens = set(normalized.split())
-    connectors = {'AND', 'OR', 'ANDOR', 'THE', 'OF', 'TO', 'A', 'AN', '&', '/'}
-    extracted_tokens_clean = extracted_tokens - connectors
-    
-    authorized_tokens = {
-        'SEYOUM', 'SEYSOA', 'SEYSOM', 'SEYSUM', 'SEYOAM',
-        'ASSEFA', 'ASEFA', 'ASEFFA',
-        'SENAIT', 'SENIET', 'SENAYT', 'SENAITE',
-        'DAGNIE', 'DAGNE', 'DAGINE', 'DAGNY', 'DAGNHE'
-    }
-    
-    matching_tokens = extracted_tokens_clean & authorized_tokens
-    
-    if matching_tokens:
-        return True, normalized
+    # Connector words (AND, OR, ...) never overlap the authorized set, so the first hit decides
+    for token in normalized.split():
+        if token in AUTHORIZED_BENEFICIARY_TOKENS:
+            return True, normalized
     
     return False, normalized
 
-def check_duplicate_txid(sheets, txid, exclude_house_number=None):
-    """Check if transaction ID already exists in any sheet"""
-    if not txid or not txid.strip():
-        return False, None, None
-    
-    txid = txid.strip()
-    
-    for sheet_reason, sheet in sheets.items():
-        try:
-            values = sheet.get_all_values()
-            for idx, row in enumerate(values[2:], start=3):
-                if exclude_house_number and len(row) > 1 and row[1].strip() == exclude_house_number:
-                    continue
-                
-                for col_idx in range(4, len(row), 2):
-                    if len(row) > col_idx:
-                        cell_value = row[col_idx].strip()
-                        if cell_value:
-                            existing_txids = [t.strip() for t in cell_value.split(',')]
-                            if txid in existing_txids:
-                                return True, sheet_reason, idx
-        except Exception as e:
-            print(f"Error checking duplicate in {sheet_reason}: {e}")
-    
-    return False, None, None
-
 def get_sheets(group_id):
     """Get Google Sheets for a group"""
     if group_id in sheets_cache:
@@ -252,37 +308,131 @@ def get_sheets(group_id):
         print(f"Error connecting to sheets: {e}")
         return None
 
+def invalidate_values_cache(group_id):
+    """Drop a group's cached sheet values (call after writing to its sheets)"""
+    with _values_lock:
+        _values_cache.pop(group_id, None)
+        _values_generation[group_id] = _values_generation.get(group_id, 0) + 1
+
+def _fetch_and_cache_values(group_id):
+    """_fetch_all_values(), cached unless the group was invalidated meanwhile"""
+    with _values_lock:
+        generation = _values_generation.get(group_id, 0)
+    
+    all_values = _fetch_all_values(group_id)
+    if all_values:
+        with _values_lock:
+            if _values_generation.get(group_id, 0) == generation:
+                _values_cache[group_id] = (time.time(), all_values)
+    return all_values
+
+def get_all_values_batch(group_id):
+    """Get the values of every payment type sheet for a group in one API call.
+
+    Returns {payment_type: values} in PAYMENT_TYPES order, with rows padded
+    like get_all_values(). Results are cached for VALUES_CACHE_TTL seconds;
+    callers must not modify them.
+    """
+    with _values_lock:
+        entry = _values_cache.get(group_id)
+        if entry and time.time() - entry[0] < VALUES_CACHE_TTL:
+            return entry[1]
+    
+    return _fetch_and_cache_values(group_id)
+
+def get_house_rows(group_id):
+    """Get {payment_type: {house_number: row}} for a group's sheets.
+
+    Built once per cached get_all_values_batch() result, so looking up one
+    house doesn't scan every row. The first row for a house number wins.
+    """
+    all_values = get_all_values_batch(group_id)
+    with _values_lock:
+        entry = _house_rows_cache.get(group_id)
+        if entry and entry[0] is all_values:
+            return entry[1]
+    
+    house_rows = {}
+    for payment_type, values in all_values.items():
+        rows = house_rows[payment_type] = {}
+        for row in values[2:]:  # Skip headers
+            if len(row) > 1:
+                house = row[1].strip()
+                if house not in rows:
+                    rows[house] = row
+    
+    with _values_lock:
+        _house_rows_cache[group_id] = (all_values, house_rows)
+    return house_rows
+
+def _fetch_all_values(group_id):
+    """Read every payment type sheet with a single spreadsheets.values.batchGet
+    (falls back to reading the sheets one by one if that fails)"""
+    sheets = get_sheets(group_id)
+    if not sheets:
+        return {}
+    
+    payment_types = [payment_type for payment_type in PAYMENT_TYPES if sheets.get(payment_type)]
+    if not payment_types:
+        return {}
+    
+    try:
+        spreadsheet = sheets[payment_types[0]].spreadsheet
+        ranges = [gspread.utils.absolute_range_name(sheets[payment_type].title) for payment_type in payment_types]
+        value_ranges = spreadsheet.values_batch_get(ranges).get('valueRanges', [])
+        return {payment_type: gspread.utils.fill_gaps(value_range.get('values', [[]]))
+                for payment_type, value_range in zip(payment_types, value_ranges)}
+    except Exception as e:
+        print(f"Batch read failed, reading sheets one by one: {e}")
+    
+    def read_sheet(payment_type):
+        try:
+            return sheets[payment_type].get_all_values()
+        except Exception as e:
+            print(f"Error reading {payment_type}: {e}")
+            return None
+    
+    # Each read is a blocking HTTPS round trip, so run them side by side
+    with ThreadPoolExecutor(max_workers=len(payment_types)) as executor:
+        results = executor.map(read_sheet, payment_types)
+        return {payment_type: values for payment_type, values in zip(payment_types, results)
+                if values is not None}
+
 
 # ========== TELEGRAM AUTH ==========
 
+# WebApp initData signing key, derived from the bot token once at startup
+_TG_SECRET_KEY = hmac.new(b'WebAppData', BOT_TOKEN.encode(), hashlib.sha256).digest() if BOT_TOKEN else None
+
 def verify_telegram_data(init_data):
     """Verify Telegram WebApp initData"""
     if not init_data or not BOT_TOKEN:
         return None
     
     try:
-        parsed = parse_qs(init_data)
+        # (key, value) pairs in one pass; every initData field is single-valued
+        pairs = parse_qsl(init_data)
         
         # Get hash and remove from data
-        received_hash = parsed.get('hash', [''])[0]
+        received_hash = ''
         data_pairs = []
         
-        for key, value in parsed.items():
-            if key != 'hash':
-                data_pairs.append(f"{key}={value[0]}")
+        for key, value in pairs:
+            if key == 'hash':
+                received_hash = value
+            else:
+                data_pairs.append(f"{key}={value}")
         
         data_pairs.sort()
         data_check_string = '\n'.join(data_pairs)
         
-        # Create secret key
-        secret_key = hmac.new(b'WebAppData', BOT_TOKEN.encode(), hashlib.sha256).digest()
-        
         # Calculate hash
-        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        calculated_hash = hmac.new(_TG_SECRET_KEY, data_check_string.encode(), hashlib.sha256).hexdigest()
         
-        if calculated_hash == received_hash:
+        # Constant-time comparison (no timing side channel on the hash)
+        if hmac.compare_digest(calculated_hash, received_hash):
             # Extract user info
-            user_data = parsed.get('user', ['{}'])[0]
+            user_data = dict(pairs).get('user', '{}')
             user = json.loads(user_data)
             return user
         
@@ -307,46 +457,48 @@ def require_auth(f):
             return jsonify({'error': 'Unauthorized'}), 401
         
         request.telegram_user = user
+        refresh_group_configs()  # One stat() per request; reloads only on change
         return f(*args, **kwargs)
     return decorated
 
 
 def is_admin(user_id, group_id):
     """Check if user is admin for group"""
-    if group_id not in GROUP_CONFIGS:
-        return False
-    admin_ids = GROUP_CONFIGS[group_id].get('admin_user_ids', [])
-    return user_id in admin_ids
+    return (group_id, user_id) in _ADMIN_SET
 
 
 def get_user_house(user_id, group_id):
     """Get house number for user"""
-    if group_id not in GROUP_CONFIGS:
-        return None
-    user_houses = GROUP_CONFIGS[group_id].get('user_houses', {})
-    return user_houses.get(str(user_id))
+    return _USER_HOUSE_LOOKUP.get((group_id, str(user_id)))
 
 
 # ========== API ROUTES ==========
 
+# Browser cache lifetime for css/js/static assets. File names aren't versioned,
+# so keep this short enough for a deploy to roll out; once it expires the
+# browser revalidates with the ETag and usually gets a 304.
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '3600'))
+
+
 @app.route('/')
 def index():
-    return send_from_directory('static', 'index.html')
+    # Always revalidate the page itself so new asset versions are picked up
+    return send_from_directory('static', 'index.html', max_age=0)
 
 
 @app.route('/css/<path:path>')
 def serve_css(path):
-    return send_from_directory('static/css', path)
+    return send_from_directory('static/css', path, max_age=STATIC_MAX_AGE)
 
 
 @app.route('/js/<path:path>')
 def serve_js(path):
-    return send_from_directory('static/js', path)
+    return send_from_directory('static/js', path, max_age=STATIC_MAX_AGE)
 
 
 @app.route('/static/<path:path>')
 def serve_static(path):
-    return send_from_directory('static', path)
+    return send_from_directory('static', path, max_age=STATIC_MAX_AGE)
 
 
 @app.route('/api/auth', methods=['POST'])
@@ -417,30 +569,26 @@ def get_dashboard(group_id):
     }
     
     unique_houses = set()
+    by_month = stats['by_month']
     
-    for payment_type in PAYMENT_TYPES:
-        sheet = sheets.get(payment_type)
-        if not sheet:
-            continue
-        
+    # All payment types in one API call
+    for payment_type, values in get_all_values_batch(group_id).items():
         try:
-            values = sheet.get_all_values()
             type_total = 0
             
             for row in values[2:]:  # Skip headers
                 if len(row) > 1 and row[1] and row[1] != 'TOTAL':
                     house = row[1].strip()
                     
-                    for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                        amount_col = 3 + (month_idx * 2)
-                        if amount_col < len(row) and row[amount_col]:
-                            try:
-                                amount = float(str(row[amount_col]).replace(',', ''))
-                                type_total += amount
-                                stats['by_month'][month] += amount
-                                unique_houses.add(house)
-                            except:
-                                pass
+                    # Walk only the amount cells (sliced once per row) and skip empty ones early
+                    for month, cell in zip(ETHIOPIAN_MONTHS, row[AMOUNT_COLUMNS]):
+                        if cell:
+                            amount = _parse_amount(cell)
+                            if amount is None:
+                                continue
+                            type_total += amount
+                            by_month[month] += amount
+                            unique_houses.add(house)
             
             if type_total > 0:
                 stats['by_type'][payment_type] = {
@@ -471,14 +619,9 @@ def get_houses(group_id):
     
     houses = {}
     
-    for payment_type in PAYMENT_TYPES:
-        sheet = sheets.get(payment_type)
-        if not sheet:
-            continue
-        
+    # All payment types in one API call
+    for payment_type, values in get_all_values_batch(group_id).items():
         try:
-            values = sheet.get_all_values()
-            
             for row in values[2:]:
                 if len(row) > 2 and row[1] and row[1] != 'TOTAL':
                     house_num = row[1].strip()
@@ -492,26 +635,23 @@ def get_houses(group_id):
                             'payments': []
                         }
                     
-                    for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                        amount_col = 3 + (month_idx * 2)
-                        txid_col = amount_col + 1
-                        
-                        if amount_col < len(row) and row[amount_col]:
-                            try:
-                                amount = float(str(row[amount_col]).replace(',', ''))
-                                txid = row[txid_col] if txid_col < len(row) else ''
-                                
-                                houses[house_num]['total'] += amount
-                                houses[house_num]['payments'].append({
-                                    'type': payment_type,
-                                    'type_amharic': PAYMENT_TYPES_AMHARIC.get(payment_type, payment_type),
-                                    'month': month,
-                                    'month_amharic': ETHIOPIAN_MONTHS_AMHARIC.get(month, month),
-                                    'amount': amount,
-                                    'txid': txid
-                                })
-                            except:
-                                pass
+                    for month_idx, (month, cell) in enumerate(zip(ETHIOPIAN_MONTHS, row[AMOUNT_COLUMNS])):
+                        if cell:
+                            amount = _parse_amount(cell)
+                            if amount is None:
+                                continue
+                            txid_col = 4 + (month_idx * 2)
+                            txid = row[txid_col] if txid_col < len(row) else ''
+                            
+                            houses[house_num]['total'] += amount
+                            houses[house_num]['payments'].append({
+                                'type': payment_type,
+                                'type_amharic': PAYMENT_TYPES_AMHARIC.get(payment_type, payment_type),
+                                'month': month,
+                                'month_amharic': ETHIOPIAN_MONTHS_AMHARIC.get(month, month),
+                                'amount': amount,
+                                'txid': txid
+                            })
         except Exception as e:
             print(f"Error reading {payment_type}: {e}")
     
@@ -546,40 +686,31 @@ def get_user_payments(group_id):
     
     months_with_payment = set()
     
-    for payment_type in PAYMENT_TYPES:
-        sheet = sheets.get(payment_type)
-        if not sheet:
-            continue
-        
+    # All payment types in one API call, then a direct lookup of this house's row
+    for payment_type, rows in get_house_rows(group_id).items():
         try:
-            values = sheet.get_all_values()
-            
-            for row in values[2:]:
-                if len(row) > 1 and row[1].strip() == house_number:
-                    house_data['name'] = row[2].strip() if len(row) > 2 else ''
-                    
-                    for month_idx, month in enumerate(ETHIOPIAN_MONTHS):
-                        amount_col = 3 + (month_idx * 2)
-                        txid_col = amount_col + 1
+            row = rows.get(house_number)
+            if row:
+                house_data['name'] = row[2].strip() if len(row) > 2 else ''
+                
+                for month_idx, (month, cell) in enumerate(zip(ETHIOPIAN_MONTHS, row[AMOUNT_COLUMNS])):
+                    if cell:
+                        amount = _parse_amount(cell)
+                        if amount is None:
+                            continue
+                        txid_col = 4 + (month_idx * 2)
+                        txid = row[txid_col] if txid_col < len(row) else ''
                         
-                        if amount_col < len(row) and row[amount_col]:
-                            try:
-                                amount = float(str(row[amount_col]).replace(',', ''))
-                                txid = row[txid_col] if txid_col < len(row) else ''
-                                
-                                house_data['total'] += amount
-                                house_data['payments'].append({
-                                    'type': payment_type,
-                                    'type_amharic': PAYMENT_TYPES_AMHARIC.get(payment_type, payment_type),
-                                    'month': month,
-                                    'month_amharic': ETHIOPIAN_MONTHS_AMHARIC.get(month, month),
-                                    'amount': amount,
-                                    'txid': txid
-                                })
-                                months_with_payment.add(month)
-                            except:
-                                pass
-                    break
+                        house_data['total'] += amount
+                        house_data['payments'].append({
+                            'type': payment_type,
+                            'type_amharic': PAYMENT_TYPES_AMHARIC.get(payment_type, payment_type),
+                            'month': month,
+                            'month_amharic': ETHIOPIAN_MONTHS_AMHARIC.get(month, month),
+                            'amount': amount,
+                            'txid': txid
+                        })
+                        months_with_payment.add(month)
         except Exception as e:
             print(f"Error: {e}")
     
@@ -692,30 +823,40 @@ def lookup_house(group_id, house_number):
 @require_auth
 def upload_receipt(group_id):
     """Upload receipt image and extract data using AI"""
-    print(f"[UPLOAD] ===== Receipt upload request received for group {group_id} =====", flush=True)
+    logger.info("[UPLOAD] ===== Receipt upload request received for group %s =====", group_id)
     try:
-        # Get image data from request
-        data = request.get_json()
-        image_data = data.get('image')  # Base64 encoded image
-        print(f"[UPLOAD] Image data received: {len(image_data) if image_data else 0} chars", flush=True)
-        
-        if not image_data:
-            return jsonify({'error': 'No image provided'}), 400
-        
-        # Remove data URL prefix if present
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
         # Generate unique receipt ID
         receipt_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        receipt_path = os.path.join(RECEIPTS_DIR, f"{receipt_id}.jpg")
+        
+        if (request.content_type or '').startswith('multipart/'):
+            # Binary upload: no base64 inflation on the wire and nothing to decode
+            upload = request.files.get('image')
+            logger.info("[UPLOAD] Multipart image received: %s", upload.filename if upload else None)
+            
+            if not upload:
+                return jsonify({'error': 'No image provided'}), 400
+            
+            raw = upload.read()
+            if not raw:
+                return jsonify({'error': 'No image provided'}), 400
+        else:
+            # Legacy JSON path: base64 (optionally data-URL) encoded image
+            data = request.get_json()
+            image_data = data.get('image')  # Base64 encoded image
+            logger.info("[UPLOAD] Image data received: %d chars", len(image_data) if image_data else 0)
+            
+            if not image_data:
+                return jsonify({'error': 'No image provided'}), 400
+            
+            raw = decode_image_data(image_data)
         
         # Save receipt to file
-        receipt_path = os.path.join(RECEIPTS_DIR, f"{receipt_id}.jpg")
         with open(receipt_path, 'wb') as f:
-            f.write(base64.b64decode(image_data))
+            f.write(raw)
         
         # Call Claude AI to extract receipt data (similar to bot logic)
-        extracted_data = extract_receipt_data(image_data)
+        extracted_data = extract_receipt_data(raw)
         
         return jsonify({
             'success': True,
@@ -725,165 +866,95 @@ def upload_receipt(group_id):
         })
         
     except Exception as e:
-        print(f"Receipt upload error: {e}")
+        logger.error("Receipt upload error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
-# ========== BENEFICIARY VALIDATION ==========
-VALID_BENEFICIARIES = [
-    "SEYOUM ASSEFA",
-    "SENAIT DAGNIE",
-    "SEYOUM ASSEFA AND SENAIT DAGNIE",
-    "SEYOUM ASSEFA OR SENAIT DAGNIE",
-    "ASSEFA SEYOUM",  # Reversed order variant
-    "DAGNIE SENAIT"   # Reversed order variant
-]
+def build_txid_index(values_by_type):
+    """Map every transaction ID in the FT No columns to where it appears.
 
-def normalize_name(name):
-    """Normalize name for comparison"""
-    if not name:
-        return ""
-    name = name.upper()
-    name = re.sub(r'AND\s*/\s*OR', 'AND OR', name)
-    name = re.sub(r'&', 'AND', name)
-    name = re.sub(r'[^\w\s]', ' ', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
-
-def extract_beneficiary_from_receipt(text):
-    """Extract beneficiary/receiver from receipt text"""
-    if not text:
-        return ""
-    
-    # Normalize Unicode dashes
-    text = text.replace('\u2013', '-').replace('\u2014', '-')
-    
-    # Look for "Receiver Name" or "Beneficiary Name" label
-    receiver_label_match = re.search(r'(?<!Source\s)(?<!Source Account\s)\b(Receiver Name|Beneficiary Name|Beneficiary)\b', text, re.IGNORECASE)
-    
-    if receiver_label_match:
-        lines = text.split('\n')
-        receiver_label_line_idx = None
-        
-        for i, line in enumerate(lines):
-            if re.search(r'\b(Receiver Name|Beneficiary Name|Beneficiary)\b', line, re.IGNORECASE):
-                if not re.search(r'Source', line, re.IGNORECASE):
-                    receiver_label_line_idx = i
-                    break
-        
-        if receiver_label_line_idx is not None:
-            search_start = receiver_label_line_idx + 1
-            search_end = min(receiver_label_line_idx + 12, len(lines))
-            candidates = []
-            
-            for i in range(search_start, search_end):
-                line = lines[i].strip()
-                if not line or re.match(r'^\d', line):
-                    continue
-                if re.search(r'(Transaction|Reference|Type|Bank|Note|Account|Amount|Date|Time|Source|ETB|FTB)', line, re.IGNORECASE):
-                    continue
-                
-                if re.search(r'\b[A-Z]{2,}\s+[A-Z]{2,}', line):
-                    beneficiary = line.strip()
-                    beneficiary = re.sub(r'AND\s*/\s*OR', 'AND OR', beneficiary, flags=re.IGNORECASE)
-                    beneficiary = re.sub(r'ANDOR', 'AND OR', beneficiary, flags=re.IGNORECASE)
-                    beneficiary = re.sub(r'\s+', ' ', beneficiary).strip()
-                    beneficiary = re.sub(r'\s+(ETB|FTB|BIRR).*$', '', beneficiary, flags=re.IGNORECASE)
-                    
-                    if len(beneficiary.split()) >= 2 or 'AND OR' in beneficiary.upper():
-                        if beneficiary.upper() not in ['SEBLE FULIE SHUME', 'SEBLE FULIE', 'FULIE SHUME']:
-                            candidates.append(beneficiary)
-            
-            # Prefer joint accounts
-            for cand in candidates:
-                if 'AND OR' in cand.upper():
-                    return cand
+    Returns {txid: [(payment_type, row, house_number), ...]} in sheet order.
+    Cells holding several payments ('FT1, FT2') contribute each ID.
+    """
+    txid_index = {}
+    for sheet_reason, values in values_by_type.items():
+        for idx, row in enumerate(values[2:], start=3):  # Skip 2 header rows
+            house = row[1].strip() if len(row) > 1 else None
             
-            if candidates:
-                return candidates[-1]
-    
-    # Fallback: Look for joint account pattern
-    joint_patterns = [
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s+OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-        r'([A-Z][A-Z]+\s+[A-Z][A-Z]+\s+AND\s*/\s*OR\s+[A-Z][A-Z]+\s+[A-Z][A-Z]+)',
-    ]
-    
-    for pattern in joint_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            beneficiary = match.group(1).strip()
-            beneficiary = re.sub(r'\s+', ' ', beneficiary).strip()
-            if 10 <= len(beneficiary) <= 80:
-                return beneficiary
-    
-    return ""
-
-def validate_beneficiary(beneficiary_text):
-    """Validate if beneficiary matches expected account names"""
-    if not beneficiary_text:
-        return False, ""
-    
-    normalized = normalize_name(beneficiary_text)
-    extracted_tokens = set(normalized.split())
-    connectors = {'AND', 'OR', 'ANDOR', 'THE', 'OF', 'TO', 'A', 'AN', '&', '/'}
-    extracted_tokens_clean = extracted_tokens - connectors
-    
-    authorized_tokens = {
-        'SEYOUM', 'SEYSOA', 'SEYSOM', 'SEYSUM', 'SEYOAM',
-        'ASSEFA', 'ASEFA', 'ASEFFA',
-        'SENAIT', 'SENIET', 'SENAYT', 'SENAITE',
-        'DAGNIE', 'DAGNE', 'DAGINE', 'DAGNY', 'DAGNHE'
-    }
-    
-    matching_tokens = extracted_tokens_clean & authorized_tokens
-    
-    if matching_tokens:
-        return True, normalized
-    
-    return False, normalized
-
-def check_duplicate_txid(sheets, txid, exclude_house_number=None, group_id=None):
-    """Check if transaction ID already exists in any sheet"""
+            # All TXIDs in the row's FT No columns (every other column from E=4,
+            # sliced in one go), each recorded once per row
+            row_txids = {existing_txid.strip() for cell_value in row[4::2] if cell_value
+                         for existing_txid in cell_value.split(',')}
+            for existing_txid in row_txids:
+                txid_index.setdefault(existing_txid, []).append((sheet_reason, idx, house))
+    return txid_index
+
+def _first_txid_location(locations, exclude_house_number=None, payment_type=None):
+    """Pick the duplicate to report from build_txid_index() locations: skip the
+    house being edited and prefer a hit on the payment_type sheet"""
+    first = None
+    for sheet_reason, idx, house in locations:
+        # Skip if this is the house we're editing
+        if exclude_house_number and house == exclude_house_number:
+            continue
+        if sheet_reason == payment_type:
+            return True, sheet_reason, idx
+        if first is None:
+            first = (True, sheet_reason, idx)
+    return first or (False, None, None)
+
+def check_duplicate_txid(sheets, txid, exclude_house_number=None, group_id=None, values_by_type=None, payment_type=None):
+    """Check if transaction ID already exists in any sheet
+    (pass values_by_type to check against sheet values the caller already read).
+    
+    Re-sent receipts almost always land on the same payment_type sheet, so a
+    hit there is the location reported when the TXID is in several.
+    """
     if not txid or not txid.strip():
         return False
     
     txid = txid.strip()
     
-    for sheet_reason, sheet in sheets.items():
-        try:
-            values = sheet.get_all_values()
-            for idx, row in enumerate(values[2:], start=3):  # Skip 2 header rows
-                # Skip if this is the house we're editing
-                if exclude_house_number and len(row) > 1 and row[1].strip() == exclude_house_number:
-                    continue
-                
-                # Check all FT No columns (every even column starting from column E=4)
-                for col_idx in range(4, len(row), 2):
-                    if len(row) > col_idx:
-                        cell_value = row[col_idx].strip()
-                        if cell_value:
-                            existing_txids = [t.strip() for t in cell_value.split(',')]
-                            if txid in existing_txids:
-                                return True, sheet_reason, idx
-        except Exception as e:
-            print(f"Error checking duplicate in {sheet_reason}: {e}")
+    if values_by_type is None:
+        # Fresh read of all sheets in one batchGet (not the TTL cache: a
+        # duplicate must never slip through on stale data)
+        values_by_type = _fetch_and_cache_values(group_id)
     
-    return False, None, None
+    # Built per check: the values are a fresh read each time, so a cached
+    # index would never be reused
+    txid_index = build_txid_index(values_by_type)
+    return _first_txid_location(txid_index.get(txid, ()), exclude_house_number, payment_type)
 
-def extract_receipt_data(image_base64):
-    """Extract payment info from receipt using OCR.space"""
+def decode_image_data(image):
+    """Raw image bytes from bytes or a base64 (optionally data-URL) string.
     
-    text = None
-    if not text:
-        text = extract_text_with_ocrspace(image_base64)
+    Bytes are passed through untouched. A data URL's prefix is only looked for
+    at the start, instead of scanning the whole multi-MB payload for a comma.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if image.startswith('data:'):
+        image = image.partition(',')[2]
+    return base64.b64decode(image, validate=False)
+
+def extract_receipt_data(image):
+    """Extract payment info from receipt using OCR.space (raw bytes or base64)"""
+    
+    # Decode once here so OCR retries never decode again
+    try:
+        image = decode_image_data(image)
+    except Exception as e:
+        logger.error("[OCR] Base64 decode error: %s", e)
+        image = b''
+    
+    text = extract_text_with_ocrspace(image) if image else ''
     
     if not text:
-        print("[OCR] All OCR methods failed")
+        logger.warning("[OCR] All OCR methods failed")
         return {'amount': '', 'transaction_id': '', 'payer_name': '', 'beneficiary': ''}
     
-    # Use ASCII-safe printing to avoid Windows encoding errors
-    safe_text = text[:200].encode('ascii', 'replace').decode('ascii')
-    print(f"[OCR] Extracted {len(text)} chars. First 200: {safe_text}")
+    # %r keeps the preview ASCII-safe (avoids Windows console encoding errors)
+    logger.info("[OCR] Extracted %d chars. First 200: %r", len(text), text[:200])
     
     # Extract data using regex
     amount = extract_amount_from_text(text)
@@ -894,7 +965,8 @@ def extract_receipt_data(image_base64):
     # Validate beneficiary
     is_valid_beneficiary, normalized_beneficiary = validate_beneficiary(beneficiary)
     
-    print(f"[OCR] Extracted - Amount: {amount}, TxID: {txid}, Payer: {payer}, Beneficiary: {beneficiary} (Valid: {is_valid_beneficiary})")
+    logger.info("[OCR] Extracted - Amount: %s, TxID: %s, Payer: %s, Beneficiary: %s (Valid: %s)",
+                amount, txid, payer, beneficiary, is_valid_beneficiary)
     
     return {
         'amount': amount,
@@ -906,80 +978,95 @@ def extract_receipt_data(image_base64):
     }
 
 
-def extract_text_with_google_vision(image_base64):
-    """Extract text using Google Cloud Vision API (uses same credentials as Google Sheets)"""
+# One pooled session per worker thread for OCR.space calls, so requests (and
+# retries) reuse an open keep-alive connection instead of a new TCP + TLS
+# handshake each time. requests.Session isn't guaranteed thread-safe, and
+# concurrent uploads call OCR from several request threads.
+_ocr_local = threading.local()
+
+def get_ocr_session():
+    session = getattr(_ocr_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({'User-Agent': 'receipt-bot/1.0'})
+        # Retries stay in extract_text_with_ocrspace so every attempt is logged
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        _ocr_local.session = session
+    return session
+
+# OCR text of recently uploaded images keyed by the image's SHA-256, so a
+# re-submitted receipt (edit + resend) doesn't go to OCR.space again - like the bot
+OCR_CACHE_SIZE = 256
+_ocr_cache = OrderedDict()  # {sha256 digest: text}, oldest first
+_ocr_cache_lock = threading.Lock()
+
+OCR_CONNECT_TIMEOUT = 5  # seconds
+OCR_MAX_READ_TIMEOUT = 90  # seconds
+
+# Photos larger than this (longest side, px) are shrunk before upload - same
+# limit as the bot. Phone photos of 3-5 MB become a few hundred KB.
+OCR_MAX_DIMENSION = 1600
+
+def prepare_image_for_ocr(image_bytes):
+    """Downscale oversized images to OCR_MAX_DIMENSION and re-encode as grayscale JPEG
+    (same as the bot). Small images and anything Pillow can't read are returned as-is."""
+    if Image is None:
+        return image_bytes
     try:
-        from google.cloud import vision
-        from google.oauth2 import service_account
-        
-        # Use same credentials as Google Sheets
-        CREDENTIALS_FILE = '../credentials.json'
-        
-        credentials = service_account.Credentials.from_service_account_file(
-            CREDENTIALS_FILE,
-            scopes=['https://www.googleapis.com/auth/cloud-vision']
-        )
-        
-        client = vision.ImageAnnotatorClient(credentials=credentials)
-        
-        # Clean base64 - remove data URL prefix if present
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Decode and send to Vision API
-        image_bytes = base64.b64decode(image_base64)
-        image = vision.Image(content=image_bytes)
-        
-        print("[OCR] Sending to Google Vision API...")
-        response = client.text_detection(image=image)
-        
-        if response.error.message:
-            print(f"[OCR] Vision API error: {response.error.message}")
-            return ''
-        
-        texts = response.text_annotations
-        if texts:
-            full_text = texts[0].description
-            print(f"[OCR] ✓ Google Vision extracted {len(full_text)} chars")
-            return full_text
-        
-        print("[OCR] Vision returned no text")
-        return ''
-        
-    except ImportError:
-        print("[OCR] google-cloud-vision not installed, falling back to OCR.space")
-        return ''
+        img = Image.open(io.BytesIO(image_bytes))  # lazy: only reads the header
+        if max(img.size) <= OCR_MAX_DIMENSION:
+            return image_bytes
+        original_size = img.size
+        img.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.convert('L').save(buffer, format='JPEG', quality=90)
+        logger.info("[OCR] Downscaled image %dx%d -> %dx%d", original_size[0], original_size[1], img.size[0], img.size[1])
+        return buffer.getvalue()
     except Exception as e:
-        print(f"[OCR] Google Vision error: {e}")
-        return ''
-
+        logger.warning("[OCR] Could not preprocess image, sending original: %s", e)
+        return image_bytes
 
 def extract_text_with_ocrspace(image_base64):
-    """Extract text using OCR.space API - EXACT same approach as bot"""
-    import requests
+    """Extract text using OCR.space API - EXACT same approach as bot
     
+    Accepts either raw image bytes or a base64 (optionally data-URL) string.
+    """
     OCR_API_URL = 'https://api.ocr.space/parse/image'
     OCR_API_KEY = os.getenv('OCR_API_KEY', 'K89427089988957')
     
     max_retries = 3
-    timeout_seconds = 45
     
     # Decode base64 to raw bytes (same as bot)
     try:
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        image_bytes = base64.b64decode(image_base64)
-        print(f"[OCR] Image decoded: {len(image_bytes)} bytes", flush=True)
+        image_bytes = decode_image_data(image_base64)
+        logger.info("[OCR] Image decoded: %d bytes", len(image_bytes))
     except Exception as e:
-        print(f"[OCR] Base64 decode error: {e}", flush=True)
+        logger.error("[OCR] Base64 decode error: %s", e)
         return ''
     
+    digest = hashlib.sha256(image_bytes).digest()
+    with _ocr_cache_lock:
+        text = _ocr_cache.get(digest)
+        if text is not None:
+            _ocr_cache.move_to_end(digest)
+            logger.info("[OCR] Cache hit: %d chars", len(text))
+            return text
+    
+    image_bytes = prepare_image_for_ocr(image_bytes)
+    
+    # Fail fast on connect; allow bigger images longer to upload and process
+    # (30s + 5s per 100 KB, capped) instead of a flat 45s for every image
+    read_timeout = min(OCR_MAX_READ_TIMEOUT, 30 + 5 * (len(image_bytes) // 1024 // 100))
+    timeout = (OCR_CONNECT_TIMEOUT, read_timeout)
+    
     for attempt in range(1, max_retries + 1):
         try:
             if attempt > 1:
-                print(f"[OCR] Retrying OCR (attempt {attempt}/{max_retries})...", flush=True)
+                # Exponential backoff between retries (0.5s, 1s, ...)
+                time.sleep(0.5 * 2 ** (attempt - 2))
+                logger.info("[OCR] Retrying OCR (attempt %d/%d)...", attempt, max_retries)
             else:
-                print("[OCR] Running OCR.space...", flush=True)
+                logger.info("[OCR] Running OCR.space...")
             
             # EXACT same payload as bot
             payload = {
@@ -993,85 +1080,144 @@ def extract_text_with_ocrspace(image_base64):
             
             # Use file upload like bot (not base64)
             files = {'file': ('receipt.jpg', image_bytes, 'image/jpeg')}
-            response = requests.post(OCR_API_URL, files=files, data=payload, timeout=timeout_seconds)
+            response = get_ocr_session().post(OCR_API_URL, files=files, data=payload, timeout=timeout)
             
             if response.status_code == 200:
                 result = response.json()
                 if not result.get('IsErroredOnProcessing'):
                     text = result.get('ParsedResults', [{}])[0].get('ParsedText', '')
-                    print(f"[OCR] SUCCESS: {len(text)} chars extracted", flush=True)
+                    logger.info("[OCR] SUCCESS: %d chars extracted", len(text))
+                    if text:  # failed / empty OCR is not cached
+                        with _ocr_cache_lock:
+                            _ocr_cache[digest] = text
+                            _ocr_cache.move_to_end(digest)
+                            if len(_ocr_cache) > OCR_CACHE_SIZE:
+                                _ocr_cache.popitem(last=False)
                     return text
                 else:
                     error_msg = result.get('ErrorMessage', result.get('ErrorDetails', 'Unknown'))
-                    print(f"[OCR] Processing error on attempt {attempt}: {error_msg}", flush=True)
+                    logger.warning("[OCR] Processing error on attempt %d: %s", attempt, error_msg)
             else:
-                print(f"[OCR] Failed with status {response.status_code}", flush=True)
+                logger.warning("[OCR] Failed with status %s", response.status_code)
                 
         except requests.exceptions.Timeout:
-            print(f"[OCR] Timeout on attempt {attempt}/{max_retries}", flush=True)
+            logger.warning("[OCR] Timeout on attempt %d/%d", attempt, max_retries)
             if attempt == max_retries:
                 return ''
             continue
         except Exception as e:
-            print(f"[OCR] Error on attempt {attempt}: {e}", flush=True)
+            logger.warning("[OCR] Error on attempt %d: %s", attempt, e)
             if attempt == max_retries:
                 return ''
             continue
     
-    print(f"[OCR] Failed after {max_retries} attempts", flush=True)
+    logger.error("[OCR] Failed after %d attempts", max_retries)
     return ''
 
 
+# ========== OCR TEXT EXTRACTION PATTERNS (compiled once) ==========
+def _ascii_lower(text):
+    """text.lower() for ASCII text, None otherwise. Used as a literal prefilter:
+    a pattern whose required keyword isn't in the lowered text can't match, so
+    its (IGNORECASE, hence unoptimized) scan is skipped. Non-ASCII text isn't
+    prefiltered since IGNORECASE also matches e.g. 'ſ' for 's'."""
+    return text.lower() if text.isascii() else None
+
+def _may_contain(lowered, words):
+    """False only when the ASCII-lowered text has none of the keywords"""
+    return lowered is None or any(word in lowered for word in words)
+
+_AMOUNT_VALUE_START_RE = re.compile(r'^[0-9,]+\.[0-9]{2}')
+# normalize_amount_lines labels ('settled amount' / 'amount paid' are covered by
+# 'settled' / 'paid'); searched in already-lowercased text
+_AMOUNT_LABEL_RE = re.compile(r'settled|paid|debited|credited|sub(?:total|-total| total)|total amount')
+_SETTLED_AMOUNT_RE = re.compile(r'settled\s+amount[:\s]*ETB\s*([0-9,]+(?:\.[0-9]{2})?)', re.IGNORECASE | re.DOTALL)
+_WITHOUT_VAT_AMOUNT_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:subtotal|sub-total|sub total|before vat|excluding vat|excl\.? vat)[:\s]*(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)',
+    r'(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)\s*(?:before vat|excluding vat|excl\.? vat)',
+)]
+_DEBITED_AMOUNT_RE = re.compile(r'ETB\s*([0-9,]+(?:\.[0-9]{2})?)\s+debited', re.IGNORECASE)
+# Priority 4 amount patterns as one scan: a zero-width lookahead tried at every
+# position. Each alternative starts differently (debited / amount / ETB-birr-ብር /
+# digit / transferred), so at most one can match at a position; p<k> is the
+# span of pattern k and a<k> its amount.
+_ALL_STANDARD_AMOUNTS_RE = re.compile(
+    r'(?=(?P<p0>(?:debited|Debited|DEBITED).*?ETB\s*(?P<a0>[0-9,]+(?:\.[0-9]{2})?))'
+    r'|(?P<p1>(?:Amount|amount|AMOUNT).*?(?:ETB|birr)?\s*(?P<a1>[0-9,]+(?:\.[0-9]{2})?))'
+    r'|(?P<p2>(?:ETB|birr|ብር)\s*(?P<a2>[0-9,]+(?:\.[0-9]{2})?))'
+    r'|(?P<p3>(?P<a3>[0-9,]+(?:\.[0-9]{2})?)\s*(?:ETB|birr|ብር))'
+    r'|(?P<p4>transferred\s+ETB\s*(?P<a4>[0-9,]+(?:\.[0-9]{2})?)))',
+    re.IGNORECASE)
+_STANDARD_AMOUNT_GROUPS = [(f'p{k}', f'a{k}') for k in range(5)]
+_STANDALONE_AMOUNT_RE = re.compile(r'([0-9,]+\.[0-9]{2})\s*(?:Birr|ETB)', re.IGNORECASE)
+
+_ZEMEN_TXID_RE = re.compile(r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]*\n?\s*([A-Z0-9]{10,})', re.IGNORECASE | re.MULTILINE)
+_TELEBIRR_INVOICE_RE = re.compile(r'(?:invoice\s+no\.?)[:\s]*\n?\s*([A-Z]{3}[A-Z0-9]{7,12})', re.IGNORECASE)
+# (keywords any match must contain, pattern) - None means no prefilter
+_STANDARD_TXID_RES = [(words, re.compile(pattern, re.IGNORECASE)) for words, pattern in (
+    (('tx', 'tran'), r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)[:\s]*([A-Za-z0-9]{8,})'),
+    (('ft', 'tt'), r'(?:FT|TT)[A-Z0-9]{10,}'),
+    (('tran', 'txn', 'ref'), r'(?:Transaction|Trans|TXN|Ref|Reference)[:\s#]*([A-Z0-9]{6,20})'),
+    (None, r'\b([A-Z]{2,3}[0-9]{8,15})\b'),  # Common bank format like FT123456789
+)]
+
+_PAYER_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:From|Sender|Payer|Account Holder)[:\s]*([A-Za-z\s]{5,40})',
+)]
+
+
+def _iter_amount_lines(lines, lowered_lines):
+    """Yield the stripped, non-blank lines for normalize_amount_lines, joining a
+    label line with the next line when that one starts with ETB or an amount"""
+    pairs = zip(lines, lowered_lines)
+    pending = next(pairs, None)
+    while pending is not None:
+        raw_line, lowered_line = pending
+        pending = next(pairs, None)  # one line of lookahead
+        
+        line = raw_line.strip()
+        if not line:
+            continue
+        
+        if pending is not None and _AMOUNT_LABEL_RE.search(lowered_line):
+            next_line = pending[0].strip()
+            if next_line and (next_line[:3].upper() == 'ETB' or 
+                             _AMOUNT_VALUE_START_RE.match(next_line)):
+                yield line + ' ' + next_line
+                pending = next(pairs, None)
+                continue
+        
+        yield line
+
 def normalize_amount_lines(text):
     """Preprocess OCR text to join amount labels with their values on separate lines.
     (Same as bot - handles table-based layouts like Zemen Bank)
     """
-    import re
     lines = text.split('\n')
-    normalized_lines = []
-    
-    amount_labels = ['settled amount', 'settled', 'amount paid', 'paid', 'debited', 'credited', 
-                     'subtotal', 'sub-total', 'sub total', 'total amount']
     
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        if not line:
-            i += 1
-            continue
-        
-        line_lower = line.lower()
-        has_amount_label = any(label in line_lower for label in amount_labels)
-        
-        should_combine = False
-        if has_amount_label and i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            if next_line and (next_line.upper().startswith('ETB') or 
-                             re.match(r'^[0-9,]+\.[0-9]{2}', next_line)):
-                should_combine = True
-        
-        if should_combine:
-            combined = line + ' ' + lines[i + 1].strip()
-            normalized_lines.append(combined)
-            i += 2
-        else:
-            normalized_lines.append(line)
-            i += 1
-    
-    return '\n'.join(normalized_lines)
+    # Lowercase once; lower() never adds or removes newlines, so the lines line up.
+    # No label anywhere means there is nothing to join - just drop blank lines.
+    lowered = text.lower()
+    if not _AMOUNT_LABEL_RE.search(lowered):
+        return '\n'.join(stripped for stripped in (line.strip() for line in lines) if stripped)
+    return '\n'.join(_iter_amount_lines(lines, lowered.split('\n')))
 
 
+@lru_cache(maxsize=256)
 def extract_amount_from_text(text):
     """Extract amount from OCR text - EXACT copy from bot"""
-    import re
     
     # Apply normalization first (same as bot)
     normalized_text = normalize_amount_lines(text)
     
-    for search_text in [normalized_text, text]:
+    # The raw text is only a second chance when normalizing changed something
+    search_texts = (normalized_text,) if normalized_text == text else (normalized_text, text)
+    
+    for search_text in search_texts:
+        lowered = _ascii_lower(search_text)
+        
         # Priority 1: Settled Amount (Zemen Bank format)
-        match = re.search(r'settled\s+amount[:\s]*ETB\s*([0-9,]+(?:\.[0-9]{2})?)', search_text, re.IGNORECASE | re.DOTALL)
+        match = _SETTLED_AMOUNT_RE.search(search_text) if _may_contain(lowered, ('settled',)) else None
         if match:
             amount_str = match.group(1).replace(',', '')
             try:
@@ -1081,13 +1227,8 @@ def extract_amount_from_text(text):
                 pass
         
         # Priority 2: Without VAT patterns
-        without_vat_patterns = [
-            r'(?:subtotal|sub-total|sub total|before vat|excluding vat|excl\.? vat)[:\s]*(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:ETB|birr|ብር)?\s*([0-9,]+(?:\.[0-9]{2})?)\s*(?:before vat|excluding vat|excl\.? vat)',
-        ]
-        
-        for pattern in without_vat_patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
+        for pattern in _WITHOUT_VAT_AMOUNT_RES if _may_contain(lowered, ('vat', 'sub')) else ():
+            match = pattern.search(search_text)
             if match:
                 amount_str = match.group(1).replace(',', '')
                 try:
@@ -1097,7 +1238,7 @@ def extract_amount_from_text(text):
                     pass
         
         # Priority 3: Debited pattern
-        match = re.search(r'ETB\s*([0-9,]+(?:\.[0-9]{2})?)\s+debited', search_text, re.IGNORECASE)
+        match = _DEBITED_AMOUNT_RE.search(search_text) if _may_contain(lowered, ('debited',)) else None
         if match:
             amount_str = match.group(1).replace(',', '')
             try:
@@ -1107,34 +1248,35 @@ def extract_amount_from_text(text):
                 pass
         
         # Priority 4: Standard patterns
-        patterns = [
-            r'(?:debited|Debited|DEBITED).*?ETB\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:Amount|amount|AMOUNT).*?(?:ETB|birr)?\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:ETB|birr|ብር)\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'([0-9,]+(?:\.[0-9]{2})?)\s*(?:ETB|birr|ብር)',
-            r'transferred\s+ETB\s*([0-9,]+(?:\.[0-9]{2})?)',
-        ]
-        
+        # One pass for all five patterns. A hit of pattern k that starts inside
+        # its own previous match is dropped, matching what a separate
+        # finditer per pattern would have returned.
         all_amounts = []
-        for pattern in patterns:
-            for match in re.finditer(pattern, search_text, re.IGNORECASE):
-                amount_str = match.group(1).replace(',', '')
-                try:
-                    amount_val = float(amount_str)
-                    if amount_val > 50:
-                        match_pos = match.start()
-                        context = search_text[max(0, match_pos - 30):min(len(search_text), match_pos + 100)]
-                        # Exclude total amounts
-                        if 'total' not in context.lower() and 'vat' not in context.lower():
-                            all_amounts.append(amount_val)
-                except:
-                    pass
+        pattern_ends = [0] * len(_STANDARD_AMOUNT_GROUPS)
+        for match in _ALL_STANDARD_AMOUNTS_RE.finditer(search_text):
+            k = int(match.lastgroup[1:])  # the outer p<k> group closes last
+            span_group, amount_group = _STANDARD_AMOUNT_GROUPS[k]
+            if match.start() < pattern_ends[k]:
+                continue
+            pattern_ends[k] = match.end(span_group)
+            
+            amount_str = match.group(amount_group).replace(',', '')
+            try:
+                amount_val = float(amount_str)
+                if amount_val > 50:
+                    match_pos = match.start()
+                    context = search_text[max(0, match_pos - 30):min(len(search_text), match_pos + 100)]
+                    # Exclude total amounts
+                    if 'total' not in context.lower() and 'vat' not in context.lower():
+                        all_amounts.append(amount_val)
+            except:
+                pass
         
         if all_amounts:
             return str(min(all_amounts))  # Return smallest amount (likely without VAT)
     
     # Fallback: standalone amounts
-    match = re.search(r'([0-9,]+\.[0-9]{2})\s*(?:Birr|ETB)', text, re.IGNORECASE)
+    match = _STANDALONE_AMOUNT_RE.search(text) if _may_contain(_ascii_lower(text), ('birr', 'etb')) else None
     if match:
         amount_str = match.group(1).replace(',', '')
         try:
@@ -1146,32 +1288,29 @@ def extract_amount_from_text(text):
     return ''
 
 
+@lru_cache(maxsize=256)
 def extract_txid_from_text(text):
     """Extract transaction ID from OCR text - uses same logic as bot"""
-    import re
+    
+    lowered = _ascii_lower(text)
     
     # Priority 1: Zemen Bank - Payment order number / Reference No
-    match = re.search(r'(?:payment\s+order\s+number|reference\s+no\.?)[:\s]*\n?\s*([A-Z0-9]{10,})', text, re.IGNORECASE | re.MULTILINE)
+    match = _ZEMEN_TXID_RE.search(text) if _may_contain(lowered, ('number', 'reference')) else None
     if match:
         txid = match.group(1).strip()
         if len(txid) >= 10:
             return txid
     
     # Priority 2: Telebirr invoice (DAE3SX92FL format)
-    match = re.search(r'(?:invoice\s+no\.?)[:\s]*\n?\s*([A-Z]{3}[A-Z0-9]{7,12})', text, re.IGNORECASE)
+    match = _TELEBIRR_INVOICE_RE.search(text) if _may_contain(lowered, ('invoice',)) else None
     if match:
         return match.group(1).upper()
     
     # Priority 3: Standard patterns
-    patterns = [
-        r'(?:transaction\s+id|tx\s+id|txid|tran\s+ref)[:\s]*([A-Za-z0-9]{8,})',
-        r'(?:FT|TT)[A-Z0-9]{10,}',
-        r'(?:Transaction|Trans|TXN|Ref|Reference)[:\s#]*([A-Z0-9]{6,20})',
-        r'\b([A-Z]{2,3}[0-9]{8,15})\b',  # Common bank format like FT123456789
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for words, pattern in _STANDARD_TXID_RES:
+        if words and not _may_contain(lowered, words):
+            continue
+        match = pattern.search(text)
         if match:
             result = match.group(1) if match.lastindex else match.group(0)
             if len(result) >= 6:
@@ -1180,16 +1319,11 @@ def extract_txid_from_text(text):
     return ''
 
 
+@lru_cache(maxsize=256)
 def extract_payer_from_text(text):
     """Extract payer name from OCR text"""
-    import re
-    
-    patterns = [
-        r'(?:From|Sender|Payer|Account Holder)[:\s]*([A-Za-z\s]{5,40})',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _PAYER_RES:
+        match = pattern.search(text)
         if match:
             return match.group(1).strip()
     
@@ -1245,7 +1379,7 @@ def submit_payment(group_id):
         if payment_type not in PAYMENT_TYPES:
             errors.append({'field': 'payment_type', 'message': f'Invalid type. Choose: {", ".join(PAYMENT_TYPES)}'})
         
-        if month not in ETHIOPIAN_MONTHS:
+        if month not in _MONTH_COLS:
             errors.append({'field': 'month', 'message': 'Invalid month'})
         
         try:
@@ -1286,11 +1420,16 @@ def submit_payment(group_id):
                 }]
             }), 400
         
+        # One fresh batch read of every sheet, shared by the duplicate check and
+        # the row lookups below (not the TTL cache: a duplicate must never slip
+        # through on stale data, and rows may have been added by the bot)
+        values_by_type = _fetch_and_cache_values(group_id)
+        
         # ========== DUPLICATE TXID CHECK ==========
         # Only check for duplicates if TXID is provided
         if transaction_id and transaction_id.strip():
             exclude_house = house_number if is_edit_mode else None
-            is_duplicate, duplicate_sheet, duplicate_row = check_duplicate_txid(sheets, transaction_id, exclude_house)
+            is_duplicate, duplicate_sheet, duplicate_row = check_duplicate_txid(sheets, transaction_id, exclude_house, group_id=group_id, values_by_type=values_by_type, payment_type=payment_type)
             
             if is_duplicate:
                 return jsonify({
@@ -1302,6 +1441,8 @@ def submit_payment(group_id):
                 }), 400
         
         # ========== EDIT MODE: DELETE OLD ENTRY ==========
+        # Found here, cleared together with the new write below
+        old_entry = None  # (sheet name, row, amount col, FT No col)
         if is_edit_mode:
             # Get user's last submission
             if group_id not in user_last_submissions:
@@ -1315,32 +1456,43 @@ def submit_payment(group_id):
                 
                 if old_sheet_name and old_sheet_name in sheets:
                     old_sheet = sheets[old_sheet_name]
-                    old_values = old_sheet.get_all_values()
+                    old_values = values_by_type.get(old_sheet_name)
+                    if old_values is None:
+                        old_values = old_sheet.get_all_values()
                     
                     for idx, row in enumerate(old_values[2:], start=3):
                         if len(row) > 1 and row[1].strip() == old_house:
-                            old_month_index = ETHIOPIAN_MONTHS.index(last_submission.get('month', 'Tir'))
-                            old_amount_col = 4 + (old_month_index * 2)
-                            old_txid_col = old_amount_col + 1
+                            old_amount_col, old_txid_col = _MONTH_COLS[last_submission.get('month', 'Tir')]
                             
                             if len(row) > old_txid_col and row[old_txid_col].strip() == old_txid:
-                                # Delete old entry
-                                old_sheet.update_cell(idx, old_amount_col, '')
-                                old_sheet.update_cell(idx, old_txid_col, '')
-                                print(f"[EDIT MODE] Deleted old entry from {old_sheet_name} row {idx}")
+                                old_entry = (old_sheet_name, idx, old_amount_col, old_txid_col)
                                 break
         
+        def delete_old_entry():
+            # Delete old entry (amount + FT No cells in one request)
+            old_sheet_name, idx, old_amount_col, old_txid_col = old_entry
+            sheets[old_sheet_name].batch_update([{
+                'range': f"{gspread.utils.rowcol_to_a1(idx, old_amount_col)}:{gspread.utils.rowcol_to_a1(idx, old_txid_col)}",
+                'values': [['', '']]
+            }], value_input_option='USER_ENTERED')
+            logger.info("[EDIT MODE] Deleted old entry from %s row %s", old_sheet_name, idx)
+        
         sheet = sheets.get(payment_type)
         if not sheet:
+            if old_entry:
+                delete_old_entry()
+                invalidate_values_cache(group_id)
             return jsonify({'success': False, 'errors': [{'field': 'payment_type', 'message': f'Sheet not found for {payment_type}'}]}), 500
         
         # Find or create row for this house
-        month_index = ETHIOPIAN_MONTHS.index(month)
-        amount_col = 4 + (month_index * 2)
-        txid_col = amount_col + 1
+        amount_col, txid_col = _MONTH_COLS[month]
         
-        # Find house row
-        values = sheet.get_all_values()
+        # Find house row in the values read at the start (clearing the old
+        # edit-mode cells doesn't move rows). A plain scan of this one sheet:
+        # the values are re-read on every submit, so an index would never be reused
+        values = values_by_type.get(payment_type)
+        if values is None:
+            values = sheet.get_all_values()
         house_row = None
         
         for idx, row in enumerate(values[2:], start=3):
@@ -1348,22 +1500,56 @@ def submit_payment(group_id):
                 house_row = idx
                 break
         
-        if house_row:
-            # Update existing row
-            sheet.update_cell(house_row, amount_col, amount)
-            # Only update TXID if provided
-            if transaction_id and transaction_id.strip():
-                sheet.update_cell(house_row, txid_col, transaction_id)
-        else:
-            # Add new row
-            new_row = [''] * max(txid_col, 30)
-            new_row[1] = house_number
-            new_row[2] = payer_name
-            new_row[amount_col - 1] = amount
-            # Only set TXID if provided
-            if transaction_id and transaction_id.strip():
-                new_row[txid_col - 1] = transaction_id
-            sheet.append_row(new_row)
+        def write_payment():
+            if house_row:
+                # Update existing row
+                # Only update TXID if provided - then amount and TXID go in one request
+                if transaction_id and transaction_id.strip():
+                    sheet.batch_update([{
+                        'range': f"{gspread.utils.rowcol_to_a1(house_row, amount_col)}:{gspread.utils.rowcol_to_a1(house_row, txid_col)}",
+                        'values': [[amount, transaction_id]]
+                    }], value_input_option='USER_ENTERED')
+                else:
+                    sheet.update_cell(house_row, amount_col, amount)
+            else:
+                # Add new row (only up to this month's FT No column - Sheets leaves the rest empty)
+                new_row = [''] * txid_col
+                new_row[1] = house_number
+                new_row[2] = payer_name
+                new_row[amount_col - 1] = amount
+                # Only set TXID if provided
+                if transaction_id and transaction_id.strip():
+                    new_row[txid_col - 1] = transaction_id
+                sheet.append_row(new_row)
+        
+        try:
+            # The edit-mode delete and the new write touch different cells unless
+            # the same house/type/month was resubmitted - then the delete has to
+            # land first. Otherwise both Sheets round trips run side by side.
+            same_cells = old_entry == (payment_type, house_row, amount_col, txid_col)
+            if old_entry and not same_cells:
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    delete_future = executor.submit(delete_old_entry)
+                    write_future = executor.submit(write_payment)
+                delete_error = delete_future.exception()
+                write_error = write_future.exception()
+                if delete_error or write_error:
+                    # Side by side, one step can land without the other - say
+                    # exactly which one did so the user knows what's in the sheet
+                    if delete_error and write_error:
+                        message = f'Edit not applied, the old entry is unchanged: {write_error}'
+                    elif write_error:
+                        message = f'Old entry was removed but the new payment was not saved: {write_error}'
+                    else:
+                        message = f'New payment was saved but the old entry could not be removed: {delete_error}'
+                    logger.error("[EDIT MODE] %s", message, exc_info=write_error or delete_error)
+                    return jsonify({'success': False, 'errors': [{'field': 'general', 'message': message}]}), 500
+            else:
+                if old_entry:
+                    delete_old_entry()
+                write_payment()
+        finally:
+            invalidate_values_cache(group_id)
         
         # Store last submission for edit mode
         if group_id not in user_last_submissions:
@@ -1390,9 +1576,7 @@ def submit_payment(group_id):
         })
         
     except Exception as e:
-        print(f"Submit payment error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Submit payment error: %s", e)
         return jsonify({'success': False, 'errors': [{'field': 'general', 'message': str(e)}]}), 500
 
 
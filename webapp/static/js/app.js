@@ -850,6 +850,7 @@ function getCurrentEthiopianMonth() {
 // ========== PAYMENT SUBMISSION ==========
 
 let currentReceiptData = null;
+let currentReceiptFile = null;
 let currentReceiptId = null;
 
 function showPaymentView() {
@@ -890,6 +891,7 @@ function goToPaymentStep(step) {
 
 function resetPaymentForm() {
     currentReceiptData = null;
+    currentReceiptFile = null;
     currentReceiptId = null;
     window.extractedReceiptData = {};
     window.isEditMode = false;
@@ -976,6 +978,7 @@ function handleReceiptUpload(event) {
     const reader = new FileReader();
     reader.onload = function (e) {
         currentReceiptData = e.target.result;
+        currentReceiptFile = file;
         const preview = document.getElementById('receipt-image');
         const previewContainer = document.getElementById('receipt-preview');
         const uploadArea = document.getElementById('upload-area');
@@ -1022,13 +1025,15 @@ async function processReceipt() {
 
     try {
         showProgress(50);
+        // Send the raw file as multipart (browser sets the boundary header)
+        const formData = new FormData();
+        formData.append('image', currentReceiptFile, currentReceiptFile.name || 'receipt.jpg');
         const res = await fetch(`${API_BASE}/api/upload-receipt/${currentGroupId}`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json',
                 'X-Telegram-Init-Data': tg?.initData || ''
             },
-            body: JSON.stringify({ image: currentReceiptData })
+            body: formData
         });
 
         showProgress(80);